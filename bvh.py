@@ -0,0 +1,252 @@
+"""
+Hierarquia de volumes envolventes (BVH) sobre os triângulos de uma malha e
+testes de raio contra ela, usados na seleção com o mouse de projeto_3aVA.py.
+
+Não depende do OpenGL: a malha é dada pelos arrays planos do visualizador
+('vertices' com x, y, z de cada vértice e 'indices' com 3 índices por triângulo).
+Executado diretamente, mede a construção e as consultas em uma malha gerada:
+
+  python bvh.py [--triangles 1000000] [--queries 1000]
+"""
+import argparse
+import math
+import random
+import time
+from array import array
+
+###########################################
+# Construção e Consulta da BVH
+###########################################
+
+# Número máximo de triângulos em uma folha da BVH
+BVH_LEAF_SIZE = 4
+
+def build_bvh(vertices, indices, triangle_faces):
+    """
+    Constrói a BVH dos triângulos do objeto (divisão na mediana do maior eixo dos
+    centroides). É feita uma única vez, no carregamento, e guardada com o objeto.
+
+    Os nós ficam em arrays planos: 'bounds' (6 valores por nó: mínimo e máximo),
+    'first', 'count' e 'leaf'. Em um nó interno, leaf == 0 e os filhos são first
+    e first + 1; em uma folha, os triângulos são order[first:first + count].
+    Sem triângulos válidos, a BVH é vazia (nenhum nó).
+    """
+    num_triangles = len(indices) // 3
+    if num_triangles == 0:
+        return {'bounds': array('f'), 'first': array('i'), 'count': array('i'),
+                'leaf': array('b'), 'order': array('i'), 'faces': array('i')}
+    # Centroides (multiplicados por 3, o que não altera a ordenação), a partir da
+    # posição de cada canto no array plano de vértices
+    corners = list(zip([3 * i for i in indices[0::3]], [3 * i for i in indices[1::3]],
+                       [3 * i for i in indices[2::3]]))
+    centroids = tuple([vertices[a + i] + vertices[b + i] + vertices[c + i] for a, b, c in corners]
+                      for i in range(3))
+    del corners
+
+    order = list(range(num_triangles))
+    first = [0]
+    count = [num_triangles]
+    leaf = [1]
+    stack = [(0, 0, num_triangles)]
+    while stack:
+        node, start, end = stack.pop()
+        count[node] = end - start
+        first[node] = start
+        if end - start <= BVH_LEAF_SIZE:
+            continue
+        ids = order[start:end]
+        # Extensão dos centroides em cada eixo, estimada com até 64 amostras
+        sample = ids[::max(1, len(ids) // 64)]
+        extents = []
+        for axis in centroids:
+            values = list(map(axis.__getitem__, sample))
+            extents.append(max(values) - min(values))
+        if max(extents) == 0:
+            continue  # centroides coincidentes: mantém como folha
+        axis = centroids[extents.index(max(extents))]
+        ids.sort(key=axis.__getitem__)
+        order[start:end] = ids
+        mid = (start + end) // 2
+        left = len(first)
+        first += [0, 0]
+        count += [0, 0]
+        leaf += [1, 1]
+        first[node] = left
+        count[node] = 0
+        leaf[node] = 0
+        stack.append((left, start, mid))
+        stack.append((left + 1, mid, end))
+
+    # Caixas de baixo para cima: os filhos sempre têm índice maior que o pai
+    num_nodes = len(first)
+    bounds = [0.0] * (6 * num_nodes)
+    for node in range(num_nodes - 1, -1, -1):
+        b = 6 * node
+        if not leaf[node]:
+            l = 6 * first[node]
+            x0, y0, z0, x1, y1, z1 = bounds[l:l + 6]
+            u0, v0, w0, u1, v1, w1 = bounds[l + 6:l + 12]
+            bounds[b:b + 6] = (x0 if x0 < u0 else u0, y0 if y0 < v0 else v0, z0 if z0 < w0 else w0,
+                               x1 if x1 > u1 else u1, y1 if y1 > v1 else v1, z1 if z1 > w1 else w1)
+            continue
+        corners = [3 * indices[3*t + k] for t in order[first[node]:first[node] + count[node]] for k in range(3)]
+        xs = [vertices[k] for k in corners]
+        ys = [vertices[k + 1] for k in corners]
+        zs = [vertices[k + 2] for k in corners]
+        bounds[b:b + 6] = (min(xs), min(ys), min(zs), max(xs), max(ys), max(zs))
+
+    return {'bounds': array('f', bounds), 'first': array('i', first), 'count': array('i', count),
+            'leaf': array('b', leaf), 'order': array('i', order), 'faces': array('i', (triangle_faces[t] for t in order))}
+
+def intersect_triangle(origin, direction, a, b, c):
+    """
+    Interseção raio-triângulo (Möller-Trumbore). Retorna a distância t ao longo
+    do raio ou None.
+    """
+    e1 = (b[0] - a[0], b[1] - a[1], b[2] - a[2])
+    e2 = (c[0] - a[0], c[1] - a[1], c[2] - a[2])
+    p = (direction[1]*e2[2] - direction[2]*e2[1],
+         direction[2]*e2[0] - direction[0]*e2[2],
+         direction[0]*e2[1] - direction[1]*e2[0])
+    det = e1[0]*p[0] + e1[1]*p[1] + e1[2]*p[2]
+    if abs(det) < 1e-12:
+        return None
+    inv = 1.0 / det
+    s = (origin[0] - a[0], origin[1] - a[1], origin[2] - a[2])
+    u = (s[0]*p[0] + s[1]*p[1] + s[2]*p[2]) * inv
+    if u < 0.0 or u > 1.0:
+        return None
+    q = (s[1]*e1[2] - s[2]*e1[1], s[2]*e1[0] - s[0]*e1[2], s[0]*e1[1] - s[1]*e1[0])
+    v = (direction[0]*q[0] + direction[1]*q[1] + direction[2]*q[2]) * inv
+    if v < 0.0 or u + v > 1.0:
+        return None
+    t = (e2[0]*q[0] + e2[1]*q[1] + e2[2]*q[2]) * inv
+    return t if t > 0.0 else None
+
+def intersect_box(origin, inv_dir, bounds, b, t_max):
+    """
+    Teste de lâminas (slabs) do raio contra a caixa bounds[b:b+6]. Retorna a
+    distância de entrada na caixa, ou None se o raio não a atinge antes de t_max.
+    """
+    t_near = 0.0
+    t_far = t_max
+    for i in range(3):
+        t1 = (bounds[b + i] - origin[i]) * inv_dir[i]
+        t2 = (bounds[b + 3 + i] - origin[i]) * inv_dir[i]
+        if t1 > t2:
+            t1, t2 = t2, t1
+        if t1 > t_near:
+            t_near = t1
+        if t2 < t_far:
+            t_far = t2
+        if t_near > t_far:
+            return None
+    return t_near
+
+def intersect_bvh(obj, origin, direction, t_max=float('inf')):
+    """
+    Triângulo mais próximo atingido pelo raio, percorrendo a BVH do objeto (filho
+    mais próximo primeiro, descartando caixas além do melhor acerto).
+    Retorna (t, índice da face) ou None.
+    """
+    bvh = obj['bvh']
+    bounds, first, count, order, faces = bvh['bounds'], bvh['first'], bvh['count'], bvh['order'], bvh['faces']
+    leaf = bvh['leaf']
+    vertices = obj['vertices']
+    indices = obj['indices']
+    inv_dir = [1.0 / d if d != 0 else float('inf') for d in direction]
+    best = None
+    best_t = t_max
+    if not order or intersect_box(origin, inv_dir, bounds, 0, best_t) is None:
+        return None
+    stack = [0]
+    while stack:
+        node = stack.pop()
+        if leaf[node]:
+            start = first[node]
+            for k in range(start, start + count[node]):
+                t = order[k]
+                a, b, c = 3 * indices[3*t], 3 * indices[3*t + 1], 3 * indices[3*t + 2]
+                hit = intersect_triangle(origin, direction, vertices[a:a + 3], vertices[b:b + 3], vertices[c:c + 3])
+                if hit is not None and hit < best_t:
+                    best_t = hit
+                    best = faces[k]
+            continue
+        left = first[node]
+        t_left = intersect_box(origin, inv_dir, bounds, 6 * left, best_t)
+        t_right = intersect_box(origin, inv_dir, bounds, 6 * left + 6, best_t)
+        # Empilha o mais distante primeiro, para visitar antes o mais próximo
+        if t_left is not None and t_right is not None:
+            if t_left < t_right:
+                stack.append(left + 1)
+                stack.append(left)
+            else:
+                stack.append(left)
+                stack.append(left + 1)
+        elif t_left is not None:
+            stack.append(left)
+        elif t_right is not None:
+            stack.append(left + 1)
+    return None if best is None else (best_t, best)
+
+###########################################
+# Medição em uma Malha Gerada
+###########################################
+
+def grid_mesh(num_triangles):
+    """
+    Gera um terreno ondulado em grade (dois triângulos por célula) com cerca de
+    'num_triangles' triângulos, no formato do visualizador.
+
+    Retorna:
+        dict: Com 'vertices' (array('f')), 'indices' (array('i')) e 'size' (lado da grade).
+    """
+    n = max(1, int(math.sqrt(num_triangles / 2)))
+    vertices = array('f')
+    for j in range(n + 1):
+        for i in range(n + 1):
+            vertices.extend((i, j, math.sin(i * 0.1) * math.cos(j * 0.1) * 5.0))
+    indices = array('i')
+    for j in range(n):
+        row = j * (n + 1)
+        for i in range(n):
+            a = row + i
+            b = a + n + 1
+            indices.extend((a, a + 1, b + 1, a, b + 1, b))
+    return {'vertices': vertices, 'indices': indices, 'size': n}
+
+def benchmark(num_triangles, num_queries, seed=0):
+    """
+    Constrói a BVH de grid_mesh(num_triangles) e lança num_queries raios
+    aleatórios de cima para baixo (todos atingem a malha).
+
+    Retorna:
+        dict: Com 'triangles', 'build' (segundos) e 'query_mean', 'query_max' (segundos por raio).
+    """
+    mesh = grid_mesh(num_triangles)
+    num_triangles = len(mesh['indices']) // 3
+    start = time.perf_counter()
+    mesh['bvh'] = build_bvh(mesh['vertices'], mesh['indices'], range(num_triangles))
+    build = time.perf_counter() - start
+    rng = random.Random(seed)
+    size = mesh['size']
+    times = []
+    for _ in range(num_queries):
+        origin = (rng.uniform(0, size), rng.uniform(0, size), 100.0)
+        start = time.perf_counter()
+        intersect_bvh(mesh, origin, (0.0, 0.0, -1.0))
+        times.append(time.perf_counter() - start)
+    return {'triangles': num_triangles, 'build': build,
+            'query_mean': sum(times) / len(times), 'query_max': max(times)}
+
+def main():
+    parser = argparse.ArgumentParser(description="Mede a construção e as consultas da BVH em uma malha gerada.")
+    parser.add_argument("--triangles", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=1000)
+    args = parser.parse_args()
+    result = benchmark(args.triangles, args.queries)
+    print(f"{result['triangles']} triângulos: construção {result['build']:.2f} s, "
+          f"consulta média {result['query_mean'] * 1000:.3f} ms (máxima {result['query_max'] * 1000:.3f} ms).")
+
+if __name__ == "__main__":
+    main()
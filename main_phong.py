@@ -1,4 +1,27 @@
+import time
+# Início da inicialização (ver App.report_startup): as importações abaixo já são medidas
+STARTUP_BEGIN = time.perf_counter()
+import argparse
+import contextlib
+import importlib.util
+import json
+import math
+import mmap
+import multiprocessing
+import os
+import sys
 import tkinter as tk
+from array import array
+
+import mesh_formats
+import render_cache
+# phong_jit (NumPy e Numba, de importação lenta) só é importado na primeira
+# renderização que usa o kernel compilado (ver jit_available e render_scene)
+IMPORT_SECONDS = time.perf_counter() - STARTUP_BEGIN
+
+# Versão do renderizador, incluída na chave do cache de imagens.
+# Deve ser incrementada sempre que uma mudança alterar as imagens geradas.
+RENDERER_VERSION = 1
 
 ###########################################
 # Funções Matemáticas e Operações Vetoriais
@@ -138,6 +161,10 @@ def load_mesh(filename):
       <x> <y> <z>   (para cada vértice)
       <i1> <i2> <i3>   (para cada triângulo, índices 1-indexados)
 
+    Arquivos .ply, .stl e .obj são lidos por mesh_formats.read_mesh e suas faces
+    são trianguladas em leque; faces com menos de 3 vértices ou com índices fora
+    do intervalo são descartadas, com um aviso.
+
     Parâmetros:
         filename (str): Caminho para o arquivo mesh.txt.
 
@@ -146,6 +173,24 @@ def load_mesh(filename):
           - vertices: lista de listas [x, y, z]
           - triangles: lista de listas [i1, i2, i3] (convertidos para 0-indexados)
     """
+    if filename.lower().endswith(mesh_formats.MESH_EXTENSIONS):
+        mesh = mesh_formats.read_mesh(filename)
+        coords = mesh['vertices'].tolist()
+        vertices = [coords[i:i + 3] for i in range(0, len(coords), 3)]
+        faces = mesh['faces']
+        face_starts = mesh['face_starts']
+        triangles = []
+        dropped = 0
+        for f in range(len(face_starts) - 1):
+            face = faces[face_starts[f]:face_starts[f + 1]]
+            if len(face) < 3 or min(face) < 0 or max(face) >= len(vertices):
+                dropped += 1
+                continue
+            for i in range(1, len(face) - 1):
+                triangles.append([face[0], face[i], face[i + 1]])
+        if dropped:
+            print(f"Aviso: {dropped} face(s) com índices inválidos descartada(s) em '{filename}'.")
+        return vertices, triangles
     with open(filename, "r") as f:
         lines = [line.strip() for line in f if line.strip()]
     header = lines[0].split()
@@ -223,20 +268,24 @@ def load_lighting(filename):
       6. Od – Cor difusa do objeto (ex.: "Od = 0.7 0.5 0.8" ou "0.7 0.5 0.8")
       7. Ks – Coeficiente especular (ex.: "Ks = 0.5" ou "0.5")
       8. η – Expoente especular (ex.: "η = 1" ou "1")
+
+    Linhas extras (opcionais) definem luzes pontuais adicionais com raio de influência:
+      "Luz = Ilr Ilg Ilb Plx Ply Plz raio" ou "Ilr Ilg Ilb Plx Ply Plz raio"
     
     Parâmetros:
         filename (str): Caminho para o arquivo lighting.txt.
     
     Retorna:
-        dict: Com as chaves 'Iamb', 'Ka', 'Il', 'Pl', 'Kd', 'Od', 'Ks' e 'eta'.
+        dict: Com as chaves 'Iamb', 'Ka', 'Il', 'Pl', 'Kd', 'Od', 'Ks', 'eta' e 'lights'
+              (lista de luzes {'Il', 'Pl', 'radius'}; a primeira é a luz principal).
     """
     params = {}
     with open(filename, "r") as f:
         raw_lines = [line.strip() for line in f if line.strip()]
         # Remove rótulos, se presentes
         lines = [parse_line(line) for line in raw_lines]
-    if len(lines) != 8:
-        raise ValueError("O arquivo lighting.txt deve conter exatamente 8 linhas (após remover cabeçalhos).")
+    if len(lines) < 8:
+        raise ValueError("O arquivo lighting.txt deve conter pelo menos 8 linhas (após remover cabeçalhos).")
     params['Iamb'] = list(map(float, lines[0].split()))
     params['Ka'] = float(lines[1])
     params['Il'] = list(map(float, lines[2].split()))
@@ -245,6 +294,14 @@ def load_lighting(filename):
     params['Od'] = list(map(float, lines[5].split()))
     params['Ks'] = float(lines[6])
     params['eta'] = float(lines[7])
+    # A luz principal tem alcance infinito (sem atenuação, como no modelo original)
+    params['lights'] = [{'Il': params['Il'], 'Pl': params['Pl'], 'radius': float('inf')}]
+    # Luzes pontuais adicionais: "Luz = Ilr Ilg Ilb Plx Ply Plz raio"
+    for line in lines[8:]:
+        values = list(map(float, line.split()))
+        if len(values) != 7:
+            raise ValueError("Cada luz adicional em lighting.txt deve conter 7 valores: Il (3), Pl (3) e raio.")
+        params['lights'].append({'Il': values[0:3], 'Pl': values[3:6], 'radius': values[6]})
     return params
 
 ###########################################
@@ -426,6 +483,72 @@ def barycentric(p, p0, p1, p2):
     gamma = 1 - alpha - beta
     return (alpha, beta, gamma)
 
+###########################################
+# Preparação de Triângulos (Triangle Setup)
+###########################################
+
+def setup_triangles(vertices_screen, vertices_view, triangles, width, height):
+    """
+    Prepara, de uma só vez, os dados de rasterização de todos os triângulos da malha.
+
+    Para cada triângulo visível calcula a caixa delimitadora na tela (já recortada),
+    o denominador das coordenadas baricêntricas (duas vezes a área com sinal), os
+    coeficientes das funções de aresta e o intervalo de profundidade em view. Os dados
+    ficam em arrays compactos (estrutura de arrays), na ordem original dos triângulos.
+    Triângulos degenerados (área zero, em que barycentric retorna -1) e triângulos
+    totalmente fora da tela são descartados aqui.
+
+    As funções de aresta reproduzem os numeradores de barycentric:
+      alpha * area = a_x * x + a_y * y + a_c
+      beta  * area = b_x * x + b_y * y + b_c
+
+    Parâmetros:
+        vertices_screen (list): Vértices em coordenadas de tela (sx, sy, z).
+        vertices_view (list): Vértices em view ([x,y,z]).
+        triangles (list): Lista de triângulos (índices 0-indexados).
+        width, height (int): Dimensões da tela.
+
+    Retorna:
+        dict: Com as chaves
+          'count' : número de triângulos mantidos.
+          'tri'   : índice de cada triângulo em triangles.
+          'x_min', 'x_max', 'y_min', 'y_max' : caixa delimitadora recortada.
+          'area'  : denominador das coordenadas baricêntricas.
+          'edge'  : 6 coeficientes por triângulo (a_x, a_y, a_c, b_x, b_y, b_c).
+          'z_min', 'z_max' : intervalo de profundidade em view.
+    """
+    setup = {'tri': array('i'),
+             'x_min': array('i'), 'x_max': array('i'),
+             'y_min': array('i'), 'y_max': array('i'),
+             'area': array('d'), 'edge': array('d'),
+             'z_min': array('d'), 'z_max': array('d')}
+    for t, (i0, i1, i2) in enumerate(triangles):
+        x0, y0 = vertices_screen[i0][0], vertices_screen[i0][1]
+        x1, y1 = vertices_screen[i1][0], vertices_screen[i1][1]
+        x2, y2 = vertices_screen[i2][0], vertices_screen[i2][1]
+        area = (y1 - y2)*(x0 - x2) + (x2 - x1)*(y0 - y2)
+        if area == 0:
+            continue
+        x_min = max(min(x0, x1, x2), 0)
+        x_max = min(max(x0, x1, x2), width - 1)
+        y_min = max(min(y0, y1, y2), 0)
+        y_max = min(max(y0, y1, y2), height - 1)
+        if x_min > x_max or y_min > y_max:
+            continue
+        z0, z1, z2 = vertices_view[i0][2], vertices_view[i1][2], vertices_view[i2][2]
+        setup['tri'].append(t)
+        setup['x_min'].append(x_min)
+        setup['x_max'].append(x_max)
+        setup['y_min'].append(y_min)
+        setup['y_max'].append(y_max)
+        setup['area'].append(area)
+        setup['edge'].extend((y1 - y2, x2 - x1, -(y1 - y2)*x2 - (x2 - x1)*y2,
+                              y2 - y0, x0 - x2, -(y2 - y0)*x2 - (x0 - x2)*y2))
+        setup['z_min'].append(min(z0, z1, z2))
+        setup['z_max'].append(max(z0, z1, z2))
+    setup['count'] = len(setup['tri'])
+    return setup
+
 ###########################################
 # Modelo de Iluminação de Phong
 ###########################################
@@ -480,63 +603,311 @@ def compute_phong_color(P, N, lighting, Pl_view):
     color = vec_clamp(color, 0, 255)
     return (int(color[0]), int(color[1]), int(color[2]))
 
+def light_falloff(to_light, radius):
+    """
+    Calcula o fator de atenuação de uma luz com raio de influência.
+
+    Usa a janela (1 - (dist/raio)^2)^2, que vale 1 junto à luz e chega a 0
+    exatamente no raio; assim, descartar a luz fora do raio não altera a imagem.
+    Luzes com raio infinito não são atenuadas.
+
+    Parâmetros:
+        to_light (list): Vetor do ponto até a luz (não normalizado).
+        radius (float): Raio de influência da luz.
+
+    Retorna:
+        float: Fator de atenuação entre 0 e 1.
+    """
+    if radius == float('inf'):
+        return 1.0
+    dist2 = dot(to_light, to_light)
+    r2 = radius * radius
+    if dist2 >= r2:
+        return 0.0
+    w = 1 - dist2 / r2
+    return w * w
+
+def light_terms(P, N, Vp, Pl, radius):
+    """
+    Calcula os termos de uma luz que dependem apenas da geometria (e não das cores
+    nem dos coeficientes do material).
+
+    Parâmetros:
+        P (list): Posição do ponto em view.
+        N (list): Normal no ponto (normalizada).
+        Vp (list): Direção da visão no ponto (normalizada).
+        Pl (list): Posição da luz em view.
+        radius (float): Raio de influência da luz.
+
+    Retorna:
+        tuple: (atenuação, N • L, R • V), com os produtos limitados a 0; atenuação 0
+               indica que a luz não atinge o ponto.
+    """
+    to_light = vec_sub(Pl, P)
+    falloff = light_falloff(to_light, radius)
+    if falloff == 0:
+        return 0, 0, 0
+    L = normalize(to_light)
+    ndotl = dot(N, L)
+    if ndotl < 0:
+        ndotl = 0
+    R = vec_sub(vec_scalar_mult(N, 2 * dot(N, L)), L)
+    rdotv = dot(R, Vp)
+    if rdotv < 0:
+        rdotv = 0
+    return falloff, ndotl, rdotv
+
+def light_contribution(Il, lighting, falloff, ndotl, rdotv):
+    """
+    Calcula as componentes difusa e especular de uma luz, já atenuadas.
+
+    Parâmetros:
+        Il (list): Intensidade da luz.
+        lighting (dict): Parâmetros de iluminação ('Kd', 'Od', 'Ks', 'eta').
+        falloff, ndotl, rdotv (float): Termos geométricos da luz (light_terms).
+
+    Retorna:
+        list: Contribuição (R, G, B) da luz.
+    """
+    diffuse = vec_mul(Il, lighting['Kd'])
+    diffuse = vec_scalar_mult(diffuse, ndotl)
+    diffuse = vec_mul(diffuse, lighting['Od'])
+    spec_factor = rdotv ** lighting['eta']
+    specular = vec_scalar_mult(Il, lighting['Ks'] * spec_factor)
+    contribution = vec_add(diffuse, specular)
+    if falloff != 1:
+        contribution = vec_scalar_mult(contribution, falloff)
+    return contribution
+
+def compute_phong_color_lights(P, N, lighting, lights_view):
+    """
+    Computa a cor de um ponto P iluminado por várias luzes pontuais (modelo de Phong).
+
+    A componente ambiente é somada uma única vez; as componentes difusa e especular
+    de cada luz são atenuadas por light_falloff e acumuladas antes do clamp final.
+    Com uma única luz de raio infinito, o resultado é idêntico a compute_phong_color.
+
+    Parâmetros:
+        P (list): Posição do ponto em view ([x, y, z]).
+        N (list): Normal interpolada no ponto (normalizada).
+        lighting (dict): Parâmetros de iluminação ('Iamb', 'Ka', 'Kd', 'Od', 'Ks', 'eta').
+        lights_view (list): Luzes que podem atingir o ponto, cada uma um dict
+                            {'Il', 'Pl', 'radius'} com 'Pl' em view.
+
+    Retorna:
+        tuple: Cor final (R, G, B) com valores inteiros (0-255).
+    """
+    color = vec_scalar_mult(lighting['Iamb'], lighting['Ka'])
+    Vp = normalize(vec_scalar_mult(P, -1))
+    for light in lights_view:
+        terms = light_terms(P, N, Vp, light['Pl'], light['radius'])
+        if terms[0] == 0:
+            continue
+        color = vec_add(color, light_contribution(light['Il'], lighting, *terms))
+    color = vec_clamp(color, 0, 255)
+    return (int(color[0]), int(color[1]), int(color[2]))
+
+###########################################
+# Culling de Luzes por Tiles de Tela
+###########################################
+
+LIGHT_TILE_SIZE = 16
+
+def lights_to_view(lights, camera, camera_basis):
+    """
+    Transforma as posições das luzes do sistema mundial para o sistema de vista.
+
+    Parâmetros:
+        lights (list): Luzes {'Il', 'Pl', 'radius'} em coordenadas do mundo.
+        camera (dict): Parâmetros da câmera (usa 'C').
+        camera_basis (tuple): Base da câmera (u, v, n).
+
+    Retorna:
+        list: Novas luzes com 'Pl' em view.
+    """
+    u, v, n = camera_basis
+    lights_view = []
+    for light in lights:
+        Pl_rel = vec_sub(light['Pl'], camera['C'])
+        lights_view.append({'Il': light['Il'],
+                            'Pl': [dot(Pl_rel, u), dot(Pl_rel, v), dot(Pl_rel, n)],
+                            'radius': light['radius']})
+    return lights_view
+
+def sphere_intersects_box(center, radius, box):
+    """
+    Testa se a esfera de influência de uma luz intersecta uma caixa alinhada aos eixos.
+
+    Parâmetros:
+        center (list): Centro da esfera [x, y, z].
+        radius (float): Raio da esfera.
+        box (list): Caixa [x_min, y_min, z_min, x_max, y_max, z_max].
+
+    Retorna:
+        bool: True se houver interseção.
+    """
+    if radius == float('inf'):
+        return True
+    dist2 = 0
+    for i in range(3):
+        if center[i] < box[i]:
+            dist2 += (box[i] - center[i]) ** 2
+        elif center[i] > box[i + 3]:
+            dist2 += (center[i] - box[i + 3]) ** 2
+    return dist2 < radius * radius
+
+def build_light_grid(lights_view, setup, vertices_view, triangles, width, height,
+                     tile_size=LIGHT_TILE_SIZE):
+    """
+    Distribui as luzes em tiles de tela para que cada fragmento avalie apenas as luzes próximas.
+
+    Para cada tile, acumula a caixa envolvente (em view) dos triângulos cuja caixa de tela
+    o sobrepõe. Como todo fragmento do tile é combinação convexa dos vértices de um desses
+    triângulos, uma luz cuja esfera não intersecta essa caixa não atinge nenhum fragmento
+    do tile e pode ser descartada sem alterar a imagem.
+
+    Parâmetros:
+        lights_view (list): Luzes {'Il', 'Pl', 'radius'} com 'Pl' em view.
+        setup (dict): Triângulos preparados por setup_triangles.
+        vertices_view (list): Vértices em view ([x,y,z]).
+        triangles (list): Lista de triângulos (índices 0-indexados).
+        width, height (int): Dimensões da tela.
+        tile_size (int): Lado de cada tile em pixels.
+
+    Retorna:
+        dict: Com chaves 'tile_size', 'tiles_x', 'lights' (todas as luzes) e 'bins'
+              (lista de luzes por tile, em ordem de linha).
+    """
+    tiles_x = (width + tile_size - 1) // tile_size
+    tiles_y = (height + tile_size - 1) // tile_size
+    inf = float('inf')
+    bounds = [[inf, inf, inf, -inf, -inf, -inf] for _ in range(tiles_x * tiles_y)]
+    for t in range(setup['count']):
+        i0, i1, i2 = triangles[setup['tri'][t]]
+        v0, v1, v2 = vertices_view[i0], vertices_view[i1], vertices_view[i2]
+        tri_box = [min(v0[0], v1[0], v2[0]), min(v0[1], v1[1], v2[1]), setup['z_min'][t],
+                   max(v0[0], v1[0], v2[0]), max(v0[1], v1[1], v2[1]), setup['z_max'][t]]
+        for ty in range(setup['y_min'][t] // tile_size, setup['y_max'][t] // tile_size + 1):
+            for tx in range(setup['x_min'][t] // tile_size, setup['x_max'][t] // tile_size + 1):
+                box = bounds[ty * tiles_x + tx]
+                for k in range(3):
+                    if tri_box[k] < box[k]:
+                        box[k] = tri_box[k]
+                    if tri_box[k + 3] > box[k + 3]:
+                        box[k + 3] = tri_box[k + 3]
+    bins = []
+    for box in bounds:
+        if box[0] > box[3]:
+            bins.append([])
+            continue
+        bins.append([light for light in lights_view
+                     if sphere_intersects_box(light['Pl'], light['radius'], box)])
+    return {'tile_size': tile_size, 'tiles_x': tiles_x, 'lights': lights_view, 'bins': bins}
+
 ###########################################
 # Rasterização com Z-Buffer e Iluminação Phong
 ###########################################
 
-def fill_triangle_phong(photo, z_buffer, tri, lighting, Pl_view):
+def fill_triangle_phong(framebuffer, z_buffer, setup, k, vertices_view, normals_view, triangles,
+                        lighting, Pl_view, light_grid=None, clip=None, gbuffer=None):
     """
     Preenche um triângulo aplicando o modelo de Phong e usando z-buffer para visibilidade.
 
+    As coordenadas baricêntricas são obtidas das funções de aresta pré-calculadas por
+    setup_triangles, avançando incrementalmente ao longo de cada coluna de pixels.
+    Com 'clip', apenas a parte do triângulo dentro do retângulo é desenhada; as funções
+    de aresta continuam avançando a partir de y_min, de modo que cada pixel recebe
+    exatamente o mesmo valor que na imagem inteira.
+
     Parâmetros:
-        photo (tk.PhotoImage): Objeto de desenho.
+        framebuffer (dict): Framebuffer RGB (create_framebuffer).
         z_buffer (list of list): Matriz de profundidade.
-        tri (dict): Contém:
-                   'p' : Lista de 3 vértices em coordenadas de tela [(x,y), ...].
-                   'v' : Lista de 3 vértices em view ([x,y,z]).
-                   'n' : Lista de 3 normais em view ([nx,ny,nz]).
+        setup (dict): Triângulos preparados por setup_triangles.
+        k (int): Posição do triângulo nos arrays de setup.
+        vertices_view (list): Lista de vértices em view ([x,y,z]).
+        normals_view (list): Lista de normais em view ([nx,ny,nz]).
+        triangles (list): Lista de triângulos (índices 0-indexados).
         lighting (dict): Parâmetros de iluminação.
         Pl_view (list): Posição da luz em view.
+        light_grid (dict): Luzes distribuídas por tile (build_light_grid). Se None,
+                           usa apenas a luz principal em Pl_view.
+        clip (tuple): Retângulo (x0, y0, x1, y1), inclusivo, coberto pelo framebuffer e
+                      pelo z-buffer (um tile da imagem, ver render_scene_tiled). Se None,
+                      a imagem inteira.
+        gbuffer (dict): G-buffer (build_gbuffer) que recebe a posição e a normal de cada
+                        fragmento visível no lugar da cor; 'framebuffer', 'lighting' e
+                        'Pl_view' são então ignorados.
     """
-    p0, p1, p2 = tri['p']
-    v0, v1, v2 = tri['v']
-    n0, n1, n2 = tri['n']
-    
-    # Determina a caixa delimitadora do triângulo para limitar o processamento
-    xs = [p0[0], p1[0], p2[0]]
-    ys = [p0[1], p1[1], p2[1]]
-    x_min = max(min(xs), 0)
-    x_max = min(max(xs), photo.width() - 1)
-    y_min = max(min(ys), 0)
-    y_max = min(max(ys), photo.height() - 1)
+    i0, i1, i2 = triangles[setup['tri'][k]]
+    v0, v1, v2 = vertices_view[i0], vertices_view[i1], vertices_view[i2]
+    n0, n1, n2 = normals_view[i0], normals_view[i1], normals_view[i2]
+    area = setup['area'][k]
+    e = 6 * k
+    a_x, a_y, a_c, b_x, b_y, b_c = setup['edge'][e:e + 6]
+    y_min = setup['y_min'][k]
+    y_max = setup['y_max'][k]
+    x_start = setup['x_min'][k]
+    x_end = setup['x_max'][k]
+    ox = oy = 0
+    y_first = y_min
+    if clip is not None:
+        ox, oy, clip_x1, clip_y1 = clip
+        x_start = max(x_start, ox)
+        x_end = min(x_end, clip_x1)
+        y_first = max(y_min, oy)
+        y_max = min(y_max, clip_y1)
     
     # Percorre os pixels dentro da caixa delimitadora
-    for x in range(x_min, x_max + 1):
-        for y in range(y_min, y_max + 1):
-            bc = barycentric((x, y), p0, p1, p2)
-            alpha, beta, gamma = bc
+    for x in range(x_start, x_end + 1):
+        alpha_num = a_x * x + a_y * y_min + a_c
+        beta_num = b_x * x + b_y * y_min + b_c
+        # Linhas acima do retângulo de recorte: apenas avança as funções de aresta
+        for y in range(y_min, y_first):
+            alpha_num += a_y
+            beta_num += b_y
+        for y in range(y_first, y_max + 1):
+            alpha = alpha_num / area
+            beta = beta_num / area
+            gamma = 1 - alpha - beta
+            alpha_num += a_y
+            beta_num += b_y
             # Se qualquer coordenada baricêntrica for negativa, o ponto está fora do triângulo
             if alpha < 0 or beta < 0 or gamma < 0:
                 continue
             # Interpola a profundidade z
             z = alpha * v0[2] + beta * v1[2] + gamma * v2[2]
-            if z < z_buffer[y][x]:
-                z_buffer[y][x] = z
+            if z < z_buffer[y - oy][x - ox]:
+                z_buffer[y - oy][x - ox] = z
                 # Interpola a posição em view
                 P = [alpha * v0[i] + beta * v1[i] + gamma * v2[i] for i in range(3)]
                 # Interpola a normal e a normaliza
                 N_interp = [alpha * n0[i] + beta * n1[i] + gamma * n2[i] for i in range(3)]
                 N_interp = normalize(N_interp)
+                if gbuffer is not None:
+                    pixel = (y - oy) * gbuffer['width'] + x - ox
+                    gbuffer['position'][3 * pixel:3 * pixel + 3] = array('d', P)
+                    gbuffer['normal'][3 * pixel:3 * pixel + 3] = array('d', N_interp)
+                    gbuffer['coverage'][pixel] = 1
+                    continue
                 # Calcula a cor do pixel utilizando o modelo de Phong
-                color = compute_phong_color(P, N_interp, lighting, Pl_view)
-                draw_pixel(photo, x, y, color)
-
-def draw_mesh(photo, z_buffer, vertices_screen, vertices_view, normals_view, triangles, lighting, Pl_view):
+                if light_grid is None:
+                    color = compute_phong_color(P, N_interp, lighting, Pl_view)
+                else:
+                    tile_size = light_grid['tile_size']
+                    tile = (y // tile_size) * light_grid['tiles_x'] + x // tile_size
+                    color = compute_phong_color_lights(P, N_interp, lighting, light_grid['bins'][tile])
+                draw_pixel(framebuffer, x - ox, y - oy, color)
+
+def draw_mesh(framebuffer, z_buffer, vertices_screen, vertices_view, normals_view, triangles, lighting, Pl_view,
+              light_grid=None, setup=None):
     """
     Desenha a malha 3D triângulo a triângulo, aplicando a interpolação de valores e iluminação Phong.
 
+    Os triângulos são preparados em lote por setup_triangles (a menos que já venham
+    preparados em setup) e rasterizados na ordem original.
+
     Parâmetros:
-        photo (tk.PhotoImage): Objeto para desenho.
+        framebuffer (dict): Framebuffer RGB (create_framebuffer).
         z_buffer (list of list): Matriz de profundidade.
         vertices_screen (list): Lista de vértices em coordenadas de tela (sx, sy, z).
         vertices_view (list): Lista de vértices em view ([x,y,z]).
@@ -544,41 +915,1138 @@ def draw_mesh(photo, z_buffer, vertices_screen, vertices_view, normals_view, tri
         triangles (list): Lista de triângulos (índices 0-indexados).
         lighting (dict): Parâmetros de iluminação.
         Pl_view (list): Posição da luz em view.
+        light_grid (dict): Luzes distribuídas por tile (opcional, ver build_light_grid).
+        setup (dict): Triângulos já preparados por setup_triangles (opcional).
     """
-    for tri in triangles:
-        i0, i1, i2 = tri
-        # Extrai as coordenadas dos vértices de tela
-        p0 = (vertices_screen[i0][0], vertices_screen[i0][1])
-        p1 = (vertices_screen[i1][0], vertices_screen[i1][1])
-        p2 = (vertices_screen[i2][0], vertices_screen[i2][1])
-        # Extrai as coordenadas dos vértices em view
-        v0 = vertices_view[i0]
-        v1 = vertices_view[i1]
-        v2 = vertices_view[i2]
-        # Extrai as normais em view
-        n0 = normals_view[i0]
-        n1 = normals_view[i1]
-        n2 = normals_view[i2]
-        tri_data = {'p': [p0, p1, p2],
-                    'v': [v0, v1, v2],
-                    'n': [n0, n1, n2]}
-        fill_triangle_phong(photo, z_buffer, tri_data, lighting, Pl_view)
+    if setup is None:
+        setup = setup_triangles(vertices_screen, vertices_view, triangles,
+                                framebuffer['width'], framebuffer['height'])
+    for k in range(setup['count']):
+        fill_triangle_phong(framebuffer, z_buffer, setup, k, vertices_view, normals_view, triangles,
+                            lighting, Pl_view, light_grid)
 
 ###########################################
-# Função de Desenho de Pixel
+# Framebuffer e Função de Desenho de Pixel
 ###########################################
 
-def draw_pixel(photo, x, y, color):
+def create_framebuffer(width, height):
     """
-    Desenha um único pixel no objeto PhotoImage.
+    Cria um framebuffer RGB (8 bits por canal), inicialmente preto.
 
     Parâmetros:
-        photo (tk.PhotoImage): Objeto de desenho.
+        width (int): Largura da imagem.
+        height (int): Altura da imagem.
+
+    Retorna:
+        dict: Com chaves 'width', 'height' e 'pixels' (bytearray com largura*altura*3 bytes,
+              em ordem de linha).
+    """
+    return {'width': width, 'height': height, 'pixels': bytearray(width * height * 3)}
+
+def draw_pixel(framebuffer, x, y, color):
+    """
+    Desenha um único pixel no framebuffer.
+
+    Parâmetros:
+        framebuffer (dict): Framebuffer RGB (create_framebuffer).
         x, y (int): Coordenadas do pixel.
         color (tuple): Cor do pixel no formato (R, G, B).
     """
-    hex_color = "#%02x%02x%02x" % color
-    photo.put(hex_color, (x, y))
+    i = 3 * (y * framebuffer['width'] + x)
+    framebuffer['pixels'][i:i + 3] = color
+
+def put_framebuffer(photo, framebuffer):
+    """
+    Copia o framebuffer inteiro para o PhotoImage com uma única chamada a PhotoImage.put.
+
+    Parâmetros:
+        photo (tk.PhotoImage): Objeto de desenho.
+        framebuffer (dict): Framebuffer RGB (create_framebuffer).
+    """
+    row_size = 3 * framebuffer['width']
+    pixels = framebuffer['pixels']
+    rows = []
+    for y in range(framebuffer['height']):
+        row_hex = pixels[y * row_size:(y + 1) * row_size].hex()
+        rows.append("{" + " ".join("#" + row_hex[i:i + 6] for i in range(0, len(row_hex), 6)) + "}")
+    photo.put(" ".join(rows))
+
+def framebuffer_to_ppm(framebuffer):
+    """
+    Codifica o framebuffer como imagem PPM binária (P6).
+
+    Parâmetros:
+        framebuffer (dict): Framebuffer RGB (create_framebuffer).
+
+    Retorna:
+        bytes: Conteúdo do arquivo PPM.
+    """
+    header = b"P6\n%d %d\n255\n" % (framebuffer['width'], framebuffer['height'])
+    return header + framebuffer['pixels']
+
+def framebuffer_from_ppm(data):
+    """
+    Decodifica uma imagem PPM binária (P6), como a gerada por framebuffer_to_ppm.
+
+    Parâmetros:
+        data (bytes): Conteúdo do arquivo PPM.
+
+    Retorna:
+        dict: Framebuffer RGB.
+    """
+    magic, width, height = data.split(maxsplit=3)[:3]
+    width, height = int(width), int(height)
+    header = b"P6\n%d %d\n255\n" % (width, height)
+    if magic != b"P6" or not data.startswith(header):
+        raise ValueError("Formato PPM não suportado.")
+    framebuffer = create_framebuffer(width, height)
+    framebuffer['pixels'][:] = data[len(header):]
+    return framebuffer
+
+def write_ppm(framebuffer, filename):
+    """
+    Grava o framebuffer em um arquivo de imagem PPM binário (P6).
+
+    Parâmetros:
+        framebuffer (dict): Framebuffer RGB (create_framebuffer).
+        filename (str): Caminho do arquivo de saída.
+    """
+    with open(filename, "wb") as f:
+        f.write(framebuffer_to_ppm(framebuffer))
+
+###########################################
+# Pipeline de Renderização
+###########################################
+
+def jit_available():
+    """
+    Indica se o kernel compilado de phong_jit pode ser usado, verificando apenas se
+    NumPy e Numba estão instalados (sem importá-los).
+
+    Retorna:
+        bool: True se NumPy e Numba estiverem instalados.
+    """
+    return all(importlib.util.find_spec(name) is not None for name in ("numpy", "numba"))
+
+def view_transform(vertices, normals, camera, lighting, width, height):
+    """
+    Etapas 1 a 3 e 5 de render_scene: transforma os vértices, os normais e a luz
+    principal para o sistema de view e mapeia os vértices para coordenadas de tela.
+
+    Parâmetros:
+        vertices (list): Lista de vértices [x, y, z] em coordenadas do mundo.
+        normals (list): Normais dos vértices em coordenadas do mundo.
+        camera (dict): Parâmetros da câmera (load_camera).
+        lighting (dict): Parâmetros de iluminação (load_lighting). Se None, Pl_view é None.
+        width, height (int): Resolução da imagem.
+
+    Retorna:
+        tuple: (vertices_view, normals_view, vertices_screen, base da câmera, Pl_view)
+    """
+    # Transforma os vértices para o sistema de view
+    vertices_view, cam_basis = world_to_view(vertices, camera)
+    # Transforma os normais para o sistema de view usando a mesma base da câmera
+    normals_view = transform_normals(normals, cam_basis)
+    # Aplica a projeção em perspectiva
+    proj = perspective_projection(vertices_view, camera['d'])
+    # Converte as coordenadas projetadas para normalizadas
+    norm_coords = to_normalized(proj, camera['hx'], camera['hy'])
+    # Mapeia as coordenadas normalizadas para coordenadas de tela
+    vertices_screen = to_screen(norm_coords, width, height)
+
+    if lighting is None:
+        return vertices_view, normals_view, vertices_screen, cam_basis, None
+    # Transforma a posição da luz para o sistema de view
+    C = camera['C']
+    Pl_world = lighting['Pl']
+    Pl_rel = vec_sub(Pl_world, C)
+    u, v, n = cam_basis
+    Pl_view = [dot(Pl_rel, u), dot(Pl_rel, v), dot(Pl_rel, n)]
+    return vertices_view, normals_view, vertices_screen, cam_basis, Pl_view
+
+def render_scene(vertices, triangles, normals, camera, lighting, width, height, use_jit=None,
+                 framebuffer=None):
+    """
+    Executa o pipeline de renderização completo, sem depender da janela do Tkinter:
+      1. Transforma os vértices do mundo para o sistema de view.
+      2. Transforma os normais.
+      3. Aplica a projeção em perspectiva e mapeia para coordenadas de tela.
+      4. Inicializa o z-buffer e prepara os triângulos (setup_triangles).
+      5. Transforma a posição da luz para o sistema de view (e, com várias luzes,
+         distribui as luzes em tiles de tela).
+      6. Desenha a malha utilizando rasterização com z-buffer e iluminação Phong
+         (no kernel compilado, se disponível).
+
+    Parâmetros:
+        vertices (list): Lista de vértices [x, y, z] em coordenadas do mundo.
+        triangles (list): Lista de triângulos (índices 0-indexados).
+        normals (list): Normais dos vértices em coordenadas do mundo.
+        camera (dict): Parâmetros da câmera (load_camera).
+        lighting (dict): Parâmetros de iluminação (load_lighting).
+        width, height (int): Resolução da imagem.
+        use_jit (bool): Usa o kernel de phong_jit; None escolhe automaticamente.
+        framebuffer (dict): Framebuffer de destino, já limpo. Se None, cria um novo.
+
+    Retorna:
+        dict: O framebuffer renderizado.
+    """
+    if use_jit is None:
+        use_jit = jit_available()
+    if use_jit:
+        import phong_jit
+        use_jit = phong_jit.AVAILABLE
+    if framebuffer is None:
+        framebuffer = create_framebuffer(width, height)
+    cam = camera  # Parâmetros da câmera: N, V, d, hx, hy, C
+    vertices_view, normals_view, vertices_screen, cam_basis, Pl_view = view_transform(
+        vertices, normals, cam, lighting, width, height)
+
+    # Prepara todos os triângulos de uma vez (caixas, áreas, arestas, profundidades)
+    setup = setup_triangles(vertices_screen, vertices_view, triangles, width, height)
+
+    # Com várias luzes, distribui cada uma nos tiles de tela que ela pode atingir
+    light_grid = None
+    if len(lighting['lights']) > 1:
+        lights_view = lights_to_view(lighting['lights'], cam, cam_basis)
+        light_grid = build_light_grid(lights_view, setup, vertices_view, triangles, width, height)
+
+    # Desenha a malha com z-buffer e iluminação Phong
+    if use_jit:
+        phong_jit.draw_mesh_jit(framebuffer, vertices_view, normals_view, triangles,
+                                lighting, Pl_view, setup, light_grid)
+    else:
+        # Inicializa o z-buffer com valores grandes
+        z_buffer = [[1e9 for _ in range(width)] for _ in range(height)]
+        draw_mesh(framebuffer, z_buffer, vertices_screen, vertices_view, normals_view,
+                  triangles, lighting, Pl_view, light_grid, setup)
+    return framebuffer
+
+###########################################
+# Renderização por Tiles Fora da Memória
+###########################################
+
+# Lado (em pixels) dos tiles de render_scene_tiled
+RENDER_TILE_SIZE = 256
+
+def tile_light_grid(lights_view, setup, items, vertices_view, triangles, size):
+    """
+    Seleciona as luzes que podem atingir um tile (como build_light_grid, mas com uma
+    única caixa para todo o tile) e as devolve no formato de light_grid, com um único
+    bin válido em toda a imagem. As luzes descartadas têm atenuação zero em todos os
+    fragmentos do tile, e a ordem das demais é mantida: a imagem não se altera.
+
+    Parâmetros:
+        lights_view (list): Luzes {'Il', 'Pl', 'radius'} com 'Pl' em view.
+        setup (dict): Triângulos preparados por setup_triangles.
+        items (array): Posições, em setup, dos triângulos do tile.
+        vertices_view (list): Vértices em view ([x,y,z]).
+        triangles (list): Lista de triângulos (índices 0-indexados).
+        size (int): Maior dimensão da imagem (lado do bin único).
+
+    Retorna:
+        dict: Luzes do tile, no formato de build_light_grid.
+    """
+    inf = float('inf')
+    box = [inf, inf, inf, -inf, -inf, -inf]
+    for k in items:
+        for i in triangles[setup['tri'][k]]:
+            P = vertices_view[i]
+            for c in range(3):
+                if P[c] < box[c]:
+                    box[c] = P[c]
+                if P[c] > box[c + 3]:
+                    box[c + 3] = P[c]
+    lights = [light for light in lights_view if sphere_intersects_box(light['Pl'], light['radius'], box)]
+    return {'tile_size': size + 1, 'tiles_x': 1, 'lights': lights_view, 'bins': [lights]}
+
+def create_output_file(f, header, size):
+    """
+    Grava o cabeçalho da imagem e estende o arquivo até o tamanho final, sem escrever
+    os dados (que são preenchidos depois, faixa a faixa, por map_band).
+
+    Parâmetros:
+        f (file): Arquivo aberto em modo "w+b".
+        header (bytes): Cabeçalho da imagem.
+        size (int): Tamanho dos dados da imagem, em bytes.
+    """
+    f.write(header)
+    f.truncate(len(header) + size)
+    f.flush()
+
+def map_band(f, start, end):
+    """
+    Mapeia em memória o trecho [start, end) do arquivo. O início do mapeamento é
+    alinhado para baixo a mmap.ALLOCATIONGRANULARITY, como exige o sistema.
+
+    Parâmetros:
+        f (file): Arquivo aberto em modo "w+b".
+        start, end (int): Posições, em bytes, do trecho no arquivo.
+
+    Retorna:
+        tuple: (mmap.mmap, posição no arquivo do primeiro byte mapeado)
+    """
+    offset = start - start % mmap.ALLOCATIONGRANULARITY
+    return mmap.mmap(f.fileno(), end - offset, offset=offset), offset
+
+def render_scene_tiled(vertices, triangles, normals, camera, lighting, width, height, output,
+                       tile_size=RENDER_TILE_SIZE, use_jit=None, depth_output=None):
+    """
+    Renderiza a cena tile a tile diretamente em um arquivo PPM mapeado em memória, para
+    resoluções que não cabem na memória (pôsteres de 16k x 16k ou mais).
+
+    As transformações e a preparação dos triângulos (setup_triangles) são feitas uma vez;
+    cada triângulo é então associado aos tiles que sua caixa delimitadora cobre, e cada
+    tile é rasterizado com seu próprio z-buffer e framebuffer, apenas com esses
+    triângulos, na ordem original. A memória usada depende do tamanho do tile e da
+    malha, não do tamanho da imagem, e o resultado é idêntico ao de render_scene.
+
+    Parâmetros:
+        vertices (list): Lista de vértices [x, y, z] em coordenadas do mundo.
+        triangles (list): Lista de triângulos (índices 0-indexados).
+        normals (list): Normais dos vértices em coordenadas do mundo.
+        camera (dict): Parâmetros da câmera (load_camera).
+        lighting (dict): Parâmetros de iluminação (load_lighting).
+        width, height (int): Resolução da imagem.
+        output (str): Caminho da imagem PPM de saída.
+        tile_size (int): Lado dos tiles, em pixels.
+        use_jit (bool): Usa o kernel de phong_jit; None escolhe automaticamente.
+        depth_output (str): Se informado, grava também a profundidade (z em view; 1e9
+                            onde não há malha) nesse arquivo, em formato PFM.
+    """
+    if use_jit is None:
+        use_jit = jit_available()
+    if use_jit:
+        import phong_jit
+        use_jit = phong_jit.AVAILABLE
+    vertices_view, normals_view, vertices_screen, cam_basis, Pl_view = view_transform(
+        vertices, normals, camera, lighting, width, height)
+    setup = setup_triangles(vertices_screen, vertices_view, triangles, width, height)
+    lights_view = None
+    if len(lighting['lights']) > 1:
+        lights_view = lights_to_view(lighting['lights'], camera, cam_basis)
+    arrays = phong_jit.mesh_arrays(setup, triangles, vertices_view, normals_view) if use_jit else None
+
+    # Distribui os triângulos (posições em setup, em ordem) pelos tiles que cobrem
+    tiles_x = (width + tile_size - 1) // tile_size
+    tiles_y = (height + tile_size - 1) // tile_size
+    bins = [array('i') for _ in range(tiles_x * tiles_y)]
+    for k in range(setup['count']):
+        for ty in range(setup['y_min'][k] // tile_size, setup['y_max'][k] // tile_size + 1):
+            for tx in range(setup['x_min'][k] // tile_size, setup['x_max'][k] // tile_size + 1):
+                bins[ty * tiles_x + tx].append(k)
+
+    color_header = b"P6\n%d %d\n255\n" % (width, height)
+    # PFM: escala negativa indica little-endian; as linhas vão de baixo para cima
+    depth_header = b"Pf\n%d %d\n%s\n" % (width, height, b"-1.0" if sys.byteorder == "little" else b"1.0")
+    with contextlib.ExitStack() as stack:
+        color_file = stack.enter_context(open(output, "w+b"))
+        create_output_file(color_file, color_header, 3 * width * height)
+        depth_file = None
+        if depth_output is not None:
+            depth_file = stack.enter_context(open(depth_output, "w+b"))
+            create_output_file(depth_file, depth_header, 4 * width * height)
+        for ty in range(tiles_y):
+            # Só a faixa de linhas desta fileira de tiles fica mapeada em memória
+            y0, y1 = ty * tile_size, min((ty + 1) * tile_size, height) - 1
+            color_map, color_base = map_band(color_file, len(color_header) + 3 * y0 * width,
+                                             len(color_header) + 3 * (y1 + 1) * width)
+            color_base -= len(color_header)
+            if depth_file is not None:
+                depth_map, depth_base = map_band(depth_file, len(depth_header) + 4 * (height - 1 - y1) * width,
+                                                 len(depth_header) + 4 * (height - y0) * width)
+                depth_base -= len(depth_header)
+            for tx in range(tiles_x):
+                x0, x1 = tx * tile_size, min((tx + 1) * tile_size, width) - 1
+                tile_width = x1 - x0 + 1
+                items = bins[ty * tiles_x + tx]
+                framebuffer = create_framebuffer(tile_width, y1 - y0 + 1)
+                light_grid = None
+                if lights_view is not None:
+                    light_grid = tile_light_grid(lights_view, setup, items, vertices_view, triangles,
+                                                 max(width, height))
+                if use_jit:
+                    z_buffer = phong_jit.draw_mesh_jit(framebuffer, vertices_view, normals_view, triangles,
+                                                       lighting, Pl_view, setup, light_grid,
+                                                       clip=(x0, y0, x1, y1), items=items, arrays=arrays)
+                else:
+                    z_buffer = [[1e9] * tile_width for _ in range(y1 - y0 + 1)]
+                    for k in items:
+                        fill_triangle_phong(framebuffer, z_buffer, setup, k, vertices_view, normals_view,
+                                            triangles, lighting, Pl_view, light_grid, (x0, y0, x1, y1))
+                # Copia o tile, linha a linha, para as faixas mapeadas em memória
+                row_size = 3 * tile_width
+                for r in range(y1 - y0 + 1):
+                    start = 3 * ((y0 + r) * width + x0) - color_base
+                    color_map[start:start + row_size] = framebuffer['pixels'][r * row_size:(r + 1) * row_size]
+                    if depth_file is not None:
+                        start = 4 * ((height - 1 - y0 - r) * width + x0) - depth_base
+                        depth_map[start:start + 4 * tile_width] = array('f', z_buffer[r]).tobytes()
+            color_map.close()
+            if depth_file is not None:
+                depth_map.close()
+
+def render_cache_key(mesh_digest, camera, lighting, width, height, raytrace=False):
+    """
+    Gera a chave do cache de imagens para uma renderização.
+
+    Parâmetros:
+        mesh_digest (str): Hash do conteúdo do arquivo da malha (render_cache.file_digest).
+        camera (dict): Parâmetros da câmera.
+        lighting (dict): Parâmetros de iluminação.
+        width, height (int): Resolução da imagem.
+        raytrace (bool): A imagem é gerada por render_scene_raytraced.
+
+    Retorna:
+        str: Chave do cache.
+    """
+    if raytrace:
+        return render_cache.make_key(mesh_digest, camera, lighting, width, height, RENDERER_VERSION, "raytrace")
+    return render_cache.make_key(mesh_digest, camera, lighting, width, height, RENDERER_VERSION)
+
+###########################################
+# Reiluminação a partir de um G-Buffer
+###########################################
+
+# Número de configurações de iluminação iluminadas em cada passada pelo G-buffer
+RELIGHT_BATCH_SIZE = 16
+
+def build_gbuffer(vertices, triangles, normals, camera, width, height, use_jit=None):
+    """
+    Rasteriza a malha uma única vez, sem iluminação, guardando para cada pixel a posição
+    e a normal (em view) do fragmento visível. A cor de um pixel em render_scene depende
+    apenas desses dois valores e da iluminação, de modo que shade_gbuffer reproduz
+    exatamente a imagem de render_scene para qualquer lighting.txt com a mesma malha,
+    câmera e resolução.
+
+    Parâmetros:
+        vertices (list): Lista de vértices [x, y, z] em coordenadas do mundo.
+        triangles (list): Lista de triângulos (índices 0-indexados).
+        normals (list): Normais dos vértices em coordenadas do mundo.
+        camera (dict): Parâmetros da câmera (load_camera).
+        width, height (int): Resolução da imagem.
+        use_jit (bool): Usa o kernel de phong_jit; None escolhe automaticamente.
+
+    Retorna:
+        dict: Com chaves 'width', 'height', 'camera', 'cam_basis', 'position' e 'normal'
+              (array('d'), 3 valores por pixel) e 'coverage' (bytearray, 1 nos pixels
+              cobertos pela malha).
+    """
+    if use_jit is None:
+        use_jit = jit_available()
+    if use_jit:
+        import phong_jit
+        use_jit = phong_jit.AVAILABLE
+    vertices_view, normals_view, vertices_screen, cam_basis, _ = view_transform(
+        vertices, normals, camera, None, width, height)
+    setup = setup_triangles(vertices_screen, vertices_view, triangles, width, height)
+    gbuffer = {'width': width, 'height': height, 'camera': camera, 'cam_basis': cam_basis,
+               'position': array('d', bytes(24 * width * height)),
+               'normal': array('d', bytes(24 * width * height)),
+               'coverage': bytearray(width * height)}
+    if use_jit:
+        phong_jit.draw_mesh_jit(None, vertices_view, normals_view, triangles, None, None, setup,
+                                gbuffer=gbuffer)
+    else:
+        z_buffer = [[1e9 for _ in range(width)] for _ in range(height)]
+        for k in range(setup['count']):
+            fill_triangle_phong(None, z_buffer, setup, k, vertices_view, normals_view, triangles,
+                                None, None, gbuffer=gbuffer)
+    return gbuffer
+
+def shade_gbuffer(gbuffer, batch, use_jit=None):
+    """
+    Ilumina o G-buffer com várias configurações de iluminação de uma vez. Cada ponto é
+    lido uma única vez para todo o lote; a direção da visão e os termos geométricos
+    (light_terms) de cada posição de luz distinta do lote também são calculados uma
+    única vez por ponto, de modo que configurações que mudam apenas cores e
+    coeficientes custam pouco mais que o cálculo de light_contribution.
+
+    Parâmetros:
+        gbuffer (dict): G-buffer de build_gbuffer.
+        batch (list): Parâmetros de iluminação (load_lighting) de cada configuração.
+        use_jit (bool): Usa o kernel de phong_jit; None escolhe automaticamente.
+
+    Retorna:
+        list: Um framebuffer por configuração, idêntico ao de render_scene.
+    """
+    if use_jit is None:
+        use_jit = jit_available()
+    if use_jit:
+        import phong_jit
+        use_jit = phong_jit.AVAILABLE
+    # Com uma única luz de raio infinito, compute_phong_color_lights equivale a compute_phong_color;
+    # luzes descartadas pelos tiles de build_light_grid não atingem o ponto e são puladas aqui
+    geometry = {}
+    batch_lights = []
+    for lighting in batch:
+        lights_view = lights_to_view(lighting['lights'], gbuffer['camera'], gbuffer['cam_basis'])
+        batch_lights.append([(geometry.setdefault((tuple(light['Pl']), light['radius']), len(geometry)),
+                              light['Il']) for light in lights_view])
+    geometry = list(geometry)
+    if use_jit:
+        return phong_jit.shade_gbuffer_jit(gbuffer, batch, batch_lights, geometry)
+    framebuffers = [create_framebuffer(gbuffer['width'], gbuffer['height']) for _ in batch]
+    ambients = [vec_scalar_mult(lighting['Iamb'], lighting['Ka']) for lighting in batch]
+    position = gbuffer['position']
+    normal = gbuffer['normal']
+    for pixel, covered in enumerate(gbuffer['coverage']):
+        if not covered:
+            continue
+        p = 3 * pixel
+        P = position[p:p + 3]
+        N = normal[p:p + 3]
+        Vp = normalize(vec_scalar_mult(P, -1))
+        terms = [light_terms(P, N, Vp, Pl, radius) for Pl, radius in geometry]
+        for framebuffer, lighting, ambient, lights in zip(framebuffers, batch, ambients, batch_lights):
+            color = ambient
+            for k, Il in lights:
+                if terms[k][0] == 0:
+                    continue
+                color = vec_add(color, light_contribution(Il, lighting, *terms[k]))
+            color = vec_clamp(color, 0, 255)
+            framebuffer['pixels'][p:p + 3] = (int(color[0]), int(color[1]), int(color[2]))
+    return framebuffers
+
+def relight(gbuffer, lightings, batch_size=RELIGHT_BATCH_SIZE, use_jit=None):
+    """
+    Gera as imagens de uma sequência de configurações de iluminação a partir de um
+    G-buffer, em lotes de batch_size configurações (ver shade_gbuffer).
+
+    Parâmetros:
+        gbuffer (dict): G-buffer de build_gbuffer.
+        lightings (list): Parâmetros de iluminação (load_lighting) de cada configuração.
+        batch_size (int): Número de configurações por passada pelo G-buffer.
+        use_jit (bool): Usa o kernel de phong_jit; None escolhe automaticamente.
+
+    Retorna:
+        generator: Um framebuffer por configuração, na ordem de 'lightings'.
+    """
+    for start in range(0, len(lightings), batch_size):
+        yield from shade_gbuffer(gbuffer, lightings[start:start + batch_size], use_jit)
+
+###########################################
+# Visualizações de Depuração da Rasterização
+###########################################
+
+# Modos de depuração (render_debug_view): fragmentos testados no z-buffer por pixel,
+# fragmentos iluminados por pixel, pixels visitados nas caixas delimitadoras por pixel e
+# aproveitamento (área coberta / área da caixa) do triângulo visível em cada pixel
+DEBUG_VIEWS = ('tested', 'shaded', 'visited', 'coverage')
+
+# Cores do mapa de calor, de valores baixos (azul) a altos (vermelho)
+HEATMAP_COLORS = ((0, 0, 255), (0, 255, 255), (0, 255, 0), (255, 255, 0), (255, 0, 0))
+
+def rasterization_stats(setup, vertices_view, triangles, width, height):
+    """
+    Percorre os triângulos exatamente como fill_triangle_phong (mesmas funções de aresta,
+    mesma interpolação de profundidade e mesmo z-buffer), mas sem iluminar, contando o
+    trabalho feito em cada pixel e em cada triângulo.
+
+    Parâmetros:
+        setup (dict): Triângulos preparados por setup_triangles.
+        vertices_view (list): Vértices em view ([x,y,z]).
+        triangles (list): Lista de triângulos (índices 0-indexados).
+        width, height (int): Dimensões da tela.
+
+    Retorna:
+        dict: Com as chaves
+          'width', 'height' : dimensões da tela.
+          'visited' : por pixel, quantas caixas delimitadoras o percorreram.
+          'tested'  : por pixel, quantos fragmentos (dentro de um triângulo) foram testados no z-buffer.
+          'shaded'  : por pixel, quantos fragmentos passaram no z-buffer e foram iluminados.
+          'owner'   : por pixel, posição em setup do triângulo visível (-1 se nenhum).
+          'tri'     : por triângulo de setup, seu índice em triangles.
+          'tri_visited', 'tri_covered' : por triângulo de setup, área percorrida da caixa e
+                                         área coberta (fragmentos testados).
+    """
+    size = width * height
+    stats = {'width': width, 'height': height,
+             'visited': array('i', bytes(4 * size)), 'tested': array('i', bytes(4 * size)),
+             'shaded': array('i', bytes(4 * size)), 'owner': array('i', [-1]) * size,
+             'tri': setup['tri'], 'tri_visited': array('i'), 'tri_covered': array('i')}
+    visited, tested, shaded, owner = stats['visited'], stats['tested'], stats['shaded'], stats['owner']
+    z_buffer = [[1e9 for _ in range(width)] for _ in range(height)]
+    for k in range(setup['count']):
+        i0, i1, i2 = triangles[setup['tri'][k]]
+        z0, z1, z2 = vertices_view[i0][2], vertices_view[i1][2], vertices_view[i2][2]
+        area = setup['area'][k]
+        e = 6 * k
+        a_x, a_y, a_c, b_x, b_y, b_c = setup['edge'][e:e + 6]
+        y_min = setup['y_min'][k]
+        y_max = setup['y_max'][k]
+        covered = 0
+        for x in range(setup['x_min'][k], setup['x_max'][k] + 1):
+            alpha_num = a_x * x + a_y * y_min + a_c
+            beta_num = b_x * x + b_y * y_min + b_c
+            for y in range(y_min, y_max + 1):
+                pixel = y * width + x
+                visited[pixel] += 1
+                alpha = alpha_num / area
+                beta = beta_num / area
+                gamma = 1 - alpha - beta
+                alpha_num += a_y
+                beta_num += b_y
+                if alpha < 0 or beta < 0 or gamma < 0:
+                    continue
+                covered += 1
+                tested[pixel] += 1
+                z = alpha * z0 + beta * z1 + gamma * z2
+                if z < z_buffer[y][x]:
+                    z_buffer[y][x] = z
+                    shaded[pixel] += 1
+                    owner[pixel] = k
+        stats['tri_visited'].append((setup['x_max'][k] - setup['x_min'][k] + 1) * (y_max - y_min + 1))
+        stats['tri_covered'].append(covered)
+    return stats
+
+def heat_color(t):
+    """
+    Converte um valor entre 0 e 1 em uma cor do mapa de calor (HEATMAP_COLORS).
+
+    Parâmetros:
+        t (float): Valor normalizado.
+
+    Retorna:
+        tuple: Cor (R, G, B).
+    """
+    t = min(max(t, 0.0), 1.0) * (len(HEATMAP_COLORS) - 1)
+    i = min(int(t), len(HEATMAP_COLORS) - 2)
+    f = t - i
+    c0, c1 = HEATMAP_COLORS[i], HEATMAP_COLORS[i + 1]
+    return tuple(int(c0[j] + (c1[j] - c0[j]) * f) for j in range(3))
+
+def debug_heatmap(stats, mode):
+    """
+    Gera o mapa de calor de um modo de depuração (DEBUG_VIEWS) a partir de
+    rasterization_stats. Nos modos de contagem, a escala vai de 1 (azul) ao máximo
+    da imagem (vermelho); no modo 'coverage', de área da caixa toda coberta (azul) a
+    quase nada coberto (vermelho). Pixels sem fragmentos ficam pretos.
+
+    Parâmetros:
+        stats (dict): Resultado de rasterization_stats.
+        mode (str): Um dos modos de DEBUG_VIEWS.
+
+    Retorna:
+        dict: Framebuffer RGB com o mapa de calor.
+    """
+    framebuffer = create_framebuffer(stats['width'], stats['height'])
+    pixels = framebuffer['pixels']
+    if mode == 'coverage':
+        waste = [1 - covered / visited for covered, visited in zip(stats['tri_covered'], stats['tri_visited'])]
+        for pixel, k in enumerate(stats['owner']):
+            if k >= 0:
+                pixels[3 * pixel:3 * pixel + 3] = heat_color(waste[k])
+        return framebuffer
+    counts = stats[mode]
+    top = max(counts)
+    for pixel, count in enumerate(counts):
+        if count:
+            pixels[3 * pixel:3 * pixel + 3] = heat_color((count - 1) / (top - 1) if top > 1 else 0.0)
+    return framebuffer
+
+def print_debug_stats(stats, worst=5):
+    """
+    Mostra no terminal os totais de rasterization_stats: pixels cobertos, fragmentos
+    visitados, testados e iluminados, complexidade de profundidade, overdraw,
+    aproveitamento das caixas delimitadoras e os triângulos com maior área desperdiçada.
+
+    Parâmetros:
+        stats (dict): Resultado de rasterization_stats.
+        worst (int): Número de triângulos com maior desperdício a listar.
+    """
+    covered_pixels = sum(1 for count in stats['tested'] if count)
+    visited = sum(stats['tri_visited'])
+    tested = sum(stats['tri_covered'])
+    shaded = sum(stats['shaded'])
+    per_pixel = max(covered_pixels, 1)
+    print(f"Pixels cobertos: {covered_pixels} de {stats['width'] * stats['height']}")
+    print(f"Triângulos rasterizados: {len(stats['tri_visited'])}")
+    print(f"Pixels visitados nas caixas delimitadoras: {visited} "
+          f"(aproveitamento: {100 * tested / max(visited, 1):.1f}% dentro dos triângulos)")
+    print(f"Fragmentos testados no z-buffer: {tested} "
+          f"(complexidade de profundidade média {tested / per_pixel:.2f}, máxima {max(stats['tested'])})")
+    print(f"Fragmentos iluminados: {shaded} "
+          f"(overdraw médio {shaded / per_pixel:.2f}, máximo {max(stats['shaded'])}; "
+          f"{shaded - covered_pixels} iluminados e depois cobertos)")
+    order = sorted(range(len(stats['tri_visited'])),
+                   key=lambda k: stats['tri_covered'][k] - stats['tri_visited'][k])[:worst]
+    for k in order:
+        print(f"  triângulo {stats['tri'][k]}: caixa {stats['tri_visited'][k]} px, coberto {stats['tri_covered'][k]} px")
+
+def render_debug_view(vertices, triangles, normals, camera, width, height, mode):
+    """
+    Renderiza um mapa de calor de depuração (DEBUG_VIEWS) no lugar da imagem iluminada,
+    com a mesma câmera e resolução de render_scene.
+
+    Parâmetros:
+        vertices (list): Lista de vértices [x, y, z] em coordenadas do mundo.
+        triangles (list): Lista de triângulos (índices 0-indexados).
+        normals (list): Normais dos vértices em coordenadas do mundo.
+        camera (dict): Parâmetros da câmera (load_camera).
+        width, height (int): Resolução da imagem.
+        mode (str): Um dos modos de DEBUG_VIEWS.
+
+    Retorna:
+        tuple: (framebuffer com o mapa de calor, estatísticas de rasterization_stats)
+    """
+    vertices_view, normals_view, vertices_screen, cam_basis, _ = view_transform(
+        vertices, normals, camera, None, width, height)
+    setup = setup_triangles(vertices_screen, vertices_view, triangles, width, height)
+    stats = rasterization_stats(setup, vertices_view, triangles, width, height)
+    return debug_heatmap(stats, mode), stats
+
+###########################################
+# Traçado de Raios com BVH e Sombras
+###########################################
+
+# Número máximo de triângulos em uma folha da BVH
+BVH_LEAF_SIZE = 4
+
+# Substitui 1/0 no teste de lâminas (evita inf * 0 = nan quando o raio é paralelo a um eixo)
+RAY_INV_LIMIT = 1e30
+
+# Fração da distância até a luz abaixo da qual um acerto do raio de sombra é ignorado
+# (evita que o ponto seja sombreado pelos triângulos vizinhos na mesma superfície)
+SHADOW_EPSILON = 1e-6
+
+def build_bvh(vertices, triangles, leaf_size=BVH_LEAF_SIZE):
+    """
+    Constrói uma hierarquia de volumes envolventes (BVH) sobre os triângulos da malha,
+    dividindo cada nó na mediana dos centroides ao longo do eixo de maior extensão.
+
+    Os nós ficam em arrays planos (estrutura de arrays, como em setup_triangles). Em um
+    nó interno, count == 0, os filhos são first e first + 1 e 'axis' é o eixo da divisão;
+    em uma folha, os triângulos são order[first:first + count]. Para a interseção,
+    'tri' guarda, na ordem de 'order', o primeiro vértice e as duas arestas de cada
+    triângulo (9 valores).
+
+    Parâmetros:
+        vertices (list): Lista de vértices [x, y, z].
+        triangles (list): Lista de triângulos (índices 0-indexados).
+        leaf_size (int): Número máximo de triângulos por folha.
+
+    Retorna:
+        dict: Com as chaves 'bounds' (6 valores por nó), 'first', 'count', 'axis',
+              'order' e 'tri'.
+    """
+    centroids = [[vertices[i0][k] + vertices[i1][k] + vertices[i2][k] for k in range(3)]
+                 for i0, i1, i2 in triangles]
+    order = list(range(len(triangles)))
+    first = [0]
+    count = [len(order)]
+    axes = [0]
+    stack = [(0, 0, len(order))]
+    while stack:
+        node, start, end = stack.pop()
+        first[node] = start
+        count[node] = end - start
+        if end - start <= leaf_size:
+            continue
+        ids = order[start:end]
+        extents = []
+        for k in range(3):
+            values = [centroids[t][k] for t in ids]
+            extents.append(max(values) - min(values))
+        if max(extents) == 0:
+            continue  # centroides coincidentes: mantém como folha
+        axis = extents.index(max(extents))
+        ids.sort(key=lambda t: centroids[t][axis])
+        order[start:end] = ids
+        mid = (start + end) // 2
+        left = len(first)
+        first += [0, 0]
+        count += [0, 0]
+        axes += [0, 0]
+        first[node] = left
+        count[node] = 0
+        axes[node] = axis
+        stack.append((left, start, mid))
+        stack.append((left + 1, mid, end))
+
+    # Caixas de baixo para cima: os filhos sempre têm índice maior que o pai
+    bounds = [0.0] * (6 * len(first))
+    for node in range(len(first) - 1, -1, -1):
+        b = 6 * node
+        if count[node] == 0:
+            l = 6 * first[node]
+            bounds[b:b + 6] = [min(bounds[l + k], bounds[l + 6 + k]) for k in range(3)] + \
+                              [max(bounds[l + 3 + k], bounds[l + 9 + k]) for k in range(3)]
+            continue
+        points = [vertices[i] for t in order[first[node]:first[node] + count[node]] for i in triangles[t]]
+        bounds[b:b + 6] = [min(p[k] for p in points) for k in range(3)] + \
+                          [max(p[k] for p in points) for k in range(3)]
+
+    tri = array('d')
+    for t in order:
+        v0, v1, v2 = (vertices[i] for i in triangles[t])
+        tri.extend(v0)
+        tri.extend(vec_sub(v1, v0))
+        tri.extend(vec_sub(v2, v0))
+    return {'bounds': array('d', bounds), 'first': array('i', first), 'count': array('i', count),
+            'axis': array('b', axes), 'order': array('i', order), 'tri': tri}
+
+def intersect_bvh(bvh, origin, direction, t_max=float('inf'), t_min=0.0, skip=-1, any_hit=False):
+    """
+    Interseção de um raio com a malha, percorrendo a BVH (filho mais próximo primeiro e
+    descartando as caixas além do melhor acerto). Os triângulos são testados com o
+    algoritmo de Möller-Trumbore.
+
+    Parâmetros:
+        bvh (dict): BVH construída por build_bvh.
+        origin (list): Origem do raio [x, y, z].
+        direction (list): Direção do raio (não precisa ser normalizada; t é medido nela).
+        t_max (float): Só considera acertos com t < t_max.
+        t_min (float): Só considera acertos com t > t_min.
+        skip (int): Triângulo ignorado (o triângulo de origem de um raio de sombra).
+        any_hit (bool): Retorna o primeiro acerto encontrado, não o mais próximo
+                        (basta para saber se há oclusão).
+
+    Retorna:
+        tuple: (t, índice do triângulo, u, v), com u e v os pesos do segundo e do
+               terceiro vértice, ou None se o raio não atinge a malha.
+    """
+    bounds, first, count, axes = bvh['bounds'], bvh['first'], bvh['count'], bvh['axis']
+    order, tri = bvh['order'], bvh['tri']
+    if not order:
+        return None
+    ox, oy, oz = origin
+    dx, dy, dz = direction
+    ix = 1.0 / dx if dx != 0 else RAY_INV_LIMIT
+    iy = 1.0 / dy if dy != 0 else RAY_INV_LIMIT
+    iz = 1.0 / dz if dz != 0 else RAY_INV_LIMIT
+    negative = (dx < 0, dy < 0, dz < 0)
+    best = None
+    best_t = t_max
+    stack = [0]
+    while stack:
+        node = stack.pop()
+        # Teste de lâminas (slabs) contra a caixa do nó
+        b = 6 * node
+        t_near = t_min
+        t_far = best_t
+        t1 = (bounds[b] - ox) * ix
+        t2 = (bounds[b + 3] - ox) * ix
+        if t1 > t2:
+            t1, t2 = t2, t1
+        if t1 > t_near:
+            t_near = t1
+        if t2 < t_far:
+            t_far = t2
+        t1 = (bounds[b + 1] - oy) * iy
+        t2 = (bounds[b + 4] - oy) * iy
+        if t1 > t2:
+            t1, t2 = t2, t1
+        if t1 > t_near:
+            t_near = t1
+        if t2 < t_far:
+            t_far = t2
+        t1 = (bounds[b + 2] - oz) * iz
+        t2 = (bounds[b + 5] - oz) * iz
+        if t1 > t2:
+            t1, t2 = t2, t1
+        if t1 > t_near:
+            t_near = t1
+        if t2 < t_far:
+            t_far = t2
+        if t_near > t_far:
+            continue
+        n = count[node]
+        if n == 0:
+            # Empilha o filho mais distante primeiro, para visitar antes o mais próximo
+            left = first[node]
+            if negative[axes[node]]:
+                stack.append(left)
+                stack.append(left + 1)
+            else:
+                stack.append(left + 1)
+                stack.append(left)
+            continue
+        for k in range(first[node], first[node] + n):
+            if order[k] == skip:
+                continue
+            ax, ay, az, e1x, e1y, e1z, e2x, e2y, e2z = tri[9 * k:9 * k + 9]
+            px = dy * e2z - dz * e2y
+            py = dz * e2x - dx * e2z
+            pz = dx * e2y - dy * e2x
+            det = e1x * px + e1y * py + e1z * pz
+            if det == 0:
+                continue
+            inv = 1.0 / det
+            sx = ox - ax
+            sy = oy - ay
+            sz = oz - az
+            u = (sx * px + sy * py + sz * pz) * inv
+            if u < 0 or u > 1:
+                continue
+            qx = sy * e1z - sz * e1y
+            qy = sz * e1x - sx * e1z
+            qz = sx * e1y - sy * e1x
+            v = (dx * qx + dy * qy + dz * qz) * inv
+            if v < 0 or u + v > 1:
+                continue
+            t = (e2x * qx + e2y * qy + e2z * qz) * inv
+            if t_min < t < best_t:
+                best_t = t
+                best = (t, order[k], u, v)
+                if any_hit:
+                    return best
+    return best
+
+def shade_ray_hit(scene, P, tri, u, v):
+    """
+    Cor do ponto P (em view) atingido por um raio primário no triângulo tri, com os
+    mesmos parâmetros de Phong da rasterização (compute_phong_color_lights). As luzes
+    bloqueadas por outro triângulo (raio de sombra) contribuem apenas com o ambiente.
+
+    Parâmetros:
+        scene (dict): Cena preparada por render_scene_raytraced.
+        P (list): Ponto atingido, em view.
+        tri (int): Índice do triângulo atingido.
+        u, v (float): Pesos do segundo e do terceiro vértice do triângulo.
+
+    Retorna:
+        tuple: Cor (R, G, B) com valores inteiros (0-255).
+    """
+    i0, i1, i2 = scene['triangles'][tri]
+    normals_view = scene['normals_view']
+    n0, n1, n2 = normals_view[i0], normals_view[i1], normals_view[i2]
+    alpha = 1 - u - v
+    N = normalize([alpha * n0[i] + u * n1[i] + v * n2[i] for i in range(3)])
+    visible = []
+    for light in scene['lights_view']:
+        to_light = vec_sub(light['Pl'], P)
+        if light_falloff(to_light, light['radius']) == 0:
+            continue
+        if scene['shadows'] and intersect_bvh(scene['bvh'], P, to_light, 1.0, SHADOW_EPSILON,
+                                              tri, any_hit=True) is not None:
+            continue
+        visible.append(light)
+    return compute_phong_color_lights(P, N, scene['lighting'], visible)
+
+def trace_rows(scene, y_start, y_end):
+    """
+    Traça os raios primários (pelo centro de cada pixel) das linhas y_start a y_end - 1.
+
+    Parâmetros:
+        scene (dict): Cena preparada por render_scene_raytraced.
+        y_start, y_end (int): Intervalo de linhas da imagem.
+
+    Retorna:
+        bytearray: Pixels RGB das linhas, em ordem de linha.
+    """
+    width, height = scene['width'], scene['height']
+    sx = scene['hx'] / scene['d']
+    sy = scene['hy'] / scene['d']
+    bvh = scene['bvh']
+    origin = [0.0, 0.0, 0.0]  # A câmera é a origem do sistema de vista
+    pixels = bytearray(3 * width * (y_end - y_start))
+    for y in range(y_start, y_end):
+        dy = (1 - 2 * (y + 0.5) / height) * sy
+        row = 3 * width * (y - y_start)
+        for x in range(width):
+            direction = [(2 * (x + 0.5) / width - 1) * sx, dy, 1.0]
+            hit = intersect_bvh(bvh, origin, direction)
+            if hit is None:
+                continue
+            t, tri, u, v = hit
+            P = [t * direction[0], t * direction[1], t]
+            i = row + 3 * x
+            pixels[i:i + 3] = shade_ray_hit(scene, P, tri, u, v)
+    return pixels
+
+# Cena usada pelos processos do pool de render_scene_raytraced (ver init_ray_worker)
+_ray_scene = None
+
+def init_ray_worker(scene):
+    """
+    Inicializa um processo do pool com a cena, enviada uma única vez por processo.
+    """
+    global _ray_scene
+    _ray_scene = scene
+
+def trace_rows_worker(rows):
+    """
+    Traça um bloco de linhas (y_start, y_end) em um processo do pool.
+
+    Retorna:
+        tuple: (y_start, pixels do bloco)
+    """
+    return rows[0], trace_rows(_ray_scene, rows[0], rows[1])
+
+def render_scene_raytraced(vertices, triangles, normals, camera, lighting, width, height,
+                           workers=None, shadows=True, framebuffer=None):
+    """
+    Renderiza a cena por traçado de raios, como alternativa a render_scene: um raio
+    primário por pixel e, no ponto atingido, um raio de sombra para cada luz, ambos
+    acelerados por uma BVH sobre os triângulos em view. Usa a mesma base de câmera
+    (world_to_view) e os mesmos parâmetros de Phong (load_lighting) da rasterização,
+    mas as luzes bloqueadas por outra parte da malha não iluminam o ponto.
+
+    As linhas da imagem são divididas em blocos traçados em paralelo por um pool de
+    'workers' processos (padrão: número de CPUs; workers=1 traça no processo atual).
+
+    Parâmetros:
+        vertices (list): Lista de vértices [x, y, z] em coordenadas do mundo.
+        triangles (list): Lista de triângulos (índices 0-indexados).
+        normals (list): Normais dos vértices em coordenadas do mundo.
+        camera (dict): Parâmetros da câmera (load_camera).
+        lighting (dict): Parâmetros de iluminação (load_lighting).
+        width, height (int): Resolução da imagem.
+        workers (int): Número de processos.
+        shadows (bool): Traça os raios de sombra.
+        framebuffer (dict): Framebuffer de destino. Se None, cria um novo.
+
+    Retorna:
+        dict: O framebuffer renderizado.
+    """
+    if framebuffer is None:
+        framebuffer = create_framebuffer(width, height)
+    vertices_view, cam_basis = world_to_view(vertices, camera)
+    scene = {'bvh': build_bvh(vertices_view, triangles),
+             'triangles': triangles,
+             'normals_view': transform_normals(normals, cam_basis),
+             'lighting': lighting,
+             'lights_view': lights_to_view(lighting['lights'], camera, cam_basis),
+             'shadows': shadows,
+             'width': width, 'height': height,
+             'd': camera['d'], 'hx': camera['hx'], 'hy': camera['hy']}
+    workers = workers or os.cpu_count() or 1
+    row_size = 3 * width
+    if workers == 1 or height < 2:
+        framebuffer['pixels'][:] = trace_rows(scene, 0, height)
+        return framebuffer
+    # Blocos pequenos equilibram a carga: as linhas que cruzam a malha custam mais
+    block = max(1, height // (8 * workers))
+    blocks = [(y, min(y + block, height)) for y in range(0, height, block)]
+    with multiprocessing.Pool(workers, initializer=init_ray_worker, initargs=(scene,)) as pool:
+        for y_start, pixels in pool.imap_unordered(trace_rows_worker, blocks):
+            framebuffer['pixels'][y_start * row_size:y_start * row_size + len(pixels)] = pixels
+    return framebuffer
+
+###########################################
+# Navegação Interativa da Câmera
+###########################################
+
+# Velocidades de navegação: radianos por pixel (órbita), fração da distância ao
+# pivô por pixel (pan) e fator de aproximação por passo da roda do mouse (zoom).
+ORBIT_SPEED = 0.01
+PAN_SPEED = 0.002
+ZOOM_FACTOR = 0.9
+
+# Escala dinâmica de resolução durante a interação: tempo-alvo por quadro (s),
+# fator máximo de redução e espera (ms) sem eventos antes do quadro final em resolução cheia.
+TARGET_FRAME_TIME = 0.05
+MAX_PREVIEW_FACTOR = 8
+IDLE_RENDER_DELAY = 250
+
+def rotate_vector(vec, axis, angle):
+    """
+    Rotaciona o vetor vec em torno do eixo (normalizado) pelo ângulo dado (fórmula de Rodrigues).
+
+    Parâmetros:
+        vec (list): Vetor a rotacionar.
+        axis (list): Eixo de rotação normalizado.
+        angle (float): Ângulo em radianos.
+
+    Retorna:
+        list: Vetor rotacionado.
+    """
+    cos_a = math.cos(angle)
+    sin_a = math.sin(angle)
+    k_dot = dot(axis, vec) * (1 - cos_a)
+    k_cross = cross(axis, vec)
+    return [vec[i] * cos_a + k_cross[i] * sin_a + axis[i] * k_dot for i in range(3)]
+
+def mesh_center(vertices):
+    """
+    Calcula o centro da caixa envolvente da malha, usado como pivô da órbita.
+
+    Parâmetros:
+        vertices (list): Lista de vértices [x, y, z].
+
+    Retorna:
+        list: Centro [x, y, z].
+    """
+    if not vertices:
+        return [0.0, 0.0, 0.0]
+    return [(min(v[i] for v in vertices) + max(v[i] for v in vertices)) / 2 for i in range(3)]
+
+def orbit_camera(camera, pivot, yaw, pitch):
+    """
+    Gira a câmera em torno do pivô: yaw em torno do vetor V e pitch em torno do vetor
+    à direita. C, N e V giram juntos, de modo que a base da câmera continua ortonormal.
+
+    Parâmetros:
+        camera (dict): Parâmetros da câmera.
+        pivot (list): Ponto em torno do qual a câmera gira.
+        yaw, pitch (float): Ângulos em radianos.
+
+    Retorna:
+        dict: Novos parâmetros da câmera.
+    """
+    N = normalize(camera['N'])
+    V = normalize(camera['V'])
+    offset = vec_sub(camera['C'], pivot)
+    offset = rotate_vector(offset, V, yaw)
+    N = rotate_vector(N, V, yaw)
+    right = normalize(cross(V, N))
+    offset = rotate_vector(offset, right, pitch)
+    N = rotate_vector(N, right, pitch)
+    V = rotate_vector(V, right, pitch)
+    return dict(camera, C=vec_add(pivot, offset), N=N, V=V)
+
+def pan_camera(camera, dx, dy):
+    """
+    Desloca a câmera no plano da imagem (ao longo dos vetores à direita e V).
+
+    Parâmetros:
+        camera (dict): Parâmetros da câmera.
+        dx, dy (float): Deslocamento em unidades do mundo.
+
+    Retorna:
+        dict: Novos parâmetros da câmera.
+    """
+    N = normalize(camera['N'])
+    V = normalize(camera['V'])
+    right = normalize(cross(V, N))
+    C = vec_add(camera['C'], vec_add(vec_scalar_mult(right, dx), vec_scalar_mult(V, dy)))
+    return dict(camera, C=C)
+
+def zoom_camera(camera, pivot, factor):
+    """
+    Aproxima (factor < 1) ou afasta (factor > 1) a câmera do pivô ao longo da direção N.
+
+    Parâmetros:
+        camera (dict): Parâmetros da câmera.
+        pivot (list): Ponto de referência do zoom.
+        factor (float): Fator aplicado à distância até o pivô.
+
+    Retorna:
+        dict: Novos parâmetros da câmera.
+    """
+    N = normalize(camera['N'])
+    distance = dot(vec_sub(pivot, camera['C']), N)
+    C = vec_add(camera['C'], vec_scalar_mult(N, distance * (1 - factor)))
+    return dict(camera, C=C)
+
+def next_preview_factor(factor, frame_time, target=TARGET_FRAME_TIME):
+    """
+    Escolhe o fator de redução da resolução para o próximo quadro interativo.
+
+    O custo de rasterização é aproximadamente proporcional ao número de pixels
+    (1 / fator^2), então o fator é ajustado pela raiz da razão entre o tempo medido
+    e o tempo-alvo.
+
+    Parâmetros:
+        factor (int): Fator usado no último quadro.
+        frame_time (float): Tempo gasto no último quadro, em segundos.
+        target (float): Tempo-alvo por quadro, em segundos.
+
+    Retorna:
+        int: Novo fator entre 1 e MAX_PREVIEW_FACTOR.
+    """
+    new_factor = math.ceil(factor * my_sqrt(frame_time / target) - 1e-9)
+    return max(1, min(MAX_PREVIEW_FACTOR, new_factor))
 
 ###########################################
 # Classe Principal da Aplicação
@@ -590,101 +2058,446 @@ class App:
     realiza as transformações e renderiza a malha com z-buffer e modelo de iluminação de Phong.
     
     Pressione 'r' para recarregar os arquivos e redesenhar sem fechar a aplicação.
+    Arraste com o botão esquerdo para orbitar, com o botão direito para deslocar (pan)
+    e use a roda do mouse para zoom. Durante a interação, a cena é renderizada em
+    resolução reduzida para manter TARGET_FRAME_TIME por quadro; ao parar, é
+    renderizada novamente em resolução cheia.
+
+    Se Numba estiver instalado, a rasterização usa o kernel compilado de phong_jit
+    (use_jit=None escolhe automaticamente); caso contrário, usa o caminho em Python puro.
+    Imagens já renderizadas são lidas do cache em disco (cache=None desativa o cache).
+
+    A janela é exibida antes de qualquer carregamento: os arquivos são lidos, os normais
+    calculados e o primeiro quadro renderizado em etapas (ver startup_steps), com o
+    progresso mostrado na tela. Ao final, o tempo de cada etapa é exibido e, se
+    startup_output for informado, gravado nesse arquivo (JSON).
+
+    Com raytrace=True, os quadros em resolução cheia são gerados por traçado de raios
+    (render_scene_raytraced, com sombras); os quadros interativos continuam rasterizados.
+
+    Pressione 'd' para alternar entre a imagem iluminada e os mapas de calor de
+    depuração (DEBUG_VIEWS, ver render_debug_view), mostrados nos quadros em resolução
+    cheia junto com os totais no terminal; debug_view escolhe o modo inicial.
     """
-    def __init__(self, master, width=800, height=600):
+    def __init__(self, master, width=800, height=600, use_jit=None, cache=None,
+                 mesh_file="mesh.txt", camera_file="camera.txt", lighting_file="lighting.txt",
+                 startup_output=None, raytrace=False, debug_view=None):
         self.master = master
         self.width = width
         self.height = height
+        self.use_jit = jit_available() if use_jit is None else use_jit
+        self.cache = cache
+        self.raytrace = raytrace
+        self.debug_view = debug_view
 
-        # Cria o canvas e o objeto PhotoImage para desenhar pixel a pixel.
+        # Cria o canvas e o objeto PhotoImage que exibe o framebuffer desenhado pixel a pixel.
         self.canvas = tk.Canvas(master, width=self.width, height=self.height)
         self.canvas.pack()
         self.photo = tk.PhotoImage(width=self.width, height=self.height)
-        self.canvas.create_image((self.width // 2, self.height // 2), image=self.photo, state="normal")
+        self.image_item = self.canvas.create_image((self.width // 2, self.height // 2),
+                                                   image=self.photo, state="normal")
+        self.framebuffer = create_framebuffer(self.width, self.height)
+
+        # Estado da navegação interativa
+        self.preview_image = None
+        self.preview_factor = 2
+        self.preview_job = None
+        self.full_render_job = None
+        self.mouse_last = (0, 0)
 
         # Define os arquivos de entrada
-        self.mesh_file = "mesh.txt"
-        self.camera_file = "camera.txt"
-        self.lighting_file = "lighting.txt"
+        self.mesh_file = mesh_file
+        self.camera_file = camera_file
+        self.lighting_file = lighting_file
+
+        # Medição da inicialização: segundos gastos em cada etapa (ver mark_startup)
+        self.startup_times = {'imports': IMPORT_SECONDS}
+        self.startup_last = STARTUP_BEGIN + IMPORT_SECONDS
+        self.startup_output = startup_output
+
+        # Mostra a janela com a mensagem de progresso e carrega a cena em etapas
+        self.status_item = self.canvas.create_text((self.width // 2, self.height // 2),
+                                                   text="Iniciando...")
+        master.update_idletasks()
+        self.mark_startup('window')
+        self.startup = self.startup_steps()
+        master.after_idle(self.advance_startup)
+
+    def startup_steps(self):
+        """
+        Etapas da inicialização: leitura dos arquivos, cálculo dos normais e primeiro
+        quadro. Cada etapa produz a mensagem de progresso da etapa seguinte; com a
+        imagem no cache, o primeiro quadro é exibido antes do cálculo dos normais.
+        """
+        yield "Lendo a malha e os parâmetros..."
+        self.load_inputs()
+        self.mark_startup('parse')
+        cached = self.cached_frame()
+        if cached is not None:
+            self.show_framebuffer(framebuffer_from_ppm(cached))
+            self.mark_startup('first_frame')
+        yield f"Calculando os normais ({len(self.vertices)} vértices)..."
+        self.normals = compute_vertex_normals(self.vertices, self.triangles)
+        self.mark_startup('normals')
+        if cached is None:
+            yield f"Renderizando {self.width}x{self.height} ({len(self.triangles)} triângulos)..."
+            self.render()
+            self.mark_startup('first_frame')
 
-        # Carrega os arquivos e renderiza a cena
-        self.load_files()
-        self.render()
+    def advance_startup(self):
+        """
+        Executa a próxima etapa da inicialização e atualiza a mensagem de progresso,
+        devolvendo o controle ao laço de eventos entre as etapas.
+        """
+        try:
+            message = next(self.startup)
+        except StopIteration:
+            self.canvas.delete(self.status_item)
+            self.bind_events()
+            self.report_startup()
+            return
+        self.canvas.itemconfig(self.status_item, text=message)
+        self.canvas.tag_raise(self.status_item)
+        self.master.update_idletasks()
+        self.master.after(1, self.advance_startup)
 
-        # Associa o evento de tecla para recarregar os parâmetros (tecla 'r')
-        master.bind("<Key>", self.on_key)
+    def mark_startup(self, stage):
+        """
+        Registra o fim de uma etapa da inicialização: o tempo desde a etapa anterior.
+        """
+        now = time.perf_counter()
+        self.startup_times[stage] = now - self.startup_last
+        self.startup_last = now
 
-    def load_files(self):
+    def report_startup(self):
+        """
+        Mostra o tempo de cada etapa da inicialização e o grava em JSON, se pedido.
+        """
+        labels = {'imports': "importações", 'window': "janela", 'parse': "leitura",
+                  'normals': "normais", 'first_frame': "primeiro quadro"}
+        total = self.startup_last - STARTUP_BEGIN
+        print("Inicialização: " + ", ".join(f"{labels[k]} {v:.3f} s" for k, v in self.startup_times.items())
+              + f" (total {total:.3f} s).")
+        if self.startup_output is not None:
+            with open(self.startup_output, "w", encoding="utf-8") as f:
+                json.dump({'total': total, 'stages': self.startup_times}, f, indent=1)
+            print(f"Tempos de inicialização gravados em '{self.startup_output}'.")
+
+    def bind_events(self):
+        """
+        Associa os eventos de teclado e mouse (depois que a cena foi carregada).
+        """
+        # Associa o evento de tecla para recarregar os parâmetros (tecla 'r')
+        self.master.bind("<Key>", self.on_key)
+        # Órbita (botão esquerdo), pan (botão direito) e zoom (roda do mouse)
+        self.canvas.bind("<ButtonPress-1>", self.on_press)
+        self.canvas.bind("<ButtonPress-3>", self.on_press)
+        self.canvas.bind("<B1-Motion>", self.on_orbit)
+        self.canvas.bind("<B3-Motion>", self.on_pan)
+        self.canvas.bind("<MouseWheel>", self.on_zoom)
+        self.canvas.bind("<Button-4>", self.on_zoom)
+        self.canvas.bind("<Button-5>", self.on_zoom)
+
+    def load_inputs(self):
         """
         Carrega a malha 3D, os parâmetros da câmera e os parâmetros de iluminação.
-        Também calcula os normais dos vértices da malha.
         """
         self.vertices, self.triangles = load_mesh(self.mesh_file)
+        self.mesh_digest = render_cache.file_digest(self.mesh_file)
         self.camera = load_camera(self.camera_file)
         self.lighting = load_lighting(self.lighting_file)
+        self.pivot = mesh_center(self.vertices)
+
+    def load_files(self):
+        """
+        Carrega a malha 3D, os parâmetros da câmera e os parâmetros de iluminação.
+        Também calcula os normais dos vértices da malha.
+        """
+        self.load_inputs()
         self.normals = compute_vertex_normals(self.vertices, self.triangles)
 
     def clear_screen(self):
         """
-        Limpa a tela, preenchendo todos os pixels com a cor preta.
+        Limpa a tela, preenchendo todos os pixels do framebuffer com a cor preta.
         """
-        for x in range(self.width):
-            for y in range(self.height):
-                draw_pixel(self.photo, x, y, (0, 0, 0))
+        pixels = self.framebuffer['pixels']
+        pixels[:] = bytes(len(pixels))
 
     def render(self):
         """
-        Executa o pipeline de renderização:
-          1. Transforma os vértices do mundo para o sistema de view.
-          2. Transforma os normais.
-          3. Aplica a projeção em perspectiva e mapeia para coordenadas de tela.
-          4. Inicializa o z-buffer.
-          5. Transforma a posição da luz para o sistema de view.
-          6. Desenha a malha utilizando rasterização com z-buffer e iluminação Phong.
+        Renderiza a cena no framebuffer (ver render_scene) e o exibe na janela.
+        Se a mesma cena já estiver no cache, a imagem armazenada é exibida diretamente.
         """
+        self.full_render_job = None
+        if self.debug_view is not None:
+            framebuffer, stats = render_debug_view(self.vertices, self.triangles, self.normals, self.camera,
+                                                   self.width, self.height, self.debug_view)
+            print(f"Depuração: {self.debug_view}")
+            print_debug_stats(stats)
+            self.show_framebuffer(framebuffer)
+            return
+        cached = self.cached_frame()
+        if cached is not None:
+            self.show_framebuffer(framebuffer_from_ppm(cached))
+            return
         self.clear_screen()
-        cam = self.camera  # Parâmetros da câmera: N, V, d, hx, hy, C
-        # Transforma os vértices para o sistema de view
-        vertices_view, cam_basis = world_to_view(self.vertices, cam)
-        # Transforma os normais para o sistema de view usando a mesma base da câmera
-        normals_view = transform_normals(self.normals, cam_basis)
-        # Aplica a projeção em perspectiva
-        proj = perspective_projection(vertices_view, cam['d'])
-        # Converte as coordenadas projetadas para normalizadas
-        norm_coords = to_normalized(proj, cam['hx'], cam['hy'])
-        # Mapeia as coordenadas normalizadas para coordenadas de tela
-        vertices_screen = to_screen(norm_coords, self.width, self.height)
+        if self.raytrace:
+            render_scene_raytraced(self.vertices, self.triangles, self.normals, self.camera, self.lighting,
+                                   self.width, self.height, framebuffer=self.framebuffer)
+        else:
+            render_scene(self.vertices, self.triangles, self.normals, self.camera, self.lighting,
+                         self.width, self.height, self.use_jit, self.framebuffer)
+        if self.cache is not None:
+            self.cache.put(render_cache_key(self.mesh_digest, self.camera, self.lighting,
+                                            self.width, self.height, self.raytrace),
+                           framebuffer_to_ppm(self.framebuffer))
+        self.show_framebuffer(self.framebuffer)
+
+    def cached_frame(self):
+        """
+        Retorna a imagem da cena atual armazenada no cache (PPM) ou None.
+        """
+        if self.cache is None or self.debug_view is not None:
+            return None
+        return self.cache.get(render_cache_key(self.mesh_digest, self.camera, self.lighting,
+                                               self.width, self.height, self.raytrace))
 
-        # Inicializa o z-buffer com valores grandes
-        z_buffer = [[1e9 for _ in range(self.width)] for _ in range(self.height)]
-        
-        # Configura os parâmetros de iluminação
-        lighting = self.lighting
-        # Transforma a posição da luz para o sistema de view
-        C = cam['C']
-        Pl_world = lighting['Pl']
-        Pl_rel = vec_sub(Pl_world, C)
-        u, v, n = cam_basis
-        Pl_view = [dot(Pl_rel, u), dot(Pl_rel, v), dot(Pl_rel, n)]
-        
-        # Desenha a malha com z-buffer e iluminação Phong
-        draw_mesh(self.photo, z_buffer, vertices_screen, vertices_view, normals_view,
-                  self.triangles, lighting, Pl_view)
+    def show_framebuffer(self, framebuffer):
+        """
+        Exibe o framebuffer em resolução cheia na janela.
+        """
+        self.framebuffer = framebuffer
+        put_framebuffer(self.photo, self.framebuffer)
+        self.canvas.itemconfig(self.image_item, image=self.photo)
+        self.preview_image = None
+        self.master.update_idletasks()
+
+    def render_preview(self):
+        """
+        Renderiza um quadro interativo em resolução reduzida (1/preview_factor), amplia-o
+        na tela e ajusta o fator para o próximo quadro de acordo com o tempo gasto.
+        """
+        self.preview_job = None
+        factor = self.preview_factor
+        start = time.perf_counter()
+        width = max(1, self.width // factor)
+        height = max(1, self.height // factor)
+        framebuffer = render_scene(self.vertices, self.triangles, self.normals, self.camera,
+                                   self.lighting, width, height, self.use_jit)
+        image = tk.PhotoImage(width=width, height=height)
+        put_framebuffer(image, framebuffer)
+        if factor > 1:
+            image = image.zoom(factor)
+        self.preview_image = image
+        self.canvas.itemconfig(self.image_item, image=image)
         self.master.update_idletasks()
+        self.preview_factor = next_preview_factor(factor, time.perf_counter() - start)
+
+    def request_preview(self):
+        """
+        Agenda um quadro interativo (no máximo um pendente, acumulando os eventos de
+        entrada recebidos até lá) e adia o quadro final em resolução cheia.
+        """
+        if self.preview_job is None:
+            self.preview_job = self.master.after_idle(self.render_preview)
+        if self.full_render_job is not None:
+            self.master.after_cancel(self.full_render_job)
+        self.full_render_job = self.master.after(IDLE_RENDER_DELAY, self.render)
+
+    def on_press(self, event):
+        """
+        Guarda a posição do mouse no início de um arrasto.
+        """
+        self.mouse_last = (event.x, event.y)
+
+    def on_orbit(self, event):
+        """
+        Orbita a câmera em torno do centro da malha ao arrastar com o botão esquerdo.
+        """
+        dx = event.x - self.mouse_last[0]
+        dy = event.y - self.mouse_last[1]
+        self.mouse_last = (event.x, event.y)
+        self.camera = orbit_camera(self.camera, self.pivot, -dx * ORBIT_SPEED, dy * ORBIT_SPEED)
+        self.request_preview()
+
+    def on_pan(self, event):
+        """
+        Desloca a câmera no plano da imagem ao arrastar com o botão direito.
+        """
+        dx = event.x - self.mouse_last[0]
+        dy = event.y - self.mouse_last[1]
+        self.mouse_last = (event.x, event.y)
+        to_pivot = vec_sub(self.pivot, self.camera['C'])
+        step = my_sqrt(dot(to_pivot, to_pivot)) * PAN_SPEED
+        old_C = self.camera['C']
+        self.camera = pan_camera(self.camera, -dx * step, dy * step)
+        # O pivô acompanha a câmera, para que a órbita continue em torno do ponto visado
+        self.pivot = vec_add(self.pivot, vec_sub(self.camera['C'], old_C))
+        self.request_preview()
+
+    def on_zoom(self, event):
+        """
+        Aproxima ou afasta a câmera do pivô com a roda do mouse.
+        """
+        if event.num == 4 or event.delta > 0:
+            factor = ZOOM_FACTOR
+        else:
+            factor = 1 / ZOOM_FACTOR
+        self.camera = zoom_camera(self.camera, self.pivot, factor)
+        self.request_preview()
 
     def on_key(self, event):
         """
         Trata eventos de tecla.
         
         Se a tecla 'r' for pressionada, recarrega os arquivos de parâmetros e redesenha a cena.
+        A tecla 'd' passa para o próximo modo de depuração (ou volta à imagem iluminada).
         """
         if event.char.lower() == 'r':
             self.load_files()
             self.render()
             print("Parâmetros recarregados e objeto redesenhado.")
+        elif event.char.lower() == 'd':
+            modes = (None,) + DEBUG_VIEWS
+            self.debug_view = modes[(modes.index(self.debug_view) + 1) % len(modes)]
+            self.render()
+
+def render_to_file(mesh_file, camera_file, lighting_file, output, width, height, cache=None,
+                   raytrace=False, workers=None):
+    """
+    Renderiza a cena sem abrir janela e grava a imagem em um arquivo PPM.
+
+    O cache é consultado antes de qualquer trabalho de renderização: em caso de acerto,
+    a malha nem chega a ser interpretada.
+
+    Parâmetros:
+        mesh_file, camera_file, lighting_file (str): Arquivos de entrada.
+        output (str): Caminho da imagem PPM de saída.
+        width, height (int): Resolução da imagem.
+        cache (render_cache.RenderCache): Cache de imagens (opcional).
+        raytrace (bool): Renderiza por traçado de raios, com sombras (render_scene_raytraced).
+        workers (int): Número de processos do traçado de raios (padrão: número de CPUs).
+
+    Retorna:
+        bool: True se a imagem veio do cache.
+    """
+    camera = load_camera(camera_file)
+    lighting = load_lighting(lighting_file)
+    key = None
+    if cache is not None:
+        key = render_cache_key(render_cache.file_digest(mesh_file), camera, lighting, width, height, raytrace)
+        cached = cache.get(key)
+        if cached is not None:
+            with open(output, "wb") as f:
+                f.write(cached)
+            return True
+    vertices, triangles = load_mesh(mesh_file)
+    normals = compute_vertex_normals(vertices, triangles)
+    if raytrace:
+        framebuffer = render_scene_raytraced(vertices, triangles, normals, camera, lighting, width, height, workers)
+    else:
+        framebuffer = render_scene(vertices, triangles, normals, camera, lighting, width, height)
+    data = framebuffer_to_ppm(framebuffer)
+    with open(output, "wb") as f:
+        f.write(data)
+    if cache is not None:
+        cache.put(key, data)
+    return False
+
+def main():
+    parser = argparse.ArgumentParser(description="Renderização 3D com Iluminação de Phong e Z-Buffer.")
+    parser.add_argument("--mesh", default="mesh.txt")
+    parser.add_argument("--camera", default="camera.txt")
+    parser.add_argument("--lighting", default="lighting.txt")
+    parser.add_argument("--output", help="grava a imagem (PPM) neste arquivo, sem abrir janela")
+    parser.add_argument("--width", type=int, default=800)
+    parser.add_argument("--height", type=int, default=600)
+    parser.add_argument("--cache-dir", default=render_cache.DEFAULT_CACHE_DIR,
+                        help="diretório do cache de imagens")
+    parser.add_argument("--cache-size", type=int, default=render_cache.DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help="tamanho máximo do cache, em MB")
+    parser.add_argument("--no-cache", action="store_true", help="desativa o cache de imagens")
+    parser.add_argument("--raytrace", action="store_true",
+                        help="renderiza por traçado de raios, com sombras (quadros interativos continuam rasterizados)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processos do traçado de raios (padrão: número de CPUs)")
+    parser.add_argument("--tile", type=int, default=None, metavar="N",
+                        help="com --output, renderiza em tiles de NxN pixels direto para o arquivo, "
+                             "sem manter a imagem inteira em memória; não consulta nem grava o cache "
+                             "de imagens")
+    parser.add_argument("--depth-output", metavar="ARQUIVO",
+                        help="com --tile, grava também o z-buffer (PFM) em ARQUIVO")
+    parser.add_argument("--relight", nargs="+", metavar="ILUMINACAO",
+                        help="renderiza a malha uma vez e gera uma imagem por arquivo de iluminação, "
+                             "gravadas na pasta indicada por --output (substitui --lighting; sem cache)")
+    parser.add_argument("--debug-view", choices=DEBUG_VIEWS,
+                        help="mostra (ou grava, com --output) um mapa de calor de depuração da rasterização "
+                             "no lugar da imagem iluminada e imprime os totais")
+    parser.add_argument("--startup-times", metavar="ARQUIVO",
+                        help="grava em ARQUIVO (JSON) o tempo de cada etapa da inicialização da janela")
+    args = parser.parse_args()
+    # Modos que não podem ser combinados (um deles seria ignorado em silêncio)
+    tiled = args.tile is not None or args.depth_output is not None
+    conflicts = [("--raytrace", args.raytrace, "--tile/--depth-output", tiled),
+                 ("--raytrace", args.raytrace, "--relight", args.relight),
+                 ("--raytrace", args.raytrace, "--debug-view", args.debug_view),
+                 ("--tile/--depth-output", tiled, "--debug-view", args.debug_view),
+                 ("--relight", args.relight, "--tile/--depth-output", tiled),
+                 ("--relight", args.relight, "--debug-view", args.debug_view)]
+    for first, first_used, second, second_used in conflicts:
+        if first_used and second_used:
+            parser.error(f"{first} não pode ser combinado com {second}")
+    if tiled and not args.output:
+        parser.error("--tile/--depth-output exige --output")
+    if args.tile is not None and args.tile <= 0:
+        parser.error("--tile deve ser positivo")
+
+    cache = None
+    if not args.no_cache:
+        cache = render_cache.RenderCache(args.cache_dir, args.cache_size * 1024 * 1024)
+
+    if args.output and args.debug_view:
+        vertices, triangles = load_mesh(args.mesh)
+        normals = compute_vertex_normals(vertices, triangles)
+        framebuffer, stats = render_debug_view(vertices, triangles, normals, load_camera(args.camera),
+                                               args.width, args.height, args.debug_view)
+        write_ppm(framebuffer, args.output)
+        print_debug_stats(stats)
+        print(f"Imagem gravada em {args.output}.")
+        return
+    if args.relight:
+        if not args.output:
+            parser.error("--relight exige --output (pasta das imagens)")
+        os.makedirs(args.output, exist_ok=True)
+        vertices, triangles = load_mesh(args.mesh)
+        normals = compute_vertex_normals(vertices, triangles)
+        gbuffer = build_gbuffer(vertices, triangles, normals, load_camera(args.camera), args.width, args.height)
+        lightings = [load_lighting(filename) for filename in args.relight]
+        for filename, framebuffer in zip(args.relight, relight(gbuffer, lightings)):
+            name = os.path.splitext(os.path.basename(filename))[0] + ".ppm"
+            write_ppm(framebuffer, os.path.join(args.output, name))
+        print(f"{len(lightings)} imagem(ns) gravada(s) em {args.output}.")
+        return
+    if tiled:
+        vertices, triangles = load_mesh(args.mesh)
+        normals = compute_vertex_normals(vertices, triangles)
+        render_scene_tiled(vertices, triangles, normals, load_camera(args.camera), load_lighting(args.lighting),
+                           args.width, args.height, args.output, args.tile or RENDER_TILE_SIZE,
+                           depth_output=args.depth_output)
+        print(f"Imagem gravada em {args.output}.")
+        return
+    if args.output:
+        hit = render_to_file(args.mesh, args.camera, args.lighting, args.output,
+                             args.width, args.height, cache, args.raytrace, args.workers)
+        print(f"Imagem gravada em {args.output}" + (" (cache)." if hit else "."))
+        return
 
-if __name__ == "__main__":
     root = tk.Tk()
     root.title("Renderização 3D com Iluminação de Phong e Z-Buffer")
-    app = App(root)
+    app = App(root, args.width, args.height, cache=cache,
+              mesh_file=args.mesh, camera_file=args.camera, lighting_file=args.lighting,
+              startup_output=args.startup_times, raytrace=args.raytrace, debug_view=args.debug_view)
     root.mainloop()
+
+if __name__ == "__main__":
+    main()
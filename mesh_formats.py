@@ -0,0 +1,313 @@
+"""
+Leitura de malhas nos formatos PLY binário, STL binário e OBJ.
+
+Os formatos binários são lidos em bloco: o arquivo é lido de uma só vez e os
+registros de tamanho fixo são convertidos diretamente em arrays (array.frombytes,
+fatias de bytes e struct.iter_unpack), sem separar tokens em Python. O OBJ é
+interpretado em uma única passada pelas linhas.
+
+Todos os leitores devolvem a mesma estrutura de projeto_3aVA.load_single_object:
+  'vertices': array com x, y, z de cada vértice, em sequência ('f' ou 'd');
+  'faces': array('i') com os índices (base 0) de todas as faces, em sequência;
+  'face_starts': array('I') com a posição de cada face em 'faces' (e o total no fim).
+main_phong.load_mesh converte essa estrutura para listas de vértices e triângulos.
+"""
+import itertools
+import operator
+import os
+import struct
+import sys
+from array import array
+
+# Extensões reconhecidas por read_mesh
+MESH_EXTENSIONS = ('.ply', '.stl', '.obj')
+
+# Tipos escalares do PLY -> códigos de struct/array
+PLY_TYPES = {'char': 'b', 'int8': 'b', 'uchar': 'B', 'uint8': 'B',
+             'short': 'h', 'int16': 'h', 'ushort': 'H', 'uint16': 'H',
+             'int': 'i', 'int32': 'i', 'uint': 'I', 'uint32': 'I',
+             'float': 'f', 'float32': 'f', 'double': 'd', 'float64': 'd'}
+
+# Nomes aceitos para a lista de índices dos vértices de uma face PLY
+PLY_FACE_INDICES = ('vertex_indices', 'vertex_index')
+
+NATIVE_ORDER = '<' if sys.byteorder == 'little' else '>'
+
+###########################################
+# PLY Binário
+###########################################
+
+def read_ply_header(f):
+    """
+    Lê o cabeçalho de um arquivo PLY aberto em modo binário, deixando o arquivo
+    posicionado no início dos dados.
+
+    Retorna:
+        tuple: (ordem dos bytes para struct, '<' ou '>'; lista de elementos
+               (nome, quantidade, propriedades), com cada propriedade no formato
+               (nome, tipo, tipo dos itens), em que o tipo dos itens é None para
+               propriedades escalares e o tipo é o do contador para listas)
+    """
+    if f.readline().strip() != b'ply':
+        raise ValueError("arquivo PLY inválido")
+    order = None
+    elements = []
+    while True:
+        line = f.readline()
+        if not line:
+            raise ValueError("cabeçalho PLY sem end_header")
+        words = line.decode('ascii').split()
+        if not words or words[0] in ('comment', 'obj_info'):
+            continue
+        if words[0] == 'format':
+            if words[1] == 'binary_little_endian':
+                order = '<'
+            elif words[1] == 'binary_big_endian':
+                order = '>'
+            else:
+                raise ValueError(f"formato PLY '{words[1]}' não suportado (apenas binário)")
+        elif words[0] == 'element':
+            elements.append((words[1], int(words[2]), []))
+        elif words[0] == 'property':
+            if words[1] == 'list':
+                elements[-1][2].append((words[4], PLY_TYPES[words[2]], PLY_TYPES[words[3]]))
+            else:
+                elements[-1][2].append((words[2], PLY_TYPES[words[1]], None))
+        elif words[0] == 'end_header':
+            break
+    if order is None:
+        raise ValueError("cabeçalho PLY sem a linha 'format'")
+    return order, elements
+
+def read_ply_vertices(data, offset, count, properties, order):
+    """
+    Converte o bloco de 'count' vértices que começa em data[offset] em um array
+    com x, y, z de cada vértice. Se os registros forem apenas x, y, z de ponto
+    flutuante, o bloco é copiado diretamente (array.frombytes); caso contrário, os
+    registros são desempacotados com struct.iter_unpack.
+
+    Retorna:
+        tuple: (vértices, posição em data logo após o bloco)
+    """
+    if any(item is not None for name, kind, item in properties):
+        raise ValueError("propriedades em lista nos vértices PLY não são suportadas")
+    names = [name for name, kind, item in properties]
+    kinds = [kind for name, kind, item in properties]
+    record = order + ''.join(kinds)
+    size = struct.calcsize(record)
+    block = data[offset:offset + count * size]
+    if len(block) < count * size:
+        raise ValueError("arquivo PLY truncado nos vértices")
+    try:
+        x, y, z = names.index('x'), names.index('y'), names.index('z')
+    except ValueError:
+        raise ValueError("vértices PLY sem as propriedades x, y e z")
+    typecode = 'd' if 'd' in (kinds[x], kinds[y], kinds[z]) else 'f'
+    if names == ['x', 'y', 'z'] and kinds == [typecode] * 3:
+        vertices = array(typecode)
+        vertices.frombytes(block)
+        if order != NATIVE_ORDER:
+            vertices.byteswap()
+    else:
+        vertices = array(typecode, itertools.chain.from_iterable(
+            map(operator.itemgetter(x, y, z), struct.iter_unpack(record, block))))
+    return vertices, offset + count * size
+
+def read_ply_faces(data, offset, count, properties, order):
+    """
+    Lê as faces de um elemento 'face' do PLY a partir de data[offset].
+
+    Quando todas as faces têm o mesmo número de vértices (o caso comum: só
+    triângulos ou só quadriláteros), os registros têm tamanho fixo e são lidos em
+    bloco; a verificação dos contadores usa uma fatia com passo dos bytes. Faces
+    com tamanhos variados são lidas face a face.
+
+    Retorna:
+        tuple: (faces, face_starts, posição em data logo após as faces)
+    """
+    lists = [i for i, (name, kind, item) in enumerate(properties) if item is not None]
+    indices = [i for i in lists if properties[i][0] in PLY_FACE_INDICES]
+    if not indices:
+        raise ValueError("faces PLY sem a propriedade vertex_indices")
+    position = indices[0]
+    if count and lists == [position]:
+        before = order + ''.join(kind for name, kind, item in properties[:position])
+        after = order + ''.join(kind for name, kind, item in properties[position + 1:])
+        counter, item = properties[position][1], properties[position][2]
+        start = struct.calcsize(before)
+        counter_size = struct.calcsize(order + counter)
+        n = struct.unpack_from(order + counter, data, offset + start)[0]
+        record = f"{order}{start + counter_size}x{n}{item}{struct.calcsize(after)}x"
+        size = struct.calcsize(record)
+        block = data[offset:offset + count * size]
+        if len(block) == count * size:
+            if counter_size == 1:
+                uniform = block[start::size] == struct.pack(counter, n) * count
+            else:
+                uniform = all(c == n for (c,) in struct.iter_unpack(
+                    f"{order}{start}x{counter}{size - start - counter_size}x", block))
+            if uniform:
+                faces = array('i', itertools.chain.from_iterable(struct.iter_unpack(record, block)))
+                return faces, array('I', range(0, n * count + 1, n)), offset + count * size
+
+    faces = array('i')
+    face_starts = array('I')
+    for _ in range(count):
+        face_starts.append(len(faces))
+        for i, (name, kind, item) in enumerate(properties):
+            if item is None:
+                offset += struct.calcsize(order + kind)
+                continue
+            n = struct.unpack_from(order + kind, data, offset)[0]
+            offset += struct.calcsize(order + kind)
+            if i == position:
+                faces.extend(struct.unpack_from(f"{order}{n}{item}", data, offset))
+            offset += struct.calcsize(f"{order}{n}{item}")
+    face_starts.append(len(faces))
+    return faces, face_starts, offset
+
+def read_ply(filename):
+    """
+    Carrega uma malha PLY binária (little ou big endian). Usa os elementos 'vertex'
+    (propriedades x, y, z; as demais são ignoradas) e 'face' (vertex_indices).
+
+    Retorna:
+        dict: Com 'vertices', 'faces' e 'face_starts' (ver o início do módulo).
+    """
+    with open(filename, 'rb') as f:
+        order, elements = read_ply_header(f)
+        data = f.read()
+    mesh = {'vertices': None, 'faces': array('i'), 'face_starts': array('I', [0])}
+    offset = 0
+    for name, count, properties in elements:
+        if name == 'vertex':
+            mesh['vertices'], offset = read_ply_vertices(data, offset, count, properties, order)
+        elif name == 'face':
+            mesh['faces'], mesh['face_starts'], offset = read_ply_faces(data, offset, count, properties, order)
+        elif any(item is not None for prop_name, kind, item in properties):
+            # Elementos com listas só podem ser pulados lendo registro a registro
+            if mesh['vertices'] is not None and len(mesh['face_starts']) > 1:
+                break
+            raise ValueError(f"elemento PLY '{name}' com listas antes dos vértices e faces")
+        else:
+            offset += count * struct.calcsize(order + ''.join(kind for prop_name, kind, item in properties))
+    if mesh['vertices'] is None:
+        raise ValueError("arquivo PLY sem o elemento 'vertex'")
+    return mesh
+
+###########################################
+# STL Binário
+###########################################
+
+def read_stl(filename):
+    """
+    Carrega uma malha STL binária: cabeçalho de 80 bytes, número de triângulos
+    (uint32) e, para cada triângulo, um registro de 50 bytes (normal, 3 vértices e
+    2 bytes de atributos).
+
+    Os 36 bytes de vértices de cada registro são extraídos em bloco. Como o STL
+    repete os vértices em cada triângulo, vértices com os mesmos bytes são unidos
+    em um só, para que as normais dos vértices sejam suavizadas entre triângulos
+    vizinhos como nos demais formatos.
+
+    Retorna:
+        dict: Com 'vertices' (array('f')), 'faces' e 'face_starts' (triângulos).
+    """
+    with open(filename, 'rb') as f:
+        data = f.read()
+    if len(data) < 84:
+        raise ValueError("arquivo STL truncado")
+    count = struct.unpack_from('<I', data, 80)[0]
+    if len(data) < 84 + 50 * count:
+        if data[:5] == b'solid':
+            raise ValueError("STL ASCII não suportado (apenas binário)")
+        raise ValueError("arquivo STL truncado")
+    corners = b''.join(map(operator.itemgetter(0), struct.iter_unpack('<12x36s2x', data[84:84 + 50 * count])))
+    # Une vértices repetidos: cada posição distinta (12 bytes) recebe um índice novo
+    index = {}
+    faces = array('i', [index.setdefault(key, len(index))
+                        for (key,) in struct.iter_unpack('12s', corners)])
+    vertices = array('f')
+    vertices.frombytes(b''.join(index))
+    if NATIVE_ORDER != '<':
+        vertices.byteswap()
+    return {'vertices': vertices, 'faces': faces, 'face_starts': array('I', range(0, 3 * count + 1, 3))}
+
+###########################################
+# OBJ
+###########################################
+
+def read_obj(filename):
+    """
+    Carrega uma malha OBJ em uma única passada pelas linhas. Usa apenas as linhas
+    'v' (x, y, z; valores extras como w ou cor são ignorados) e 'f' (índices de
+    vértice, base 1 ou negativos relativos ao último vértice; as referências de
+    textura e normal após '/' são ignoradas). Grupos, materiais e demais linhas
+    são ignorados. O índice 0, que não existe no formato, vira -1; a validação dos
+    índices fica com quem usa as faces, pois uma face pode citar vértices definidos
+    depois dela.
+
+    Retorna:
+        dict: Com 'vertices' (array('d')), 'faces' e 'face_starts'.
+    """
+    coords = []
+    faces = array('i')
+    face_starts = array('I')
+    with open(filename, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            words = line.split()
+            if not words:
+                continue
+            if words[0] == 'v':
+                coords.extend(words[1:4])
+            elif words[0] == 'f':
+                face_starts.append(len(faces))
+                num_vertices = len(coords) // 3
+                for word in words[1:]:
+                    i = int(word.split('/', 1)[0])
+                    faces.append(i - 1 if i > 0 else num_vertices + i if i < 0 else -1)
+    face_starts.append(len(faces))
+    return {'vertices': array('d', map(float, coords)), 'faces': faces, 'face_starts': face_starts}
+
+###########################################
+# Seleção pelo Formato
+###########################################
+
+def read_mesh(filename):
+    """
+    Carrega uma malha .ply, .stl ou .obj, escolhendo o leitor pela extensão.
+
+    Retorna:
+        dict: Com 'vertices', 'faces' e 'face_starts' (ver o início do módulo).
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.ply':
+        return read_ply(filename)
+    if extension == '.stl':
+        return read_stl(filename)
+    if extension == '.obj':
+        return read_obj(filename)
+    raise ValueError(f"formato de malha não suportado: '{extension}'")
+
+def read_mesh_header(filename):
+    """
+    Lê apenas o necessário para saber o tamanho da malha, sem carregá-la.
+
+    Retorna:
+        tuple: (número de vértices, número de faces); cada valor é None quando o
+               formato não o informa sem ler o arquivo inteiro (OBJ; vértices do STL,
+               que dependem da união dos vértices repetidos).
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.ply':
+        with open(filename, 'rb') as f:
+            order, elements = read_ply_header(f)
+        counts = {name: count for name, count, properties in elements}
+        return counts.get('vertex', 0), counts.get('face', 0)
+    if extension == '.stl':
+        with open(filename, 'rb') as f:
+            header = f.read(84)
+        if len(header) < 84:
+            raise ValueError("arquivo STL truncado")
+        return None, struct.unpack_from('<I', header, 80)[0]
+    return None, None
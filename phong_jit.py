@@ -0,0 +1,411 @@
+"""
+Kernel opcional de rasterização e iluminação Phong compilado com Numba.
+
+Reproduz, operação por operação, o caminho em Python puro de main_phong.py
+(fill_triangle_phong + compute_phong_color_lights), mas operando sobre arrays:
+vértices, normais, z-buffer e framebuffer RGB. As imagens geradas pelos dois
+caminhos são idênticas.
+
+Numba (e NumPy) são opcionais. Se não estiverem instalados, AVAILABLE é False e
+main_phong.py usa automaticamente o caminho em Python puro.
+"""
+import math
+
+try:
+    import numpy as np
+    from numba import njit
+except ImportError:  # Sem Numba, o renderizador usa o caminho em Python puro
+    np = None
+    njit = None
+
+AVAILABLE = njit is not None
+
+def _jit(func):
+    """
+    Compila a função com Numba quando disponível; caso contrário, devolve-a intacta.
+    """
+    if AVAILABLE:
+        return njit(cache=True)(func)
+    return func
+
+###########################################
+# Funções Auxiliares do Kernel
+###########################################
+
+@_jit
+def _my_sqrt(x):
+    """
+    Raiz quadrada pelo método de Newton (mesmas iterações de main_phong.my_sqrt).
+    """
+    if x <= 0:
+        return 0.0
+    guess = x / 2.0
+    for i in range(20):
+        guess = (guess + x / guess) / 2.0
+    return guess
+
+@_jit
+def _view_direction(px, py, pz):
+    """
+    Direção da visão, de P para a origem (a câmera em view), normalizada.
+    """
+    vx = -px
+    vy = -py
+    vz = -pz
+    norm = _my_sqrt(0.0 + vx * vx + vy * vy + vz * vz)
+    if norm != 0:
+        vx = vx / norm
+        vy = vy / norm
+        vz = vz / norm
+    return vx, vy, vz
+
+@_jit
+def _light_terms(px, py, pz, nx, ny, nz, vx, vy, vz, lpx, lpy, lpz, radius):
+    """
+    Termos de uma luz em (lpx, lpy, lpz) que dependem apenas da geometria
+    (como main_phong.light_terms): (atenuação, N•L, R•V); atenuação 0 indica que a
+    luz não atinge o ponto.
+
+    As somas são escritas na mesma ordem das funções dot/normalize de main_phong.py
+    (começando de 0.0), para que os resultados em ponto flutuante sejam idênticos.
+    """
+    lx = lpx - px
+    ly = lpy - py
+    lz = lpz - pz
+    falloff = 1.0
+    if not math.isinf(radius):
+        dist2 = 0.0 + lx * lx + ly * ly + lz * lz
+        r2 = radius * radius
+        if dist2 >= r2:
+            return 0.0, 0.0, 0.0
+        w = 1 - dist2 / r2
+        falloff = w * w
+        if falloff == 0:
+            return 0.0, 0.0, 0.0
+    norm = _my_sqrt(0.0 + lx * lx + ly * ly + lz * lz)
+    if norm != 0:
+        lx = lx / norm
+        ly = ly / norm
+        lz = lz / norm
+    ndotl = 0.0 + nx * lx + ny * ly + nz * lz
+    two_ndotl = 2 * ndotl
+    if ndotl < 0:
+        ndotl = 0.0
+    rx = nx * two_ndotl - lx
+    ry = ny * two_ndotl - ly
+    rz = nz * two_ndotl - lz
+    rdotv = 0.0 + rx * vx + ry * vy + rz * vz
+    if rdotv < 0:
+        rdotv = 0.0
+    return falloff, ndotl, rdotv
+
+@_jit
+def _light_contribution(il_r, il_g, il_b, kd, od, ks, eta, falloff, ndotl, rdotv):
+    """
+    Componentes difusa e especular de uma luz de intensidade (il_r, il_g, il_b),
+    atenuadas (como main_phong.light_contribution).
+    """
+    spec = ks * rdotv ** eta
+    cr = il_r * kd[0] * ndotl * od[0] + il_r * spec
+    cg = il_g * kd[1] * ndotl * od[1] + il_g * spec
+    cb = il_b * kd[2] * ndotl * od[2] + il_b * spec
+    if falloff != 1:
+        cr = cr * falloff
+        cg = cg * falloff
+        cb = cb * falloff
+    return cr, cg, cb
+
+@_jit
+def _shade_point(px, py, pz, nx, ny, nz, ambient, kd, od, ks, eta, light_il, light_pl, light_radius,
+                 lights, first, last):
+    """
+    Cor de Phong do ponto (px, py, pz) com normal (nx, ny, nz), iluminado pelas luzes
+    lights[first:last] (como main_phong.compute_phong_color_lights).
+    """
+    vx, vy, vz = _view_direction(px, py, pz)
+    r = ambient[0]
+    g = ambient[1]
+    b = ambient[2]
+    for j in range(first, last):
+        light = lights[j]
+        falloff, ndotl, rdotv = _light_terms(px, py, pz, nx, ny, nz, vx, vy, vz,
+                                             light_pl[light, 0], light_pl[light, 1], light_pl[light, 2],
+                                             light_radius[light])
+        if falloff == 0:
+            continue
+        cr, cg, cb = _light_contribution(light_il[light, 0], light_il[light, 1], light_il[light, 2],
+                                         kd, od, ks, eta, falloff, ndotl, rdotv)
+        r = r + cr
+        g = g + cg
+        b = b + cb
+    return r, g, b
+
+@_jit
+def _fill_triangles(items, tri, x_min, x_max, y_min, y_max, area, edge, faces, vertices, normals,
+                    ambient, kd, od, ks, eta, light_il, light_pl, light_radius,
+                    tile_size, tiles_x, bin_offsets, bin_lights, z_buffer, pixels, width,
+                    clip_x0, clip_y0, clip_x1, clip_y1, gbuffer_position, gbuffer_normal, gbuffer_coverage):
+    """
+    Rasteriza os triângulos 'items' preparados por setup_triangles com z-buffer e Phong,
+    apenas dentro do retângulo de recorte (clip_x0, clip_y0)-(clip_x1, clip_y1); o
+    z-buffer e os pixels cobrem só esse retângulo (ver main_phong.fill_triangle_phong).
+
+    Se gbuffer_coverage não for vazio, nada é iluminado: a posição e a normal do
+    fragmento visível de cada pixel são gravadas no G-buffer (ver main_phong.build_gbuffer).
+    """
+    store_gbuffer = gbuffer_coverage.shape[0] > 0
+    for n in range(items.shape[0]):
+        k = items[n]
+        t = tri[k]
+        i0 = faces[t, 0]
+        i1 = faces[t, 1]
+        i2 = faces[t, 2]
+        ar = area[k]
+        e = 6 * k
+        a_x = edge[e]
+        a_y = edge[e + 1]
+        a_c = edge[e + 2]
+        b_x = edge[e + 3]
+        b_y = edge[e + 4]
+        b_c = edge[e + 5]
+        y_first = max(y_min[k], clip_y0)
+        for x in range(max(x_min[k], clip_x0), min(x_max[k], clip_x1) + 1):
+            alpha_num = a_x * x + a_y * y_min[k] + a_c
+            beta_num = b_x * x + b_y * y_min[k] + b_c
+            for y in range(y_min[k], y_first):
+                alpha_num += a_y
+                beta_num += b_y
+            for y in range(y_first, min(y_max[k], clip_y1) + 1):
+                alpha = alpha_num / ar
+                beta = beta_num / ar
+                gamma = 1 - alpha - beta
+                alpha_num += a_y
+                beta_num += b_y
+                if alpha < 0 or beta < 0 or gamma < 0:
+                    continue
+                z = alpha * vertices[i0, 2] + beta * vertices[i1, 2] + gamma * vertices[i2, 2]
+                if z >= z_buffer[y - clip_y0, x - clip_x0]:
+                    continue
+                z_buffer[y - clip_y0, x - clip_x0] = z
+                # Posição e normal interpoladas em view
+                px = alpha * vertices[i0, 0] + beta * vertices[i1, 0] + gamma * vertices[i2, 0]
+                py = alpha * vertices[i0, 1] + beta * vertices[i1, 1] + gamma * vertices[i2, 1]
+                pz = z
+                nx = alpha * normals[i0, 0] + beta * normals[i1, 0] + gamma * normals[i2, 0]
+                ny = alpha * normals[i0, 1] + beta * normals[i1, 1] + gamma * normals[i2, 1]
+                nz = alpha * normals[i0, 2] + beta * normals[i1, 2] + gamma * normals[i2, 2]
+                norm = _my_sqrt(0.0 + nx * nx + ny * ny + nz * nz)
+                if norm != 0:
+                    nx = nx / norm
+                    ny = ny / norm
+                    nz = nz / norm
+                pixel = (y - clip_y0) * width + x - clip_x0
+                if store_gbuffer:
+                    gbuffer_position[pixel, 0] = px
+                    gbuffer_position[pixel, 1] = py
+                    gbuffer_position[pixel, 2] = pz
+                    gbuffer_normal[pixel, 0] = nx
+                    gbuffer_normal[pixel, 1] = ny
+                    gbuffer_normal[pixel, 2] = nz
+                    gbuffer_coverage[pixel] = 1
+                    continue
+                tile = (y // tile_size) * tiles_x + x // tile_size
+                r, g, b = _shade_point(px, py, pz, nx, ny, nz, ambient, kd, od, ks, eta,
+                                       light_il, light_pl, light_radius,
+                                       bin_lights, bin_offsets[tile], bin_offsets[tile + 1])
+                p = 3 * pixel
+                pixels[p] = int(max(min(r, 255), 0))
+                pixels[p + 1] = int(max(min(g, 255), 0))
+                pixels[p + 2] = int(max(min(b, 255), 0))
+
+@_jit
+def _shade_gbuffer(position, normal, pixel, ambient, kd, od, ks, eta, light_offsets, light_il,
+                   light_geometry, geometry_pl, geometry_radius, pixels):
+    """
+    Ilumina os pixels cobertos do G-buffer com um lote de configurações de iluminação
+    (como main_phong.shade_gbuffer): a configuração c usa as luzes
+    light_offsets[c]:light_offsets[c + 1] e grava em pixels[c]. A luz j tem intensidade
+    light_il[j] e posição/raio geometry_pl/geometry_radius[light_geometry[j]]; os termos
+    geométricos de cada posição distinta são calculados uma vez por pixel para todo o lote.
+    """
+    count = geometry_pl.shape[0]
+    falloffs = np.empty(count)
+    ndotls = np.empty(count)
+    rdotvs = np.empty(count)
+    for i in range(pixel.shape[0]):
+        px = position[i, 0]
+        py = position[i, 1]
+        pz = position[i, 2]
+        nx = normal[i, 0]
+        ny = normal[i, 1]
+        nz = normal[i, 2]
+        vx, vy, vz = _view_direction(px, py, pz)
+        for k in range(count):
+            falloffs[k], ndotls[k], rdotvs[k] = _light_terms(px, py, pz, nx, ny, nz, vx, vy, vz,
+                                                             geometry_pl[k, 0], geometry_pl[k, 1],
+                                                             geometry_pl[k, 2], geometry_radius[k])
+        p = 3 * pixel[i]
+        for c in range(pixels.shape[0]):
+            r = ambient[c, 0]
+            g = ambient[c, 1]
+            b = ambient[c, 2]
+            for j in range(light_offsets[c], light_offsets[c + 1]):
+                k = light_geometry[j]
+                if falloffs[k] == 0:
+                    continue
+                cr, cg, cb = _light_contribution(light_il[j, 0], light_il[j, 1], light_il[j, 2],
+                                                 kd[c], od[c], ks[c], eta[c],
+                                                 falloffs[k], ndotls[k], rdotvs[k])
+                r = r + cr
+                g = g + cg
+                b = b + cb
+            pixels[c, p] = int(max(min(r, 255), 0))
+            pixels[c, p + 1] = int(max(min(g, 255), 0))
+            pixels[c, p + 2] = int(max(min(b, 255), 0))
+
+###########################################
+# Interface com main_phong.py
+###########################################
+
+def mesh_arrays(setup, triangles, vertices_view, normals_view):
+    """
+    Converte os triângulos preparados e a malha em view para os arrays do kernel.
+    Pode ser calculado uma vez e reaproveitado em várias chamadas de draw_mesh_jit
+    (por exemplo, uma por tile em main_phong.render_scene_tiled).
+
+    Retorna:
+        tuple: Arrays na ordem dos parâmetros de _fill_triangles (de 'tri' a 'normals').
+    """
+    return (np.asarray(setup['tri']),
+            np.asarray(setup['x_min']), np.asarray(setup['x_max']),
+            np.asarray(setup['y_min']), np.asarray(setup['y_max']),
+            np.asarray(setup['area']), np.asarray(setup['edge']),
+            np.array(triangles, dtype=np.int64).reshape(-1, 3),
+            np.array(vertices_view, dtype=np.float64).reshape(-1, 3),
+            np.array(normals_view, dtype=np.float64).reshape(-1, 3))
+
+def draw_mesh_jit(framebuffer, vertices_view, normals_view, triangles, lighting, Pl_view, setup,
+                  light_grid=None, z_buffer=None, clip=None, items=None, arrays=None, gbuffer=None):
+    """
+    Equivalente acelerado de main_phong.draw_mesh.
+
+    Parâmetros:
+        framebuffer (dict): Framebuffer RGB (main_phong.create_framebuffer), escrito no lugar.
+        vertices_view (list): Lista de vértices em view ([x,y,z]).
+        normals_view (list): Lista de normais em view.
+        triangles (list): Lista de triângulos (índices 0-indexados).
+        lighting (dict): Parâmetros de iluminação.
+        Pl_view (list): Posição da luz principal em view.
+        setup (dict): Triângulos preparados por main_phong.setup_triangles.
+        light_grid (dict): Luzes distribuídas por tile (opcional).
+        z_buffer (numpy.ndarray): Matriz de profundidade (altura x largura). Se None,
+                                  é criada preenchida com 1e9.
+        clip (tuple): Retângulo (x0, y0, x1, y1), inclusivo, coberto pelo framebuffer e
+                      pelo z-buffer (um tile da imagem). Se None, a imagem inteira.
+        items (list): Posições, em setup, dos triângulos a desenhar (em ordem). Se None, todos.
+        arrays (tuple): Resultado de mesh_arrays para a malha (opcional).
+        gbuffer (dict): G-buffer (main_phong.build_gbuffer) a preencher no lugar da
+                        iluminação; 'framebuffer', 'lighting' e 'Pl_view' são então ignorados.
+
+    Retorna:
+        numpy.ndarray: O z-buffer após a rasterização.
+    """
+    if gbuffer is None:
+        target = framebuffer
+        pixels = np.frombuffer(framebuffer['pixels'], dtype=np.uint8)
+        gbuffer_out = (np.empty((0, 3)), np.empty((0, 3)), np.empty(0, dtype=np.uint8))
+        ambient = np.array([c * lighting['Ka'] for c in lighting['Iamb']], dtype=np.float64)
+    else:
+        target = gbuffer
+        pixels = np.empty(0, dtype=np.uint8)
+        gbuffer_out = gbuffer_arrays(gbuffer)
+        # Sem iluminação: parâmetros apenas com os tipos esperados pelo kernel
+        lighting = {'Kd': [0.0] * 3, 'Od': [0.0] * 3, 'Ks': 0.0, 'eta': 1.0, 'Il': [0.0] * 3}
+        Pl_view = [0.0] * 3
+        ambient = np.zeros(3)
+    width = target['width']
+    height = target['height']
+    if z_buffer is None:
+        z_buffer = np.full((height, width), 1e9)
+    if clip is None:
+        clip = (0, 0, width - 1, height - 1)
+    if light_grid is None:
+        # Apenas a luz principal, sem atenuação, válida em toda a tela
+        lights = [{'Il': lighting['Il'], 'Pl': Pl_view, 'radius': float('inf')}]
+        tile_size = max(clip[2], clip[3]) + 1
+        tiles_x = 1
+        bin_offsets = np.array([0, 1], dtype=np.int64)
+        bin_lights = np.array([0], dtype=np.int64)
+    else:
+        lights = light_grid['lights']
+        tile_size = light_grid['tile_size']
+        tiles_x = light_grid['tiles_x']
+        index = {id(light): i for i, light in enumerate(lights)}
+        offsets = [0]
+        members = []
+        for tile_lights in light_grid['bins']:
+            members.extend(index[id(light)] for light in tile_lights)
+            offsets.append(len(members))
+        bin_offsets = np.array(offsets, dtype=np.int64)
+        bin_lights = np.array(members, dtype=np.int64)
+    if items is None:
+        items = np.arange(setup['count'], dtype=np.int64)
+    if arrays is None:
+        arrays = mesh_arrays(setup, triangles, vertices_view, normals_view)
+    _fill_triangles(np.asarray(items, dtype=np.int64), *arrays,
+                    ambient,
+                    np.array(lighting['Kd'], dtype=np.float64),
+                    np.array(lighting['Od'], dtype=np.float64),
+                    float(lighting['Ks']), float(lighting['eta']),
+                    np.array([light['Il'] for light in lights], dtype=np.float64).reshape(-1, 3),
+                    np.array([light['Pl'] for light in lights], dtype=np.float64).reshape(-1, 3),
+                    np.array([light['radius'] for light in lights], dtype=np.float64),
+                    tile_size, tiles_x, bin_offsets, bin_lights,
+                    z_buffer, pixels, width, *clip, *gbuffer_out)
+    return z_buffer
+
+def gbuffer_arrays(gbuffer):
+    """
+    Vistas NumPy, sem cópia, dos arrays de um G-buffer de main_phong.build_gbuffer.
+
+    Retorna:
+        tuple: (posições, normais, cobertura), com uma linha por pixel.
+    """
+    return (np.frombuffer(gbuffer['position'], dtype=np.float64).reshape(-1, 3),
+            np.frombuffer(gbuffer['normal'], dtype=np.float64).reshape(-1, 3),
+            np.frombuffer(gbuffer['coverage'], dtype=np.uint8))
+
+def shade_gbuffer_jit(gbuffer, batch, batch_lights, geometry):
+    """
+    Equivalente acelerado de main_phong.shade_gbuffer.
+
+    Parâmetros:
+        gbuffer (dict): G-buffer de main_phong.build_gbuffer.
+        batch (list): Parâmetros de iluminação (load_lighting) de cada configuração.
+        batch_lights (list): Para cada configuração, as luzes como pares
+                             (índice em 'geometry', intensidade Il).
+        geometry (list): Posições (em view) e raios, (Pl, radius), distintos das luzes do lote.
+
+    Retorna:
+        list: Um framebuffer por configuração.
+    """
+    position, normal, coverage = gbuffer_arrays(gbuffer)
+    pixel = np.flatnonzero(coverage)
+    lights = [light for lights in batch_lights for light in lights]
+    light_offsets = np.cumsum([0] + [len(lights) for lights in batch_lights])
+    pixels = np.zeros((len(batch), 3 * gbuffer['width'] * gbuffer['height']), dtype=np.uint8)
+    _shade_gbuffer(position[pixel], normal[pixel], pixel,
+                   np.array([[c * lighting['Ka'] for c in lighting['Iamb']] for lighting in batch],
+                            dtype=np.float64),
+                   np.array([lighting['Kd'] for lighting in batch], dtype=np.float64),
+                   np.array([lighting['Od'] for lighting in batch], dtype=np.float64),
+                   np.array([lighting['Ks'] for lighting in batch], dtype=np.float64),
+                   np.array([lighting['eta'] for lighting in batch], dtype=np.float64),
+                   light_offsets.astype(np.int64),
+                   np.array([Il for k, Il in lights], dtype=np.float64).reshape(-1, 3),
+                   np.array([k for k, Il in lights], dtype=np.int64),
+                   np.array([Pl for Pl, radius in geometry], dtype=np.float64).reshape(-1, 3),
+                   np.array([radius for Pl, radius in geometry], dtype=np.float64),
+                   pixels)
+    return [{'width': gbuffer['width'], 'height': gbuffer['height'], 'pixels': bytearray(row)}
+            for row in pixels]
@@ -1,10 +1,27 @@
+import time
+# Início da inicialização (ver startup_times): as importações abaixo já são medidas
+STARTUP_BEGIN = time.perf_counter()
 import sys
+import argparse
+import atexit
+import json
 import math
 import os
+import ctypes
+import itertools
+import operator
+from array import array
+from collections import OrderedDict, deque
+# OpenGL e GLUT são necessários para abrir a janela e continuam importados aqui; do
+# GLU só são usadas as três funções abaixo. O pool de processos
+# (concurrent.futures/multiprocessing) só é importado no primeiro carregamento
 from OpenGL.GL import *
-from OpenGL.GLU import *
+from OpenGL.GLU import gluLookAt, gluOrtho2D, gluPerspective
 from OpenGL.GLUT import *
 
+import bvh
+import mesh_formats
+
 # -------------------------------------------------------------------
 # Variáveis globais de parâmetros e câmera
 # -------------------------------------------------------------------
@@ -14,6 +31,7 @@ up_vector  = [0.0, -1.0,  -1.0]
 
 fovy         = 45.0
 aspect_ratio = 1.0
+window_width, window_height = 800, 600
 near_plane   = 5.0
 far_plane    = 10000.0
 
@@ -31,20 +49,80 @@ material_shininess = 100.0
 # Lista global de objetos carregados.
 # Cada item será um dicionário: {
 #    "name": <nome do arquivo>,
-#    "vertices": [...],
-#    "faces": [...],
-#    "normals": [...]
+#    "path": <caminho do arquivo>,
+#    "num_vertices", "num_faces": <valores do cabeçalho do arquivo (None se o formato
+#                                  não os informa), atualizados ao carregar a geometria>,
+# e, enquanto a geometria estiver em memória (ver ensure_object_loaded):
+#    "vertices": <array('f') com x, y, z de cada vértice, em sequência>,
+#    "normals": <array('f') com a normal de cada vértice, em sequência>,
+#    "indices": <array plano de índices dos triângulos, 3 por triângulo, no menor
+#                tipo inteiro que comporta o número de vértices>,
+#    "bounds": <caixa envolvente ([mínimo], [máximo])>,
+#    "bvh": <hierarquia de volumes envolventes dos triângulos, ver bvh.build_bvh>,
+#    "gpu": <buffers enviados à GPU, criado ao abrir a janela>
 # }
 loaded_objects = []
 
+# Extensões dos arquivos de objetos: BYU e os formatos lidos por mesh_formats
+OBJECT_EXTENSIONS = ('.byu',) + mesh_formats.MESH_EXTENSIONS
+
+# Se True, a geometria fica em buffers na GPU (VBO/IBO); caso contrário, usa
+# vertex arrays do lado do cliente. Definido em init(), conforme o contexto OpenGL.
+use_vbo = False
+
 # Índice do objeto atual a ser renderizado
 current_object_index = 0
 
+# Orçamento de memória (bytes) para a geometria dos objetos carregados sob demanda.
+# Pode ser alterado em params.txt com "memory_budget = <MB>".
+memory_budget = 256 * 1024 * 1024
+
 # Variáveis para controle do mouse (rotação)
 mouse_left_down = False
 mouse_last_x = 0
 mouse_last_y = 0
 
+# Entrada acumulada desde o último quadro: deslocamento do mouse (pixels) e
+# movimento da câmera (unidades), aplicados de uma vez em apply_pending_input()
+pending_input = {'dx': 0, 'dy': 0, 'forward': 0.0, 'right': 0.0}
+
+# Taxa de quadros alvo e controle do ritmo (ver frame_tick)
+target_fps = 60.0
+needs_redraw = True
+next_frame_time = 0.0
+
+# Últimos valores enviados ao OpenGL por send_gl_state: (função, alvo, parâmetro) -> valor
+gl_state = {}
+
+# Monitoramento de params.txt (ver watch_parameters)
+PARAMS_FILE = "params.txt"
+PARAMS_POLL_INTERVAL = 0.25   # segundos entre verificações da data de modificação
+PARAMS_DEBOUNCE = 0.2         # segundos sem novas alterações antes de recarregar
+# 'camera' guarda a câmera (C, N, V) lida do arquivo na última leitura, para avisar
+# quando ela muda em uma recarga automática (que não a aplica)
+params_watch = {'mtime': None, 'changed_at': None, 'checked_at': 0.0, 'camera': None}
+
+# Cena com vários objetos (None = apenas o objeto atual; ver load_scene)
+scene = None
+
+# Instrumentação de quadros (None = desativada; ver enable_frame_stats)
+frame_stats = None
+
+# Gravação e reprodução da entrada (None = desativadas; ver start_recording e start_replay)
+input_recording = None
+input_replay = None
+
+# Se True (janela interativa), o objeto atual é carregado em segundo plano e a janela
+# mostra o progresso enquanto isso; caso contrário, o carregamento bloqueia o quadro.
+# 'loading' descreve o carregamento em andamento (None = nenhum; ver ensure_object_loaded).
+background_loading = False
+loading = None
+LOADING_REFRESH_INTERVAL = 0.25   # segundos entre atualizações da tela de carregamento
+
+# Medição da inicialização: segundos gastos em cada etapa, na ordem em que ocorreram
+# (None = concluída; ver mark_startup e report_startup)
+startup = {'times': {}, 'object': None, 'last': STARTUP_BEGIN, 'output': None}
+
 # -------------------------------------------------------------------
 # Funções de carregamento de parâmetros e objetos
 # -------------------------------------------------------------------
@@ -70,6 +148,7 @@ def load_parameters(filename):
     global fovy, aspect_ratio, near_plane, far_plane
     global light_pos, light_ambient, light_diffuse, light_specular
     global material_ambient, material_diffuse, material_specular, material_emissive, material_shininess
+    global memory_budget
 
     try:
         with open(filename, 'r', encoding='utf-8') as f:
@@ -117,165 +196,919 @@ def load_parameters(filename):
                         material_emissive = parts
                     elif key in ['eta', 'η', 'shininess']:
                         material_shininess = parts[0]
+                    elif key in ['memory_budget', 'orçamento de memória']:
+                        memory_budget = int(parts[0] * 1024 * 1024)
     except Exception as e:
         print("Erro ao carregar parâmetros:", e)
 
 def load_single_object(filepath):
     """
     Carrega um objeto 3D no formato BYU a partir de um arquivo.
-    Retorna um dicionário com 'vertices', 'faces' e 'normals' (inicialmente vazio).
+    Retorna um dicionário com a geometria em arrays compactos:
+      'vertices': array('f') com as coordenadas x, y, z de cada vértice, em sequência;
+      'faces': array('i') com os índices (base 0) de todas as faces, em sequência;
+      'face_starts': array('I') com a posição de cada face em 'faces' (e o total no fim);
+      'normals': vazio até compute_normals.
     
     Formato BYU esperado:
       - Primeira linha: num_vertices num_faces num_boundaries
       - Próximas num_vertices linhas: cada linha com as coordenadas x y z (floats)
       - Em seguida, as faces: índices de vértices (base 1) terminados por -1.
-    """
-    obj_data = {
-        'vertices': [],
-        'faces': [],
-        'normals': []
-    }
 
+    O corpo do arquivo é lido e separado em tokens de uma só vez; a conversão
+    numérica e a busca pelos terminadores das faces são feitas em bloco
+    (map e list.index), sem laços por token em Python.
+
+    Arquivos .ply, .stl e .obj são lidos por mesh_formats.read_mesh, que devolve
+    a mesma estrutura.
+    """
+    if filepath.lower().endswith(mesh_formats.MESH_EXTENSIONS):
+        obj_data = mesh_formats.read_mesh(filepath)
+        if obj_data['vertices'].typecode != 'f':
+            obj_data['vertices'] = array('f', obj_data['vertices'])
+        obj_data['normals'] = array('f')
+        return obj_data
     with open(filepath, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-        if len(lines) < 1:
+        # Cabeçalho (o terceiro valor, num_boundaries, é opcional e ignorado)
+        header = f.readline().split()
+        if not header:
             return None
-
-        # Cabeçalho
-        header = lines[0].split()
         if len(header) < 2:
             print(f"Formato inválido em {filepath}")
             return None
+        tokens = f.read().split()
+
+    num_vertices = int(header[0])
 
-        num_vertices = int(header[0])
-        num_faces = int(header[1])
-        # Se houver um terceiro valor, num_boundaries = int(header[2])
-
-        # Lê vértices
-        start_line = 1
-        for i in range(num_vertices):
-            parts = lines[start_line + i].split()
-            v = [float(p) for p in parts]
-            obj_data['vertices'].append(v)
-        start_line += num_vertices
-
-        # Lê faces
-        face_indices = []
-        for line in lines[start_line:]:
-            parts = line.split()
-            for p in parts:
-                idx = int(p)
-                if idx == -1:
-                    if face_indices:
-                        face = [fi - 1 for fi in face_indices]  # converte para índice base 0
-                        obj_data['faces'].append(face)
-                        face_indices = []
-                else:
-                    face_indices.append(idx)
-        # Se sobrou algo (caso não tenha -1 na última face)
-        if face_indices:
-            face = [fi - 1 for fi in face_indices]
-            obj_data['faces'].append(face)
-
-    return obj_data
+    # Vértices: 3 coordenadas por vértice
+    num_coords = 3 * num_vertices
+    if len(tokens) < num_coords:
+        raise ValueError(f"esperados {num_vertices} vértices, encontrados {len(tokens) // 3}")
+    vertices = array('f', map(float, tokens[:num_coords]))
+
+    # Faces: índices já convertidos para base 0, de modo que o terminador -1 vira -2
+    indices = list(map(operator.add, map(int, tokens[num_coords:]), itertools.repeat(-1)))
+    faces = array('i')
+    face_starts = array('I')
+    start = 0
+    end_of_faces = len(indices)
+    while start < end_of_faces:
+        try:
+            end = indices.index(-2, start)
+        except ValueError:
+            end = end_of_faces  # última face sem -1
+        if end > start:
+            face_starts.append(len(faces))
+            faces.extend(indices[start:end])
+        start = end + 1
+    face_starts.append(len(faces))
+
+    return {
+        'vertices': vertices,
+        'faces': faces,
+        'face_starts': face_starts,
+        'normals': array('f')
+    }
 
 def compute_normals(obj_data):
     """
     Calcula as normais para cada vértice do objeto, somando as normais
-    de cada face adjacente (método Gouraud).
+    de cada face adjacente (método Gouraud). O resultado é um array('f')
+    com 3 componentes por vértice.
     """
     vertices = obj_data['vertices']
     faces = obj_data['faces']
-    normals = [[0.0, 0.0, 0.0] for _ in range(len(vertices))]
+    face_starts = obj_data['face_starts']
+    num_vertices = len(vertices) // 3
+    sums = [0.0] * len(vertices)
 
-    for face in faces:
-        if len(face) < 3:
+    for f in range(len(face_starts) - 1):
+        begin, end = face_starts[f], face_starts[f + 1]
+        if end - begin < 3:
             continue
-        v0 = vertices[face[0]]
-        v1 = vertices[face[1]]
-        v2 = vertices[face[2]]
+        i0, i1, i2 = faces[begin], faces[begin + 1], faces[begin + 2]
+        if not (0 <= i0 < num_vertices and 0 <= i1 < num_vertices and 0 <= i2 < num_vertices):
+            continue
+        a, b, c = 3 * i0, 3 * i1, 3 * i2
         # Vetores da face
-        edge1 = [v1[i] - v0[i] for i in range(3)]
-        edge2 = [v2[i] - v0[i] for i in range(3)]
+        e1x, e1y, e1z = vertices[b] - vertices[a], vertices[b + 1] - vertices[a + 1], vertices[b + 2] - vertices[a + 2]
+        e2x, e2y, e2z = vertices[c] - vertices[a], vertices[c + 1] - vertices[a + 1], vertices[c + 2] - vertices[a + 2]
         # Produto vetorial -> normal da face
-        normal = [
-            edge1[1]*edge2[2] - edge1[2]*edge2[1],
-            edge1[2]*edge2[0] - edge1[0]*edge2[2],
-            edge1[0]*edge2[1] - edge1[1]*edge2[0]
-        ]
-        length = math.sqrt(normal[0]**2 + normal[1]**2 + normal[2]**2)
+        nx = e1y*e2z - e1z*e2y
+        ny = e1z*e2x - e1x*e2z
+        nz = e1x*e2y - e1y*e2x
+        length = math.sqrt(nx**2 + ny**2 + nz**2)
         if length != 0:
-            normal = [n / length for n in normal]
+            nx, ny, nz = nx / length, ny / length, nz / length
 
         # Soma essa normal em cada vértice da face
-        for idx in face:
-            if 0 <= idx < len(normals):
-                normals[idx] = [normals[idx][j] + normal[j] for j in range(3)]
+        for idx in faces[begin:end]:
+            if 0 <= idx < num_vertices:
+                k = 3 * idx
+                sums[k] += nx
+                sums[k + 1] += ny
+                sums[k + 2] += nz
 
     # Normaliza as normais
-    for i in range(len(normals)):
-        length = math.sqrt(sum([normals[i][j]**2 for j in range(3)]))
+    normals = array('f', bytes(4 * len(sums)))
+    for k in range(0, len(sums), 3):
+        x, y, z = sums[k], sums[k + 1], sums[k + 2]
+        length = math.sqrt(x*x + y*y + z*z)
         if length != 0:
-            normals[i] = [normals[i][j] / length for j in range(3)]
-        else:
-            normals[i] = [0.0, 0.0, 0.0]
+            normals[k], normals[k + 1], normals[k + 2] = x / length, y / length, z / length
 
     obj_data['normals'] = normals
 
-def load_all_objects(folder):
+def index_type_for(num_vertices):
+    """
+    Retorna o menor tipo de índice que comporta num_vertices vértices:
+    (código do array, tipo OpenGL, tipo ctypes).
+    """
+    if num_vertices <= 0xFF:
+        return 'B', GL_UNSIGNED_BYTE, ctypes.c_ubyte
+    if num_vertices <= 0xFFFF:
+        return 'H', GL_UNSIGNED_SHORT, ctypes.c_ushort
+    return 'I', GL_UNSIGNED_INT, ctypes.c_uint
+
+def triangulate_faces(faces, face_starts, num_vertices):
     """
-    Percorre a pasta 'folder', carrega todos os arquivos .byu encontrados
-    e armazena cada objeto (com nome) na lista global 'loaded_objects'.
+    Valida as faces (ver load_single_object) e as triangula em "fan", uma única vez, no carregamento.
+    Faces com menos de 3 vértices ou com índices fora de [0, num_vertices) são descartadas.
+    Retorna (indices, faces_dos_triangulos, descartadas): um array plano de índices
+    (3 por triângulo), no menor tipo inteiro que comporta os índices, a face de
+    origem de cada triângulo e o número de faces descartadas.
     """
-    global loaded_objects
+    flat = []
+    triangle_faces = []
+    dropped = 0
+    for face_index in range(len(face_starts) - 1):
+        face = faces[face_starts[face_index]:face_starts[face_index + 1]]
+        if len(face) < 3 or min(face) < 0 or max(face) >= num_vertices:
+            dropped += 1
+            continue
+        first = face[0]
+        for i in range(1, len(face) - 1):
+            flat.extend((first, face[i], face[i + 1]))
+            triangle_faces.append(face_index)
+    return array(index_type_for(num_vertices)[0], flat), triangle_faces, dropped
+
+# -------------------------------------------------------------------
+# Seleção com o mouse (a BVH e os testes de raio ficam em bvh.py)
+# -------------------------------------------------------------------
+def cursor_ray(x, y):
+    """
+    Raio (origem, direção normalizada) em coordenadas do mundo que passa pelo
+    pixel (x, y) da janela, para a câmera de gluLookAt/gluPerspective.
+    """
+    length = math.sqrt(sum(c * c for c in view_dir)) or 1.0
+    f = [c / length for c in view_dir]
+    s = [f[1]*up_vector[2] - f[2]*up_vector[1],
+         f[2]*up_vector[0] - f[0]*up_vector[2],
+         f[0]*up_vector[1] - f[1]*up_vector[0]]
+    length = math.sqrt(sum(c * c for c in s)) or 1.0
+    s = [c / length for c in s]
+    u = [s[1]*f[2] - s[2]*f[1], s[2]*f[0] - s[0]*f[2], s[0]*f[1] - s[1]*f[0]]
+    tan_v = math.tan(math.radians(fovy) / 2.0)
+    tan_h = tan_v * aspect_ratio
+    # Coordenadas normalizadas do centro do pixel (o y da janela cresce para baixo)
+    ndc_x = 2.0 * (x + 0.5) / window_width - 1.0
+    ndc_y = 1.0 - 2.0 * (y + 0.5) / window_height
+    direction = [f[i] + s[i] * ndc_x * tan_h + u[i] * ndc_y * tan_v for i in range(3)]
+    length = math.sqrt(sum(c * c for c in direction))
+    return list(camera_pos), [c / length for c in direction]
+
+def pick(x, y):
+    """
+    Seleciona o que está sob o pixel (x, y) da janela: o objeto atual ou, no modo
+    cena, a instância mais próxima.
+
+    Retorna:
+        dict: {'object': índice em loaded_objects, 'instance': índice da instância
+               (None fora do modo cena), 'face': índice da face no arquivo .byu,
+               'point': ponto atingido em coordenadas do mundo, 'distance': distância
+               da câmera} ou None se o raio não atinge nada.
+    """
+    origin, direction = cursor_ray(x, y)
+    if scene is None:
+        candidates = [(0.0, current_object_index, None, (0.0, 0.0, 0.0), 1.0)] if loaded_objects else []
+    else:
+        inv_dir = [1.0 / d if d != 0 else float('inf') for d in direction]
+        candidates = []
+        for i, inst in enumerate(scene['instances']):
+            box = array('d', inst['box'][0] + inst['box'][1])
+            t = bvh.intersect_box(origin, inv_dir, box, 0, float('inf'))
+            if t is not None:
+                candidates.append((t, i, inst))
+        candidates.sort(key=lambda c: c[0])
+        candidates = [(t, inst['object'], i, inst['offset'], inst['scale']) for t, i, inst in candidates]
+
+    best = None
+    for t_box, index, instance, offset, scale in candidates:
+        if best is not None and t_box > best['distance']:
+            break  # caixas ordenadas pela distância de entrada: nenhuma outra pode estar mais perto
+        obj = loaded_objects[index]
+        if 'bvh' not in obj:
+            continue
+        # Raio no espaço do objeto; com a mesma direção (escala uniforme), t vale nos dois espaços
+        local_origin = [(origin[i] - offset[i]) / scale for i in range(3)]
+        t_max = best['distance'] / scale if best is not None else float('inf')
+        hit = bvh.intersect_bvh(obj, local_origin, direction, t_max)
+        if hit is None:
+            continue
+        t = hit[0] * scale
+        best = {'object': index, 'instance': instance, 'face': hit[1],
+                'point': [origin[i] + direction[i] * t for i in range(3)], 'distance': t}
+    return best
+
+def object_bounds(vertices):
+    """
+    Caixa envolvente alinhada aos eixos dos vértices: ([xmin, ymin, zmin], [xmax, ymax, zmax]).
+    """
+    if not vertices:
+        return [0.0, 0.0, 0.0], [0.0, 0.0, 0.0]
+    axes = [vertices[i::3] for i in range(3)]
+    return [min(a) for a in axes], [max(a) for a in axes]
+
+def load_object_file(full_path):
+    """
+    Carrega um arquivo de objeto (ver load_single_object), calcula as normais e triangula as faces.
+    Executada nos processos do pool de pré-carregamento; nunca lança exceções:
+    retorna um dicionário com 'object' (ou 'error'), 'dropped', 'seconds' e
+    'times' (segundos gastos em cada etapa: 'parse', 'normals', 'triangulate', 'bvh').
+    As faces originais não são mantidas depois da triangulação (apenas a contagem).
+    """
+    start = time.perf_counter()
+    result = {'object': None, 'error': None, 'dropped': 0, 'times': {}}
+    times = result['times']
+    try:
+        obj_data = load_single_object(full_path)
+        times['parse'] = time.perf_counter() - start
+        if obj_data:
+            compute_normals(obj_data)
+            times['normals'] = time.perf_counter() - start - times['parse']
+            faces, face_starts = obj_data.pop('faces'), obj_data.pop('face_starts')
+            obj_data['num_vertices'] = len(obj_data['vertices']) // 3
+            obj_data['num_faces'] = len(face_starts) - 1
+            indices, triangle_faces, dropped = triangulate_faces(faces, face_starts, obj_data['num_vertices'])
+            obj_data['indices'] = indices
+            obj_data['bounds'] = object_bounds(obj_data['vertices'])
+            bvh_start = time.perf_counter()
+            times['triangulate'] = bvh_start - start - times['parse'] - times['normals']
+            obj_data['bvh'] = bvh.build_bvh(obj_data['vertices'], indices, triangle_faces)
+            times['bvh'] = time.perf_counter() - bvh_start
+            result['object'] = obj_data
+            result['dropped'] = dropped
+        else:
+            result['error'] = "formato inválido"
+    except Exception as e:
+        result['error'] = str(e)
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+# -------------------------------------------------------------------
+# Carregamento sob demanda com orçamento de memória (LRU)
+# -------------------------------------------------------------------
+GEOMETRY_KEYS = ('vertices', 'normals', 'indices', 'bounds', 'bvh')
+
+# Objetos com geometria em memória: índice -> bytes estimados, do exibido há mais
+# tempo para o mais recente.
+resident_objects = OrderedDict()
+resident_bytes = 0
+
+# Objetos que nunca são descartados (ex.: malhas usadas pela cena, ver prepare_scene)
+pinned_objects = set()
+
+# Pool de processos para pré-carregar os objetos vizinhos e os jobs pendentes (índice -> Future)
+prefetch_pool = None
+prefetch_jobs = {}
+
+def read_byu_header(filepath):
+    """
+    Lê apenas o cabeçalho de um arquivo BYU. Retorna (num_vertices, num_faces) ou None.
+    """
+    with open(filepath, 'r', encoding='utf-8') as f:
+        header = f.readline().split()
+    if len(header) < 2:
+        return None
+    return int(header[0]), int(header[1])
+
+def index_objects(folder):
+    """
+    Indexa os arquivos de objetos (OBJECT_EXTENSIONS) da pasta 'folder' em 'loaded_objects'
+    lendo apenas o nome e o cabeçalho de cada um, em ordem alfabética. A geometria é
+    carregada no primeiro display() do objeto (ou por preload_objects, com --preload), e
+    store_loaded_object informa o tempo e as falhas de cada arquivo. Aqui são informados
+    os arquivos cujo cabeçalho não pôde ser lido, o total de falhas e o tempo da indexação.
+    """
+    global loaded_objects, resident_bytes
+    for obj in loaded_objects:
+        unload_object(obj)
     loaded_objects = []
+    resident_objects.clear()
+    resident_bytes = 0
+    pinned_objects.clear()
+    for future in prefetch_jobs.values():
+        future.cancel()
+    prefetch_jobs.clear()
 
     if not os.path.isdir(folder):
         print(f"Pasta '{folder}' não encontrada.")
         return
 
-    for filename in os.listdir(folder):
-        if filename.lower().endswith('.byu'):
-            full_path = os.path.join(folder, filename)
-            try:
-                obj_data = load_single_object(full_path)
-                if obj_data:
-                    compute_normals(obj_data)
-                    loaded_objects.append({
-                        "name": filename,
-                        "vertices": obj_data['vertices'],
-                        "faces": obj_data['faces'],
-                        "normals": obj_data['normals']
-                    })
-                    print(f"Objeto '{filename}' carregado com sucesso. "
-                          f"Vértices: {len(obj_data['vertices'])}, "
-                          f"Faces: {len(obj_data['faces'])}")
-            except Exception as e:
-                print(f"Erro ao carregar {full_path}:", e)
+    start = time.perf_counter()
+    failures = 0
+    for filename in sorted(f for f in os.listdir(folder) if f.lower().endswith(OBJECT_EXTENSIONS)):
+        full_path = os.path.join(folder, filename)
+        try:
+            if filename.lower().endswith('.byu'):
+                header = read_byu_header(full_path)
+            else:
+                header = mesh_formats.read_mesh_header(full_path)
+        except (OSError, ValueError) as e:
+            print(f"Erro ao ler o cabeçalho de {full_path}:", e)
+            failures += 1
+            continue
+        if header is None:
+            print(f"Formato inválido em {full_path}")
+            failures += 1
+            continue
+        loaded_objects.append({
+            "name": filename,
+            "path": full_path,
+            "num_vertices": header[0],
+            "num_faces": header[1]
+        })
+    print(f"{len(loaded_objects)} objeto(s) indexado(s) em '{folder}' em {time.perf_counter() - start:.3f} s"
+          + (f", {failures} falha(s)." if failures else "."))
+
+def object_memory_report(obj):
+    """
+    Memória (em bytes) ocupada pelos arrays do objeto na RAM, por componente:
+    'vertices', 'normals', 'indices', 'bvh' e 'total'.
+    """
+    report = {key: obj[key].itemsize * len(obj[key]) for key in ('vertices', 'normals', 'indices')}
+    report['bvh'] = sum(a.itemsize * len(a) for a in obj['bvh'].values())
+    report['total'] = sum(report.values())
+    return report
+
+def object_memory_bytes(obj):
+    """
+    Memória (em bytes) ocupada pela geometria do objeto na RAM.
+    """
+    return object_memory_report(obj)['total']
+
+def format_memory_report(obj):
+    report = object_memory_report(obj)
+    kb = {key: value / 1024 for key, value in report.items()}
+    return (f"{kb['total']:.1f} KB (posições {kb['vertices']:.1f}, normais {kb['normals']:.1f}, "
+            f"índices {kb['indices']:.1f} [{obj['indices'].typecode}], BVH {kb['bvh']:.1f})")
+
+def unload_object(obj):
+    """
+    Descarta a geometria do objeto (RAM e buffers de GPU), mantendo apenas o índice.
+    """
+    free_object_buffers(obj)
+    for key in GEOMETRY_KEYS:
+        obj.pop(key, None)
+
+def evict_objects(keep):
+    """
+    Descarta os objetos exibidos há mais tempo até a geometria em memória caber em
+    memory_budget. O objeto 'keep' (o atual) e os de pinned_objects nunca são descartados.
+    """
+    global resident_bytes
+    for index in list(resident_objects):
+        if resident_bytes <= memory_budget:
+            break
+        if index == keep or index in pinned_objects:
+            continue
+        size = resident_objects.pop(index)
+        unload_object(loaded_objects[index])
+        resident_bytes -= size
+        print(f"Objeto '{loaded_objects[index]['name']}' descartado da memória.")
+
+def prefetch_objects(indices):
+    """
+    Começa a carregar, em segundo plano, os objetos indicados que ainda não estão em memória.
+    """
+    global prefetch_pool
+    for index in indices:
+        obj = loaded_objects[index]
+        if 'vertices' in obj or 'error' in obj or index in prefetch_jobs:
+            continue
+        if prefetch_pool is None:
+            from concurrent.futures import ProcessPoolExecutor
+            prefetch_pool = ProcessPoolExecutor(max_workers=2)
+        prefetch_jobs[index] = prefetch_pool.submit(load_object_file, obj['path'])
+
+def store_loaded_object(index, result):
+    """
+    Guarda no objeto 'index' a geometria de um resultado de load_object_file, envia-a
+    para a GPU e a registra no LRU, mostrando o tempo, os avisos e a memória ocupada.
+    Em caso de falha, marca o objeto com 'error'. Retorna True se o objeto foi carregado.
+    """
+    global resident_bytes
+    obj = loaded_objects[index]
+    obj_data = result['object']
+    if obj_data is None:
+        obj['error'] = result['error']
+        print(f"Erro ao carregar {obj['path']}: {result['error']} ({result['seconds']:.3f} s)")
+        return False
+    for key in GEOMETRY_KEYS:
+        obj[key] = obj_data[key]
+    obj['num_vertices'], obj['num_faces'] = obj_data['num_vertices'], obj_data['num_faces']
+    if result['dropped']:
+        print(f"  Aviso: {result['dropped']} face(s) com índices inválidos descartada(s) em '{obj['name']}'.")
+    upload_object_buffers(obj)
+    size = object_memory_bytes(obj)
+    resident_objects[index] = size
+    resident_bytes += size
+    print(f"Objeto '{obj['name']}' carregado em {result['seconds']:.3f} s "
+          f"(BVH {result['times']['bvh']:.3f} s; em memória: {resident_bytes / (1024 * 1024):.1f} MB).")
+    print("  Memória: " + format_memory_report(obj))
+    return True
+
+def preload_objects(workers=None):
+    """
+    Carrega de uma vez todos os objetos indexados, em paralelo, por um pool de
+    'workers' processos (padrão: número de CPUs; workers=1 carrega tudo no processo
+    atual), e os envia para a GPU. Os objetos pré-carregados ficam fixos na memória
+    (pinned_objects), sem passar pelo orçamento do LRU. Exige o contexto OpenGL já criado.
+    """
+    pending = [i for i, obj in enumerate(loaded_objects) if 'vertices' not in obj and 'error' not in obj]
+    paths = [loaded_objects[i]['path'] for i in pending]
+    start = time.perf_counter()
+    if workers == 1 or len(paths) < 2:
+        results = [load_object_file(p) for p in paths]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunksize = max(1, len(paths) // (4 * workers))
+            results = list(pool.map(load_object_file, paths, chunksize=chunksize))
+
+    failures = 0
+    for index, result in zip(pending, results):
+        if store_loaded_object(index, result):
+            pinned_objects.add(index)
+        else:
+            failures += 1
+    print(f"{len(pending) - failures} objeto(s) carregado(s) em {time.perf_counter() - start:.3f} s"
+          + (f", {failures} falha(s)." if failures else "."))
+
+def ensure_object_loaded(index, wait=True, prefetch=True):
+    """
+    Garante que a geometria do objeto 'index' esteja em memória e na GPU, usando o
+    resultado do pré-carregamento quando houver. Marca o objeto como o mais recente
+    no LRU, descarta objetos antigos se o orçamento for excedido e, com prefetch=True,
+    pré-carrega os vizinhos (teclas 'n' e 'p'). Retorna False se o objeto não puder
+    ser carregado.
+
+    Com wait=False, o objeto é carregado em segundo plano: a função retorna False
+    (e registra o andamento em 'loading') até o carregamento terminar.
+    """
+    global loading
+    previous, loading = loading, None
+    obj = loaded_objects[index]
+    if 'vertices' in obj:
+        if index in resident_objects:
+            resident_objects.move_to_end(index)
+        return True
+    if 'error' in obj:
+        return False
+
+    if not wait:
+        if index not in prefetch_jobs:
+            prefetch_objects([index])
+        if not prefetch_jobs[index].done():
+            if previous is not None and previous['index'] == index:
+                loading = previous
+            else:
+                loading = {'index': index, 'since': time.perf_counter(), 'drawn': 0.0}
+            return False
+    future = prefetch_jobs.pop(index, None)
+    result = future.result() if future is not None else load_object_file(obj['path'])
+    if startup is not None and startup['object'] is None:
+        startup['object'] = dict(name=obj['name'], **result['times'])
+    if not store_loaded_object(index, result):
+        return False
+    evict_objects(index)
+    if prefetch:
+        n = len(loaded_objects)
+        prefetch_objects([(index + 1) % n, (index - 1) % n])
+    return True
+
+# -------------------------------------------------------------------
+# Buffers de vértices na GPU
+# -------------------------------------------------------------------
+def upload_object_buffers(obj):
+    """
+    Envia a geometria do objeto para a GPU uma única vez: posições e normais em
+    buffers de vértices (VBO) e os índices dos triângulos em um buffer de índices (IBO).
+    Sem suporte a VBO, guarda os mesmos arrays para uso como vertex arrays do cliente.
+    """
+    positions = obj['vertices']
+    normals = obj['normals']
+    indices = obj['indices']
+    typecode, gl_type, c_type = index_type_for(len(positions) // 3)
+    gpu = {'count': len(indices), 'index_type': gl_type}
+    # Arrays ctypes que compartilham a memória dos arrays acima (sem cópia)
+    data = [(ctypes.c_float * len(positions)).from_buffer(positions),
+            (ctypes.c_float * len(normals)).from_buffer(normals),
+            (c_type * len(indices)).from_buffer(indices)]
+    if use_vbo:
+        gpu['buffers'] = glGenBuffers(3)
+        glBindBuffer(GL_ARRAY_BUFFER, gpu['buffers'][0])
+        glBufferData(GL_ARRAY_BUFFER, data[0], GL_STATIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, gpu['buffers'][1])
+        glBufferData(GL_ARRAY_BUFFER, data[1], GL_STATIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, gpu['buffers'][2])
+        glBufferData(GL_ELEMENT_ARRAY_BUFFER, data[2], GL_STATIC_DRAW)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+    else:
+        gpu['arrays'] = data
+        gpu['storage'] = (positions, normals, indices)
+    obj['gpu'] = gpu
+
+def free_object_buffers(obj):
+    """
+    Libera os buffers de GPU do objeto (se existirem).
+    """
+    gpu = obj.pop('gpu', None)
+    if gpu is not None and 'buffers' in gpu:
+        glDeleteBuffers(3, gpu['buffers'])
+
+def draw_object(obj):
+    """
+    Desenha o objeto com uma única chamada glDrawElements.
+    """
+    gpu = obj['gpu']
+    glEnableClientState(GL_VERTEX_ARRAY)
+    glEnableClientState(GL_NORMAL_ARRAY)
+    if use_vbo:
+        glBindBuffer(GL_ARRAY_BUFFER, gpu['buffers'][0])
+        glVertexPointer(3, GL_FLOAT, 0, None)
+        glBindBuffer(GL_ARRAY_BUFFER, gpu['buffers'][1])
+        glNormalPointer(GL_FLOAT, 0, None)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, gpu['buffers'][2])
+        glDrawElements(GL_TRIANGLES, gpu['count'], gpu['index_type'], None)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+    else:
+        glVertexPointer(3, GL_FLOAT, 0, gpu['arrays'][0])
+        glNormalPointer(GL_FLOAT, 0, gpu['arrays'][1])
+        glDrawElements(GL_TRIANGLES, gpu['count'], gpu['index_type'], gpu['arrays'][2])
+    glDisableClientState(GL_NORMAL_ARRAY)
+    glDisableClientState(GL_VERTEX_ARRAY)
+
+# -------------------------------------------------------------------
+# Cena com vários objetos: instanciamento, culling e occlusion queries
+# -------------------------------------------------------------------
+# Shader do desenho instanciado. Reproduz a iluminação por vértice (Gouraud) do
+# pipeline fixo para GL_LIGHT0 e o material de GL_FRONT, lidos dos uniforms
+# embutidos do perfil de compatibilidade, e aplica a cada instância o
+# deslocamento (xyz) e a escala (w) do atributo 'instance'.
+INSTANCE_VERTEX_SHADER = """
+#version 120
+attribute vec4 instance;
+void main() {
+    vec4 position = vec4(gl_Vertex.xyz * instance.w + instance.xyz, 1.0);
+    vec3 eye_position = vec3(gl_ModelViewMatrix * position);
+    vec3 N = normalize(gl_NormalMatrix * gl_Normal);
+    vec3 L = gl_LightSource[0].position.w == 0.0
+        ? normalize(gl_LightSource[0].position.xyz)
+        : normalize(gl_LightSource[0].position.xyz - eye_position);
+    vec3 H = normalize(L + vec3(0.0, 0.0, 1.0));
+    float ndotl = max(dot(N, L), 0.0);
+    vec4 color = gl_FrontLightModelProduct.sceneColor + gl_FrontLightProduct[0].ambient
+               + ndotl * gl_FrontLightProduct[0].diffuse;
+    if (ndotl > 0.0)
+        color += pow(max(dot(N, H), 0.0), gl_FrontMaterial.shininess) * gl_FrontLightProduct[0].specular;
+    gl_FrontColor = clamp(color, 0.0, 1.0);
+    gl_Position = gl_ModelViewProjectionMatrix * position;
+}
+"""
+
+INSTANCE_FRAGMENT_SHADER = """
+#version 120
+void main() {
+    gl_FragColor = gl_Color;
+}
+"""
+
+# Local fixo do atributo 'instance' (fora dos locais usados pelos atributos do pipeline fixo)
+INSTANCE_ATTRIBUTE = 6
+
+# Cubo unitário [0,1]^3 (6 faces em GL_QUADS) desenhado nas occlusion queries
+UNIT_CUBE = array('f', [
+    0, 0, 0,  0, 1, 0,  1, 1, 0,  1, 0, 0,
+    0, 0, 1,  1, 0, 1,  1, 1, 1,  0, 1, 1,
+    0, 0, 0,  1, 0, 0,  1, 0, 1,  0, 0, 1,
+    0, 1, 0,  0, 1, 1,  1, 1, 1,  1, 1, 0,
+    0, 0, 0,  0, 0, 1,  0, 1, 1,  0, 1, 0,
+    1, 0, 0,  1, 1, 0,  1, 1, 1,  1, 0, 1,
+])
+
+def load_scene(filename):
+    """
+    Lê um arquivo de cena. Cada linha (exceto vazias e comentários com '#') tem:
+        <arquivo.byu> x y z [escala [nx ny nz espaçamento]]
+    e coloca o objeto com o deslocamento e a escala indicados. Com nx, ny e nz,
+    cria uma grade de nx * ny * nz instâncias a partir de (x, y, z), separadas
+    por 'espaçamento' em cada eixo. Os objetos são os indexados em 'loaded_objects'.
+    """
+    names = {obj['name']: i for i, obj in enumerate(loaded_objects)}
+    instances = []
+    with open(filename, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            parts = line.split('#', 1)[0].split()
+            if not parts:
+                continue
+            if parts[0] not in names or len(parts) not in (4, 5, 9):
+                print(f"Linha {line_number} de '{filename}' ignorada: {line.strip()}")
+                continue
+            x, y, z = (float(p) for p in parts[1:4])
+            scale = float(parts[4]) if len(parts) > 4 else 1.0
+            nx, ny, nz = (int(p) for p in parts[5:8]) if len(parts) == 9 else (1, 1, 1)
+            spacing = float(parts[8]) if len(parts) == 9 else 0.0
+            for i in range(nx):
+                for j in range(ny):
+                    for k in range(nz):
+                        instances.append({
+                            'object': names[parts[0]],
+                            'offset': (x + i * spacing, y + j * spacing, z + k * spacing),
+                            'scale': scale,
+                            'query': None,
+                            'pending': False,   # há uma query aguardando resultado
+                            'occluded': False   # a última query não passou nenhum fragmento
+                        })
+    print(f"Cena '{filename}': {len(instances)} instância(s) de "
+          f"{len({inst['object'] for inst in instances})} objeto(s).")
+    return {'instances': instances, 'program': None, 'instance_buffers': {},
+            'stats': {'drawn': 0, 'culled': 0, 'occluded': 0, 'draw_calls': 0}}
+
+def compile_instance_program():
+    """
+    Compila o shader de instanciamento. Retorna o programa ou None se o contexto
+    não oferecer shaders e desenho instanciado.
+    """
+    if not (use_vbo and bool(glCreateShader) and bool(glDrawElementsInstanced)
+            and bool(glVertexAttribDivisor)):
+        return None
+    shaders = []
+    for kind, source in ((GL_VERTEX_SHADER, INSTANCE_VERTEX_SHADER),
+                         (GL_FRAGMENT_SHADER, INSTANCE_FRAGMENT_SHADER)):
+        shader = glCreateShader(kind)
+        glShaderSource(shader, source)
+        glCompileShader(shader)
+        if not glGetShaderiv(shader, GL_COMPILE_STATUS):
+            print("Erro no shader de instanciamento:", glGetShaderInfoLog(shader))
+            return None
+        shaders.append(shader)
+    program = glCreateProgram()
+    for shader in shaders:
+        glAttachShader(program, shader)
+    glBindAttribLocation(program, INSTANCE_ATTRIBUTE, "instance")
+    glLinkProgram(program)
+    for shader in shaders:
+        glDeleteShader(shader)
+    if not glGetProgramiv(program, GL_LINK_STATUS):
+        print("Erro no shader de instanciamento:", glGetProgramInfoLog(program))
+        return None
+    return program
+
+def prepare_scene(scene):
+    """
+    Com o contexto OpenGL já criado: carrega e fixa em memória as malhas da cena,
+    calcula a caixa envolvente de cada instância e cria as occlusion queries e o
+    shader de instanciamento (quando suportados).
+    """
+    for index in sorted({inst['object'] for inst in scene['instances']}):
+        pinned_objects.add(index)
+        ensure_object_loaded(index, prefetch=False)
+    scene['instances'] = [inst for inst in scene['instances'] if 'bounds' in loaded_objects[inst['object']]]
+    for inst in scene['instances']:
+        low, high = loaded_objects[inst['object']]['bounds']
+        s = inst['scale']
+        inst['box'] = ([inst['offset'][i] + s * low[i] for i in range(3)],
+                       [inst['offset'][i] + s * high[i] for i in range(3)])
+    if bool(glGenQueries) and scene['instances']:
+        queries = glGenQueries(len(scene['instances']))
+        for inst, query in zip(scene['instances'], queries):
+            inst['query'] = query
+    scene['program'] = compile_instance_program()
+    print("Cena: " + ("desenho instanciado" if scene['program'] else "uma chamada por instância")
+          + (", com occlusion queries." if bool(glGenQueries) else ", sem occlusion queries."))
+
+def frustum_planes():
+    """
+    Planos do volume de visão (gluLookAt + gluPerspective) em coordenadas do mundo,
+    como pares (normal, d), com normal·P + d >= 0 para pontos P dentro do volume.
+    """
+    length = math.sqrt(sum(c * c for c in view_dir)) or 1.0
+    f = [c / length for c in view_dir]
+    s = [f[1]*up_vector[2] - f[2]*up_vector[1],
+         f[2]*up_vector[0] - f[0]*up_vector[2],
+         f[0]*up_vector[1] - f[1]*up_vector[0]]
+    length = math.sqrt(sum(c * c for c in s)) or 1.0
+    s = [c / length for c in s]
+    u = [s[1]*f[2] - s[2]*f[1], s[2]*f[0] - s[0]*f[2], s[0]*f[1] - s[1]*f[0]]
+    tan_v = math.tan(math.radians(fovy) / 2.0)
+    tan_h = tan_v * aspect_ratio
+
+    def plane(normal, point):
+        return normal, -sum(normal[i] * point[i] for i in range(3))
+
+    near_point = [camera_pos[i] + f[i] * near_plane for i in range(3)]
+    far_point = [camera_pos[i] + f[i] * far_plane for i in range(3)]
+    return [plane(f, near_point),
+            plane([-c for c in f], far_point),
+            plane([f[i] * tan_h + s[i] for i in range(3)], camera_pos),   # esquerda
+            plane([f[i] * tan_h - s[i] for i in range(3)], camera_pos),   # direita
+            plane([f[i] * tan_v + u[i] for i in range(3)], camera_pos),   # baixo
+            plane([f[i] * tan_v - u[i] for i in range(3)], camera_pos)]   # cima
+
+def box_in_frustum(box, planes):
+    """
+    Teste conservador da caixa (min, max) contra os planos: False só se a caixa
+    estiver inteiramente fora de algum plano.
+    """
+    low, high = box
+    for normal, d in planes:
+        # Vértice da caixa mais à frente na direção da normal
+        if (normal[0] * (high[0] if normal[0] > 0 else low[0])
+                + normal[1] * (high[1] if normal[1] > 0 else low[1])
+                + normal[2] * (high[2] if normal[2] > 0 else low[2]) + d) < 0:
+            return False
+    return True
+
+def draw_instances(scene, index, instances):
+    """
+    Desenha todas as instâncias de uma malha: com o shader, em uma única chamada
+    glDrawElementsInstanced; sem ele, uma chamada draw_object por instância.
+    """
+    obj = loaded_objects[index]
+    program = scene['program']
+    if program is None:
+        glEnable(GL_NORMALIZE)  # a escala altera o comprimento das normais
+        for inst in instances:
+            glPushMatrix()
+            glTranslatef(*inst['offset'])
+            glScalef(inst['scale'], inst['scale'], inst['scale'])
+            draw_object(obj)
+            glPopMatrix()
+        glDisable(GL_NORMALIZE)
+        scene['stats']['draw_calls'] += len(instances)
+        return
+
+    data = array('f', [c for inst in instances for c in (*inst['offset'], inst['scale'])])
+    if index not in scene['instance_buffers']:
+        scene['instance_buffers'][index] = glGenBuffers(1)
+    gpu = obj['gpu']
+    glUseProgram(program)
+    glEnableClientState(GL_VERTEX_ARRAY)
+    glEnableClientState(GL_NORMAL_ARRAY)
+    glBindBuffer(GL_ARRAY_BUFFER, gpu['buffers'][0])
+    glVertexPointer(3, GL_FLOAT, 0, None)
+    glBindBuffer(GL_ARRAY_BUFFER, gpu['buffers'][1])
+    glNormalPointer(GL_FLOAT, 0, None)
+    glBindBuffer(GL_ARRAY_BUFFER, scene['instance_buffers'][index])
+    glBufferData(GL_ARRAY_BUFFER, (ctypes.c_float * len(data)).from_buffer(data), GL_STREAM_DRAW)
+    glEnableVertexAttribArray(INSTANCE_ATTRIBUTE)
+    glVertexAttribPointer(INSTANCE_ATTRIBUTE, 4, GL_FLOAT, GL_FALSE, 0, None)
+    glVertexAttribDivisor(INSTANCE_ATTRIBUTE, 1)
+    glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, gpu['buffers'][2])
+    glDrawElementsInstanced(GL_TRIANGLES, gpu['count'], gpu['index_type'], None, len(instances))
+    glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+    glVertexAttribDivisor(INSTANCE_ATTRIBUTE, 0)
+    glDisableVertexAttribArray(INSTANCE_ATTRIBUTE)
+    glBindBuffer(GL_ARRAY_BUFFER, 0)
+    glDisableClientState(GL_NORMAL_ARRAY)
+    glDisableClientState(GL_VERTEX_ARRAY)
+    glUseProgram(0)
+    scene['stats']['draw_calls'] += 1
+
+def issue_occlusion_queries(instances):
+    """
+    Desenha a caixa envolvente de cada instância (sem escrever cor nem
+    profundidade) dentro de uma occlusion query. Os resultados são lidos no
+    próximo quadro: uma caixa sem nenhum fragmento visível indica que a instância
+    está escondida atrás das já desenhadas e pode ser pulada.
+    """
+    cube = (ctypes.c_float * len(UNIT_CUBE)).from_buffer(UNIT_CUBE)
+    glPushAttrib(GL_ENABLE_BIT | GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+    glDisable(GL_LIGHTING)
+    glColorMask(GL_FALSE, GL_FALSE, GL_FALSE, GL_FALSE)
+    glDepthMask(GL_FALSE)
+    glDepthFunc(GL_LEQUAL)
+    glEnableClientState(GL_VERTEX_ARRAY)
+    glVertexPointer(3, GL_FLOAT, 0, cube)
+    for inst in instances:
+        low, high = inst['box']
+        glPushMatrix()
+        glTranslatef(*low)
+        glScalef(*[max(high[i] - low[i], 1e-3) for i in range(3)])
+        glBeginQuery(GL_SAMPLES_PASSED, inst['query'])
+        glDrawArrays(GL_QUADS, 0, 24)
+        glEndQuery(GL_SAMPLES_PASSED)
+        glPopMatrix()
+        inst['pending'] = True
+    glDisableClientState(GL_VERTEX_ARRAY)
+    glPopAttrib()
+
+def camera_inside(box):
+    """
+    True se a câmera (com a margem do plano near) estiver dentro da caixa; nesse
+    caso a caixa é cortada pelo plano near e a query não é confiável.
+    """
+    low, high = box
+    return all(low[i] - near_plane <= camera_pos[i] <= high[i] + near_plane for i in range(3))
+
+def draw_scene_instances(scene):
+    """
+    Desenha a cena: descarta as instâncias fora do volume de visão e as que a
+    occlusion query do quadro anterior indicou como escondidas, agrupa as demais
+    por malha para o desenho instanciado e emite as novas queries.
+    """
+    planes = frustum_planes()
+    stats = {'drawn': 0, 'culled': 0, 'occluded': 0, 'draw_calls': 0}
+    scene['stats'] = stats
+    visible = {}
+    queried = []
+    for inst in scene['instances']:
+        if inst['pending']:
+            # Resultado do quadro anterior; se ainda não chegou, mantém a decisão anterior
+            if glGetQueryObjectuiv(inst['query'], GL_QUERY_RESULT_AVAILABLE):
+                inst['occluded'] = glGetQueryObjectuiv(inst['query'], GL_QUERY_RESULT) == 0
+                inst['pending'] = False
+        if not box_in_frustum(inst['box'], planes):
+            # Ao voltar para o volume de visão, a instância é desenhada antes de nova query
+            inst['occluded'] = False
+            stats['culled'] += 1
+            continue
+        if inst['query'] is not None and camera_inside(inst['box']):
+            inst['occluded'] = False
+        elif inst['query'] is not None and not inst['pending']:
+            queried.append(inst)
+        if inst['occluded']:
+            stats['occluded'] += 1
+            continue
+        visible.setdefault(inst['object'], []).append(inst)
+        stats['drawn'] += 1
+
+    for index, instances in visible.items():
+        draw_instances(scene, index, instances)
+    if queried:
+        issue_occlusion_queries(queried)
 
 # -------------------------------------------------------------------
 # Funções de inicialização e callbacks de OpenGL
 # -------------------------------------------------------------------
 def init():
+    global use_vbo
+    # Novo contexto: nenhum estado foi enviado ainda
+    gl_state.clear()
     glEnable(GL_DEPTH_TEST)
     glEnable(GL_LIGHTING)
     glEnable(GL_LIGHT0)
     glShadeModel(GL_SMOOTH)  # Tonalização Gouraud
     glClearColor(0.0, 0.0, 0.0, 1.0)
+    # VBOs fazem parte do núcleo do OpenGL desde a versão 1.5
+    use_vbo = bool(glGenBuffers)
+
+def send_gl_state(func, target, pname, value, depends_on=()):
+    """
+    Chama func(target, pname, value) apenas se o valor (e 'depends_on') mudou
+    desde o último envio do mesmo parâmetro.
+    """
+    key = (func, target, pname)
+    cached = (tuple(value) if isinstance(value, list) else value, depends_on)
+    if gl_state.get(key) == cached:
+        return
+    gl_state[key] = cached
+    func(target, pname, value)
 
 def set_lighting():
-    glLightfv(GL_LIGHT0, GL_POSITION, light_pos)
-    glLightfv(GL_LIGHT0, GL_AMBIENT,  light_ambient)
-    glLightfv(GL_LIGHT0, GL_DIFFUSE,  light_diffuse)
-    glLightfv(GL_LIGHT0, GL_SPECULAR, light_specular)
+    # A posição da luz é transformada pela modelview do momento da chamada,
+    # então precisa ser reenviada sempre que a câmera muda
+    camera = (tuple(camera_pos), tuple(view_dir), tuple(up_vector))
+    send_gl_state(glLightfv, GL_LIGHT0, GL_POSITION, light_pos, camera)
+    send_gl_state(glLightfv, GL_LIGHT0, GL_AMBIENT,  light_ambient)
+    send_gl_state(glLightfv, GL_LIGHT0, GL_DIFFUSE,  light_diffuse)
+    send_gl_state(glLightfv, GL_LIGHT0, GL_SPECULAR, light_specular)
 
-    glMaterialfv(GL_FRONT, GL_AMBIENT,   material_ambient)
-    glMaterialfv(GL_FRONT, GL_DIFFUSE,   material_diffuse)
-    glMaterialfv(GL_FRONT, GL_SPECULAR,  material_specular)
-    glMaterialfv(GL_FRONT, GL_EMISSION,  material_emissive)
-    glMaterialf(GL_FRONT,  GL_SHININESS, material_shininess)
+    send_gl_state(glMaterialfv, GL_FRONT, GL_AMBIENT,   material_ambient)
+    send_gl_state(glMaterialfv, GL_FRONT, GL_DIFFUSE,   material_diffuse)
+    send_gl_state(glMaterialfv, GL_FRONT, GL_SPECULAR,  material_specular)
+    send_gl_state(glMaterialfv, GL_FRONT, GL_EMISSION,  material_emissive)
+    send_gl_state(glMaterialf,  GL_FRONT, GL_SHININESS, material_shininess)
 
-def display():
+def draw_scene():
+    """
+    Desenha o objeto atual no contexto OpenGL corrente, sem trocar os buffers
+    (usada pela janela GLUT e pela geração de miniaturas em thumbnails.py).
+    """
     glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
     glLoadIdentity()
 
@@ -287,8 +1120,10 @@ def display():
 
     set_lighting()
 
+    if scene is not None:
+        draw_scene_instances(scene)
     # Se houver objetos carregados, renderiza apenas o 'current_object_index'
-    if loaded_objects:
+    elif loaded_objects:
         global current_object_index
         # Garante que o índice esteja dentro do range
         if current_object_index < 0:
@@ -296,43 +1131,41 @@ def display():
         if current_object_index >= len(loaded_objects):
             current_object_index = len(loaded_objects) - 1
 
-        obj = loaded_objects[current_object_index]
-        vertices = obj['vertices']
-        faces    = obj['faces']
-        normals  = obj['normals']
-
-        # Desenha as faces (triangulação simples)
-        glBegin(GL_TRIANGLES)
-        for face in faces:
-            if len(face) < 3:
-                continue
-            # Se a face tiver mais de 3 vértices, desenhamos em forma de "fan"
-            for i in range(1, len(face) - 1):
-                idx0 = face[0]
-                idx1 = face[i]
-                idx2 = face[i+1]
-                # Vértice 0
-                if idx0 < len(normals):
-                    glNormal3fv(normals[idx0])
-                glVertex3fv(vertices[idx0])
-                # Vértice i
-                if idx1 < len(normals):
-                    glNormal3fv(normals[idx1])
-                glVertex3fv(vertices[idx1])
-                # Vértice i+1
-                if idx2 < len(normals):
-                    glNormal3fv(normals[idx2])
-                glVertex3fv(vertices[idx2])
-        glEnd()
+        if ensure_object_loaded(current_object_index, wait=not background_loading):
+            draw_object(loaded_objects[current_object_index])
+        elif loading is not None:
+            draw_loading_overlay()
 
-    glutSwapBuffers()
+def display():
+    global needs_redraw
+    needs_redraw = False
+    apply_pending_input()
+    if frame_stats is None:
+        draw_scene()
+        glutSwapBuffers()
+    else:
+        start = time.perf_counter()
+        cpu_start = time.process_time()
+        draw_scene()
+        submitted = time.perf_counter()
+        draw_stats_overlay()
+        cpu = time.process_time() - cpu_start
+        glutSwapBuffers()
+        end = time.perf_counter()
+        record_frame(cpu, submitted - start, end - submitted, end - start, end)
+    if startup is not None:
+        startup_frame_done()
 
 def reshape(width, height):
-    global aspect_ratio
+    global aspect_ratio, window_width, window_height
     if height == 0:
         height = 1
+    window_width, window_height = width, height
     glViewport(0, 0, width, height)
     aspect_ratio = float(width) / float(height)
+    apply_projection()
+
+def apply_projection():
     glMatrixMode(GL_PROJECTION)
     glLoadIdentity()
     gluPerspective(fovy, aspect_ratio, near_plane, far_plane)
@@ -347,30 +1180,26 @@ def keyboard(key, x, y):
     Teclas 'n' e 'p' mudam o objeto sendo renderizado.
     ESC sai da aplicação.
     """
-    global camera_pos, current_object_index
+    global current_object_index, aspect_ratio
     step = 10.0
 
-    # Vetor "right" = view_dir x up_vector (normalizado)
-    right = [
-        view_dir[1]*up_vector[2] - view_dir[2]*up_vector[1],
-        view_dir[2]*up_vector[0] - view_dir[0]*up_vector[2],
-        view_dir[0]*up_vector[1] - view_dir[1]*up_vector[0]
-    ]
-    r_length = math.sqrt(sum([r**2 for r in right]))
-    if r_length != 0:
-        right = [r / r_length for r in right]
-
+    # O movimento é acumulado e aplicado uma vez por quadro (apply_pending_input)
     if key == b'w':
-        camera_pos = [camera_pos[i] + view_dir[i]*step for i in range(3)]
+        pending_input['forward'] += step
     elif key == b's':
-        camera_pos = [camera_pos[i] - view_dir[i]*step for i in range(3)]
+        pending_input['forward'] -= step
     elif key == b'a':
-        camera_pos = [camera_pos[i] - right[i]*step for i in range(3)]
+        pending_input['right'] -= step
     elif key == b'd':
-        camera_pos = [camera_pos[i] + right[i]*step for i in range(3)]
+        pending_input['right'] += step
     elif key == b'r':
-        # Recarrega parâmetros do arquivo e redesenha
-        load_parameters("params.txt")
+        # Recarrega parâmetros do arquivo (inclusive a câmera) e redesenha, descartando
+        # o movimento pendente; a proporção continua sendo a da janela
+        load_parameters(PARAMS_FILE)
+        params_watch['camera'] = file_camera()
+        aspect_ratio = window_width / window_height
+        pending_input.update(dx=0, dy=0, forward=0.0, right=0.0)
+        apply_projection()
     elif key == b'n':
         # Próximo objeto
         if loaded_objects:
@@ -381,10 +1210,25 @@ def keyboard(key, x, y):
             current_object_index = (current_object_index - 1) % len(loaded_objects)
     elif key == b'\x1b':  # ESC
         sys.exit()
-    glutPostRedisplay()
+    request_redraw()
 
 def mouse(button, state, x, y):
+    """
+    Botão esquerdo: arrasto para rotação (ver motion).
+    Botão direito: seleciona e informa o objeto e a face sob o cursor.
+    """
     global mouse_left_down, mouse_last_x, mouse_last_y
+    if button == GLUT_RIGHT_BUTTON and state == GLUT_DOWN:
+        start = time.perf_counter()
+        hit = pick(x, y)
+        elapsed = (time.perf_counter() - start) * 1000.0
+        if hit is None:
+            print(f"Seleção: nada em ({x}, {y}) ({elapsed:.3f} ms)")
+        else:
+            where = f", instância {hit['instance']}" if hit['instance'] is not None else ""
+            print(f"Seleção: '{loaded_objects[hit['object']]['name']}'{where}, face {hit['face']}, "
+                  f"ponto ({hit['point'][0]:.2f}, {hit['point'][1]:.2f}, {hit['point'][2]:.2f}) "
+                  f"({elapsed:.3f} ms)")
     if button == GLUT_LEFT_BUTTON:
         if state == GLUT_DOWN:
             mouse_left_down = True
@@ -396,11 +1240,24 @@ def mouse(button, state, x, y):
 def motion(x, y):
     """
     Rotação da câmera ao arrastar com botão esquerdo do mouse pressionado.
+    Os deslocamentos são somados e aplicados uma vez por quadro.
     """
-    global view_dir, mouse_last_x, mouse_last_y
+    global mouse_last_x, mouse_last_y
     if mouse_left_down:
-        dx = x - mouse_last_x
-        dy = y - mouse_last_y
+        pending_input['dx'] += x - mouse_last_x
+        pending_input['dy'] += y - mouse_last_y
+        mouse_last_x = x
+        mouse_last_y = y
+        request_redraw()
+
+def apply_pending_input():
+    """
+    Aplica à câmera, em uma única atualização, toda a entrada acumulada desde o
+    último quadro: a rotação do arrasto do mouse e o movimento das teclas W, A, S, D.
+    """
+    global camera_pos
+    dx, dy = pending_input['dx'], pending_input['dy']
+    if dx or dy:
         angle_scale = 0.005
 
         # Rotação horizontal em torno do vetor 'up_vector'
@@ -414,9 +1271,50 @@ def motion(x, y):
         ]
         view_dir[:] = rotate_vector(view_dir, right, -dy * angle_scale)
 
-        mouse_last_x = x
-        mouse_last_y = y
+    forward, sideways = pending_input['forward'], pending_input['right']
+    if forward or sideways:
+        # Vetor "right" = view_dir x up_vector (normalizado)
+        right = [
+            view_dir[1]*up_vector[2] - view_dir[2]*up_vector[1],
+            view_dir[2]*up_vector[0] - view_dir[0]*up_vector[2],
+            view_dir[0]*up_vector[1] - view_dir[1]*up_vector[0]
+        ]
+        r_length = math.sqrt(sum([r**2 for r in right]))
+        if r_length != 0:
+            right = [r / r_length for r in right]
+        camera_pos = [camera_pos[i] + view_dir[i]*forward + right[i]*sideways for i in range(3)]
+
+    pending_input.update(dx=0, dy=0, forward=0.0, right=0.0)
+
+def request_redraw():
+    """
+    Marca a cena como alterada; o próximo frame_tick pede o redesenho.
+    """
+    global needs_redraw
+    needs_redraw = True
+
+def frame_tick(value):
+    """
+    Temporizador que dita o ritmo dos quadros: no máximo um redesenho a cada
+    1/target_fps segundos, e nenhum se nada mudou desde o último quadro.
+    """
+    global next_frame_time
+    watch_parameters()
+    if loading is not None:
+        # Atualiza a tela de carregamento e desenha o objeto assim que ele estiver pronto
+        future = prefetch_jobs.get(loading['index'])
+        if (future is None or future.done()
+                or time.perf_counter() - loading['drawn'] >= LOADING_REFRESH_INTERVAL):
+            request_redraw()
+    if needs_redraw:
         glutPostRedisplay()
+    interval = 1.0 / target_fps
+    now = time.perf_counter()
+    next_frame_time += interval
+    if next_frame_time < now:
+        # Atrasado (quadro lento): retoma o ritmo a partir de agora, sem acumular atraso
+        next_frame_time = now + interval
+    glutTimerFunc(int((next_frame_time - now) * 1000), frame_tick, 0)
 
 def rotate_vector(vec, axis, angle):
     """
@@ -441,28 +1339,489 @@ def rotate_vector(vec, axis, angle):
         rotated = [c / length for c in rotated]
     return rotated
 
+# -------------------------------------------------------------------
+# Recarga automática de params.txt
+# -------------------------------------------------------------------
+def watch_parameters():
+    """
+    Chamada a cada quadro por frame_tick: verifica periodicamente a data de
+    modificação de params.txt e, quando o arquivo fica PARAMS_DEBOUNCE segundos
+    sem novas alterações (ex.: o editor terminou de salvar), aplica os novos valores.
+    """
+    now = time.perf_counter()
+    if now - params_watch['checked_at'] < PARAMS_POLL_INTERVAL:
+        return
+    params_watch['checked_at'] = now
+    try:
+        mtime = os.stat(PARAMS_FILE).st_mtime_ns
+    except OSError:
+        return
+    if mtime != params_watch['mtime']:
+        params_watch['mtime'] = mtime
+        params_watch['changed_at'] = now
+    elif params_watch['changed_at'] is not None and now - params_watch['changed_at'] >= PARAMS_DEBOUNCE:
+        params_watch['changed_at'] = None
+        reload_parameters()
+
+def file_camera():
+    """
+    Cópia da câmera atual (posição, direção e vetor up), para comparar com a lida do arquivo.
+    """
+    return (list(camera_pos), list(view_dir), list(up_vector))
+
+def reload_parameters():
+    """
+    Aplica as alterações de params.txt sem recarregar tudo: a câmera atual (que
+    pode ter sido movida pelo usuário) é mantida, a projeção só é refeita se
+    fovy, near ou far mudaram e, no próximo quadro, set_lighting envia ao
+    OpenGL apenas os valores de luz e material que mudaram.
+    """
+    global camera_pos, view_dir, up_vector, aspect_ratio
+    camera = (camera_pos, view_dir, up_vector, aspect_ratio)
+    projection = (fovy, near_plane, far_plane)
+    load_parameters(PARAMS_FILE)
+    loaded_camera = file_camera()
+    camera_pos, view_dir, up_vector, aspect_ratio = camera
+    if (fovy, near_plane, far_plane) != projection:
+        apply_projection()
+    print(f"'{PARAMS_FILE}' alterado: parâmetros atualizados.")
+    if params_watch['camera'] is not None and loaded_camera != params_watch['camera']:
+        print("  Aviso: a câmera (C, N, V) alterada no arquivo não é aplicada automaticamente; "
+              "pressione 'r' para aplicá-la.")
+    params_watch['camera'] = loaded_camera
+    request_redraw()
+
+# -------------------------------------------------------------------
+# Instrumentação de quadros
+# -------------------------------------------------------------------
+# Número de quadros na janela usada para o FPS e o histograma exibidos
+STATS_WINDOW = 240
+
+# Limites (em ms) das faixas do histograma de tempo de quadro
+FRAME_HISTOGRAM_BINS_MS = (4, 8, 16, 33, 50, 100)
+
+def enable_frame_stats(output):
+    """
+    Ativa a medição dos quadros em display() e o overlay com as estatísticas.
+    Ao sair da aplicação, as amostras e o resumo são gravados em 'output' (JSON).
+    """
+    global frame_stats
+    frame_stats = {
+        'output': output,
+        'samples': [],                       # (cpu, envio, troca, quadro) em segundos
+        'window': deque(maxlen=STATS_WINDOW)  # (instante do fim, duração do quadro)
+    }
+    atexit.register(dump_frame_stats)
+
+def record_frame(cpu, submit, swap, frame, end):
+    """
+    Registra um quadro: tempo de CPU em display(), tempo de envio dos comandos
+    (draw_scene), tempo em glutSwapBuffers e duração total, em segundos.
+    """
+    frame_stats['samples'].append((cpu, submit, swap, frame))
+    frame_stats['window'].append((end, frame))
+
+def frame_histogram(frame_times):
+    """
+    Conta os quadros em cada faixa de FRAME_HISTOGRAM_BINS_MS.
+    Retorna uma lista de pares (rótulo, contagem).
+    """
+    counts = [0] * (len(FRAME_HISTOGRAM_BINS_MS) + 1)
+    for t in frame_times:
+        ms = t * 1000.0
+        b = 0
+        while b < len(FRAME_HISTOGRAM_BINS_MS) and ms >= FRAME_HISTOGRAM_BINS_MS[b]:
+            b += 1
+        counts[b] += 1
+    labels = [f"<{FRAME_HISTOGRAM_BINS_MS[0]}"]
+    labels += [f"{lo}-{hi}" for lo, hi in zip(FRAME_HISTOGRAM_BINS_MS, FRAME_HISTOGRAM_BINS_MS[1:])]
+    labels.append(f">={FRAME_HISTOGRAM_BINS_MS[-1]}")
+    return list(zip(labels, counts))
+
+def window_fps():
+    """
+    Quadros por segundo na janela recente de STATS_WINDOW quadros.
+    """
+    window = frame_stats['window']
+    if len(window) < 2 or window[-1][0] == window[0][0]:
+        return 0.0
+    return (len(window) - 1) / (window[-1][0] - window[0][0])
+
+def summarize(values):
+    """
+    Média, mediana, percentil 95 e máximo (em ms) de uma lista de tempos em segundos.
+    """
+    if not values:
+        return {'mean': 0.0, 'p50': 0.0, 'p95': 0.0, 'max': 0.0}
+    ordered = sorted(values)
+    n = len(ordered)
+    return {'mean': 1000.0 * sum(ordered) / n,
+            'p50': 1000.0 * ordered[n // 2],
+            'p95': 1000.0 * ordered[min(n - 1, int(0.95 * n))],
+            'max': 1000.0 * ordered[-1]}
+
+def draw_text(x, y, text):
+    glRasterPos2f(x, y)
+    for ch in text.encode('ascii', 'replace'):
+        glutBitmapCharacter(GLUT_BITMAP_8_BY_13, ch)
+
+def begin_overlay():
+    """
+    Prepara o desenho em 2D sobre a cena, em pixels da janela (origem no canto
+    inferior esquerdo), sem iluminação nem teste de profundidade.
+
+    Retorna:
+        tuple: (largura, altura) da janela.
+    """
+    width = glutGet(GLUT_WINDOW_WIDTH)
+    height = glutGet(GLUT_WINDOW_HEIGHT)
+    glPushAttrib(GL_ENABLE_BIT | GL_CURRENT_BIT)
+    glDisable(GL_LIGHTING)
+    glDisable(GL_DEPTH_TEST)
+    glMatrixMode(GL_PROJECTION)
+    glPushMatrix()
+    glLoadIdentity()
+    gluOrtho2D(0, width, 0, height)
+    glMatrixMode(GL_MODELVIEW)
+    glPushMatrix()
+    glLoadIdentity()
+    return width, height
+
+def end_overlay():
+    """
+    Restaura as matrizes e o estado alterados por begin_overlay.
+    """
+    glPopMatrix()
+    glMatrixMode(GL_PROJECTION)
+    glPopMatrix()
+    glMatrixMode(GL_MODELVIEW)
+    glPopAttrib()
+
+def draw_stats_overlay():
+    """
+    Desenha, sobre a cena, o último quadro medido, o FPS e o histograma da janela recente.
+    """
+    width, height = begin_overlay()
+    glColor3f(1.0, 1.0, 0.0)
+    y = height - 18
+    if frame_stats['samples']:
+        cpu, submit, swap, frame = frame_stats['samples'][-1]
+        for line in (f"FPS: {window_fps():.1f}",
+                     f"quadro: {frame * 1000:.2f} ms  CPU: {cpu * 1000:.2f} ms",
+                     f"envio: {submit * 1000:.2f} ms  swap: {swap * 1000:.2f} ms"):
+            draw_text(10, y, line)
+            y -= 15
+    if scene is not None:
+        s = scene['stats']
+        draw_text(10, y, f"cena: {s['drawn']} desenhadas, {s['culled']} fora da vista, "
+                         f"{s['occluded']} ocultas, {s['draw_calls']} chamadas")
+        y -= 15
+
+    histogram = frame_histogram([t for _, t in frame_stats['window']])
+    largest = max(count for _, count in histogram) or 1
+    for label, count in histogram:
+        y -= 15
+        draw_text(10, y, f"{label:>6} ms")
+        glBegin(GL_QUADS)
+        bar = 150.0 * count / largest
+        glVertex2f(90, y - 2)
+        glVertex2f(90 + bar, y - 2)
+        glVertex2f(90 + bar, y + 9)
+        glVertex2f(90, y + 9)
+        glEnd()
+    end_overlay()
+
+def draw_loading_overlay():
+    """
+    Desenha a tela de carregamento do objeto atual: nome, tamanho, posição na pasta
+    e tempo decorrido.
+    """
+    obj = loaded_objects[loading['index']]
+    now = time.perf_counter()
+    loading['drawn'] = now
+    width, height = begin_overlay()
+    glColor3f(1.0, 1.0, 1.0)
+    x = width // 2 - 150
+    y = height // 2
+    draw_text(x, y + 8, f"Carregando '{obj['name']}' ({loading['index'] + 1}/{len(loaded_objects)})"
+                        + "." * (1 + int(2 * (now - loading['since'])) % 3))
+    sizes = [f"{count} {label}" for count, label in ((obj['num_vertices'], "vertices"), (obj['num_faces'], "faces"))
+             if count is not None]
+    draw_text(x, y - 8, ", ".join(sizes) + (" - " if sizes else "") + f"{now - loading['since']:.1f} s")
+    end_overlay()
+
+def dump_frame_stats():
+    """
+    Grava as amostras de todos os quadros, o resumo e o histograma no arquivo de saída.
+    """
+    if frame_stats is None:
+        return
+    samples = frame_stats['samples']
+    columns = ('cpu', 'submit', 'swap', 'frame')
+    report = {
+        'frames': len(samples),
+        'fps': window_fps(),
+        'summary_ms': {name: summarize([s[i] for s in samples]) for i, name in enumerate(columns)},
+        'histogram_ms': dict(frame_histogram([s[3] for s in samples])),
+        'samples_ms': [[round(v * 1000.0, 4) for v in s] for s in samples]
+    }
+    with open(frame_stats['output'], 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=1)
+    print(f"Estatísticas de {len(samples)} quadro(s) gravadas em '{frame_stats['output']}'.")
+
+def window_closed():
+    """
+    Callback de fechamento da janela, usado apenas quando o GLUT não permite que
+    glutMainLoop retorne (sem glutSetOption): nesse caso o GLUT encerra o processo
+    com o exit() do C, que não executa os handlers do atexit, e os arquivos de
+    saída são gravados aqui.
+    """
+    dump_frame_stats()
+    save_recording()
+
+# -------------------------------------------------------------------
+# Gravação e reprodução da entrada (benchmark interativo)
+# -------------------------------------------------------------------
+# Formato do arquivo (JSON): {"window": [largura, altura], "objects": [nomes],
+# "events": [[instante, callback, argumentos...], ...]}. Os quadros desenhados
+# também são gravados (callback "display"), de modo que a reprodução agrupa os
+# eventos em quadros exatamente como na sessão original.
+WINDOW_SIZE = (800, 600)
+
+def start_recording(output):
+    """
+    Passa a registrar os eventos de entrada e os quadros; grava 'output' ao sair
+    (pelo teclado ou fechando a janela, ver window_closed).
+    """
+    global input_recording
+    input_recording = {'output': output, 'start': time.perf_counter(), 'events': []}
+    atexit.register(save_recording)
+
+def recorded(callback):
+    """
+    Envolve um callback do GLUT para que cada chamada seja registrada antes de executá-lo.
+    As teclas (bytes) são gravadas como texto latin-1.
+    """
+    def wrapper(*args):
+        event = [round(time.perf_counter() - input_recording['start'], 6), callback.__name__]
+        event += [a.decode('latin-1') if isinstance(a, bytes) else a for a in args]
+        input_recording['events'].append(event)
+        callback(*args)
+    return wrapper
+
+def save_recording():
+    if input_recording is None:
+        return
+    recording = {
+        'window': list(WINDOW_SIZE),
+        'objects': [obj['name'] for obj in loaded_objects],
+        'events': input_recording['events']
+    }
+    with open(input_recording['output'], 'w', encoding='utf-8') as f:
+        json.dump(recording, f)
+    print(f"{len(input_recording['events'])} evento(s) gravado(s) em '{input_recording['output']}'.")
+
+def load_recording(filename):
+    with open(filename, 'r', encoding='utf-8') as f:
+        recording = json.load(f)
+    names = [obj['name'] for obj in loaded_objects]
+    if recording['objects'] != names:
+        print("Aviso: os objetos da gravação diferem dos objetos carregados; "
+              "as estatísticas por objeto podem não ser comparáveis.")
+    return recording
+
+def start_replay(recording):
+    """
+    Prepara a reprodução: os eventos são reenviados pelos mesmos callbacks
+    (keyboard, mouse, motion) a partir de glutIdleFunc(replay_step).
+    """
+    global input_replay
+    input_replay = {'events': recording['events'], 'next': 0, 'frame_times': {}}
+
+def replay_step():
+    """
+    Reenvia os eventos até o próximo quadro gravado e desenha esse quadro,
+    medindo o seu tempo (incluindo a conclusão dos comandos na GPU). Ao fim da
+    gravação, mostra as estatísticas por objeto e encerra a aplicação.
+    """
+    callbacks = {'keyboard': keyboard, 'mouse': mouse, 'motion': motion}
+    events = input_replay['events']
+    i = input_replay['next']
+    while i < len(events) and events[i][1] != 'display':
+        name, args = events[i][1], events[i][2:]
+        if name == 'keyboard':
+            if args[0] == '\x1b':  # ESC encerra a sessão gravada
+                i = len(events)
+                break
+            args[0] = args[0].encode('latin-1')
+        callbacks[name](*args)
+        i += 1
+    if i >= len(events):
+        report_replay()
+        sys.exit()
+    input_replay['next'] = i + 1
+
+    start = time.perf_counter()
+    display()
+    glFinish()
+    elapsed = time.perf_counter() - start
+    name = loaded_objects[current_object_index]['name'] if loaded_objects else '-'
+    input_replay['frame_times'].setdefault(name, []).append(elapsed)
+
+def report_replay():
+    """
+    Imprime o número de quadros e o tempo de quadro (média, p50, p95, máximo) por objeto.
+    """
+    print(f"{'objeto':<24}{'quadros':>8}{'média':>10}{'p50':>10}{'p95':>10}{'máx':>10}  (ms)")
+    all_times = []
+    for name, times in input_replay['frame_times'].items():
+        all_times += times
+        s = summarize(times)
+        print(f"{name:<24}{len(times):>8}{s['mean']:>10.2f}{s['p50']:>10.2f}{s['p95']:>10.2f}{s['max']:>10.2f}")
+    s = summarize(all_times)
+    print(f"{'total':<24}{len(all_times):>8}{s['mean']:>10.2f}{s['p50']:>10.2f}{s['p95']:>10.2f}{s['max']:>10.2f}")
+
+# -------------------------------------------------------------------
+# Medição da inicialização
+# -------------------------------------------------------------------
+STARTUP_LABELS = {'imports': "importações", 'parameters': "parâmetros e índice",
+                  'window': "janela", 'preload': "pré-carregamento", 'first_frame': "primeiro quadro",
+                  'object_frame': "objeto na tela", 'parse': "leitura",
+                  'normals': "normais", 'triangulate': "triangulação", 'bvh': "BVH"}
+
+def mark_startup(stage):
+    """
+    Registra o fim de uma etapa da inicialização: o tempo desde a etapa anterior.
+    """
+    if startup is None:
+        return
+    now = time.perf_counter()
+    startup['times'][stage] = now - startup['last']
+    startup['last'] = now
+
+def startup_frame_done():
+    """
+    Chamada após cada quadro até o fim da inicialização: marca o primeiro quadro e,
+    quando o objeto atual (ou a cena) aparece na tela, encerra a medição.
+    """
+    if 'first_frame' not in startup['times']:
+        mark_startup('first_frame')
+    if scene is None and loaded_objects:
+        obj = loaded_objects[current_object_index]
+        if 'vertices' not in obj and 'error' not in obj:
+            return  # ainda carregando
+        mark_startup('object_frame')
+    report_startup()
+
+def report_startup():
+    """
+    Mostra o tempo de cada etapa da inicialização (e do carregamento do primeiro objeto,
+    feito em paralelo com os primeiros quadros) e o grava em JSON, se pedido.
+    """
+    global startup
+    times = startup['times']
+    total = startup['last'] - STARTUP_BEGIN
+    print("Inicialização: " + ", ".join(f"{STARTUP_LABELS[k]} {v:.3f} s" for k, v in times.items())
+          + f" (total {total:.3f} s).")
+    loaded = startup['object']
+    if loaded is not None:
+        print(f"  Carregamento de '{loaded['name']}': "
+              + ", ".join(f"{STARTUP_LABELS[k]} {v:.3f} s" for k, v in loaded.items() if k != 'name') + ".")
+    if startup['output'] is not None:
+        with open(startup['output'], 'w', encoding='utf-8') as f:
+            json.dump({'total': total, 'stages': times, 'object': loaded}, f, indent=1)
+        print(f"Tempos de inicialização gravados em '{startup['output']}'.")
+    startup = None
+
 # -------------------------------------------------------------------
 # Função principal
 # -------------------------------------------------------------------
 def main():
+    global target_fps, next_frame_time, scene, background_loading
+    mark_startup('imports')
+    parser = argparse.ArgumentParser(description="Visualizador de objetos 3D (.byu, .ply, .stl, .obj) com OpenGL.")
+    parser.add_argument("--stats", nargs="?", const="frame_stats.json", default=None, metavar="ARQUIVO",
+                        help="mede o tempo de cada quadro, exibe as estatísticas sobre a cena e "
+                             "as grava em ARQUIVO ao sair (padrão: frame_stats.json)")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--record", metavar="ARQUIVO",
+                      help="grava os eventos de teclado e mouse da sessão em ARQUIVO")
+    mode.add_argument("--replay", metavar="ARQUIVO",
+                      help="reproduz os eventos gravados em ARQUIVO e mostra o tempo de quadro por objeto")
+    parser.add_argument("--scene", metavar="ARQUIVO",
+                        help="desenha todos os objetos dispostos no arquivo de cena (ver load_scene)")
+    parser.add_argument("--fps", type=float, default=60.0,
+                        help="taxa de quadros alvo da janela (padrão: 60)")
+    parser.add_argument("--preload", nargs="?", type=int, const=0, default=None, metavar="PROCESSOS",
+                        help="carrega todos os objetos na inicialização, em paralelo por PROCESSOS "
+                             "processos (padrão: número de CPUs), em vez de sob demanda")
+    parser.add_argument("--startup-times", metavar="ARQUIVO",
+                        help="grava em ARQUIVO (JSON) o tempo de cada etapa da inicialização")
+    # Os argumentos restantes são repassados ao GLUT
+    args, glut_args = parser.parse_known_args()
+    if args.fps <= 0:
+        parser.error("--fps deve ser positivo")
+    startup['output'] = args.startup_times
+
     # Carrega parâmetros da câmera e luz
-    load_parameters("params.txt")
-    # Carrega todos os objetos .byu da pasta 'objetos'
-    load_all_objects("objetos")
+    load_parameters(PARAMS_FILE)
+    params_watch['mtime'] = os.stat(PARAMS_FILE).st_mtime_ns if os.path.exists(PARAMS_FILE) else None
+    params_watch['camera'] = file_camera()
+    # Indexa os objetos (.byu, .ply, .stl, .obj) da pasta 'objetos' (a geometria é carregada sob demanda)
+    index_objects("objetos")
+    if args.replay:
+        recording = load_recording(args.replay)
+    mark_startup('parameters')
 
     # Inicializa GLUT/OpenGL
-    glutInit(sys.argv)
+    glutInit([sys.argv[0]] + glut_args)
     glutInitDisplayMode(GLUT_DOUBLE | GLUT_RGB | GLUT_DEPTH)
-    glutInitWindowSize(800, 600)
+    glutInitWindowSize(*(recording['window'] if args.replay else WINDOW_SIZE))
     glutCreateWindow(b"Renderizador de Objetos 3D (.byu) - Selecao")
+    # Fechar a janela faz glutMainLoop retornar, para que os handlers do atexit
+    # (estatísticas dos quadros e gravação da entrada) rodem como na saída pelo teclado
+    if bool(glutSetOption):
+        glutSetOption(GLUT_ACTION_ON_WINDOW_CLOSE, GLUT_ACTION_GLUTMAINLOOP_RETURNS)
+    elif bool(glutWMCloseFunc):
+        glutWMCloseFunc(window_closed)
     init()
+    mark_startup('window')
+    if args.preload is not None:
+        preload_objects(args.preload or None)
+        mark_startup('preload')
+    if args.scene:
+        scene = load_scene(args.scene)
+        prepare_scene(scene)
+    if args.stats:
+        enable_frame_stats(args.stats)
 
     # Registra callbacks
-    glutDisplayFunc(display)
     glutReshapeFunc(reshape)
-    glutKeyboardFunc(keyboard)
-    glutMouseFunc(mouse)
-    glutMotionFunc(motion)
+    if args.replay:
+        # Sem callbacks de entrada: apenas os eventos gravados alteram a cena
+        start_replay(recording)
+        glutDisplayFunc(display)
+        glutIdleFunc(replay_step)
+    elif args.record:
+        start_recording(args.record)
+        glutDisplayFunc(recorded(display))
+        glutKeyboardFunc(recorded(keyboard))
+        glutMouseFunc(recorded(mouse))
+        glutMotionFunc(recorded(motion))
+    else:
+        glutDisplayFunc(display)
+        glutKeyboardFunc(keyboard)
+        glutMouseFunc(mouse)
+        glutMotionFunc(motion)
+    if not args.replay:
+        # A janela abre antes de o primeiro objeto estar pronto: ele é carregado em
+        # segundo plano, com uma tela de carregamento (a reprodução mantém o
+        # carregamento bloqueante para comparar os tempos de quadro)
+        background_loading = True
+        # Os eventos só marcam a cena como alterada; o temporizador dita o ritmo dos quadros
+        target_fps = args.fps
+        next_frame_time = time.perf_counter()
+        glutTimerFunc(0, frame_tick, 0)
 
     glutMainLoop()
 
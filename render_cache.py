@@ -0,0 +1,111 @@
+"""
+Cache em disco, endereçado por conteúdo, para imagens renderizadas.
+
+Cada entrada é um arquivo "<chave>.ppm" no diretório do cache. A chave é um hash
+SHA-256 do conteúdo de entrada (malha, câmera, iluminação, resolução e versão do
+renderizador, ver main_phong.render_cache_key). O tamanho total do cache é limitado:
+ao gravar uma nova entrada, as entradas usadas há mais tempo são removidas (LRU,
+usando a data de modificação dos arquivos, atualizada a cada acerto).
+
+Vários processos podem compartilhar o mesmo diretório: as gravações são atômicas
+(arquivo temporário + os.replace) e entradas removidas por outro processo são
+tratadas como falhas de cache.
+"""
+import hashlib
+import json
+import os
+import tempfile
+
+DEFAULT_CACHE_DIR = ".render_cache"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+def file_digest(filename):
+    """
+    Calcula o hash SHA-256 do conteúdo de um arquivo.
+
+    Parâmetros:
+        filename (str): Caminho do arquivo.
+
+    Retorna:
+        str: Hash em hexadecimal.
+    """
+    h = hashlib.sha256()
+    with open(filename, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def make_key(*parts):
+    """
+    Gera uma chave de cache a partir de valores serializáveis em JSON.
+
+    Os dicionários são serializados com as chaves ordenadas, de modo que a mesma
+    configuração sempre gera a mesma chave.
+
+    Retorna:
+        str: Hash SHA-256 em hexadecimal.
+    """
+    data = json.dumps(parts, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+class RenderCache:
+    """
+    Cache LRU de imagens em disco com limite de tamanho total (max_bytes).
+    """
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, key + ".ppm")
+
+    def get(self, key):
+        """
+        Retorna o conteúdo armazenado para a chave (bytes) ou None em caso de falha.
+        Um acerto marca a entrada como usada recentemente.
+        """
+        path = self.path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return data
+
+    def put(self, key, data):
+        """
+        Armazena o conteúdo (bytes) para a chave e remove as entradas mais antigas
+        se o tamanho total passar de max_bytes.
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, self.path(key))
+        self.evict()
+
+    def evict(self):
+        """
+        Remove as entradas usadas há mais tempo até o cache caber em max_bytes.
+        """
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(".ppm"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+            total += st.st_size
+        entries.sort()
+        for mtime, size, name in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+            total -= size
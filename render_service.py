@@ -0,0 +1,307 @@
+"""
+Serviço local de renderização para o pipeline de main_phong.py.
+
+Mantém um pool de processos de trabalho "aquecidos" (com main_phong importado e as
+malhas já carregadas, com seus normais, em memória entre um job e outro) e uma fila
+de jobs com prioridade, exposta por HTTP em localhost:
+
+  POST /jobs       corpo JSON: {"mesh": "mesh.txt", "camera": "camera.txt",
+                                "lighting": "lighting.txt", "width": 800, "height": 600,
+                                "output": "saida.ppm", "priority": 0}
+                   (menor prioridade = executado antes; retorna {"id": ...})
+  GET  /jobs/<id>  estado do job ('queued', 'running', 'done' ou 'failed'); apenas os
+                   FINISHED_JOBS_KEPT jobs terminados mais recentes são lembrados
+  GET  /status     profundidade da fila, jobs em execução, concluídos e vazão
+
+Uso:
+  python render_service.py [--host 127.0.0.1] [--port 8765] [--workers N]
+"""
+import argparse
+import heapq
+import itertools
+import json
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import main_phong
+import render_cache
+
+# Número de malhas mantidas em memória por processo de trabalho
+MESH_CACHE_SIZE = 32
+
+# Janela (em segundos) usada para calcular a vazão recente
+THROUGHPUT_WINDOW = 60.0
+
+# Número de jobs terminados ('done' ou 'failed') cujo estado é mantido para consulta
+FINISHED_JOBS_KEPT = 1000
+
+###########################################
+# Processo de Trabalho
+###########################################
+
+_mesh_cache = OrderedDict()
+
+def load_mesh_cached(filename):
+    """
+    Carrega a malha e calcula seus normais, reaproveitando o resultado entre jobs.
+
+    A chave do cache inclui a data de modificação do arquivo, de modo que uma malha
+    alterada em disco é recarregada. As malhas menos usadas recentemente são descartadas
+    quando o cache passa de MESH_CACHE_SIZE entradas.
+
+    Parâmetros:
+        filename (str): Caminho para o arquivo da malha.
+
+    Retorna:
+        tuple: (vertices, triangles, normals)
+    """
+    key = (os.path.abspath(filename), os.path.getmtime(filename))
+    if key in _mesh_cache:
+        _mesh_cache.move_to_end(key)
+        return _mesh_cache[key]
+    vertices, triangles = main_phong.load_mesh(filename)
+    normals = main_phong.compute_vertex_normals(vertices, triangles)
+    _mesh_cache[key] = (vertices, triangles, normals)
+    if len(_mesh_cache) > MESH_CACHE_SIZE:
+        _mesh_cache.popitem(last=False)
+    return _mesh_cache[key]
+
+def run_job(job):
+    """
+    Executa um job de renderização em um processo de trabalho e grava a imagem (PPM).
+
+    Se job['cache_dir'] não for None, o cache de imagens (limitado a
+    job['cache_size'] bytes) é consultado antes de qualquer trabalho de
+    renderização (ver main_phong.render_to_file).
+
+    Parâmetros:
+        job (dict): Com chaves 'mesh', 'camera', 'lighting', 'width', 'height', 'output',
+                    'cache_dir' e 'cache_size'.
+
+    Retorna:
+        float: Tempo gasto no job, em segundos.
+    """
+    start = time.perf_counter()
+    camera = main_phong.load_camera(job['camera'])
+    lighting = main_phong.load_lighting(job['lighting'])
+    cache = None
+    if job['cache_dir'] is not None:
+        cache = render_cache.RenderCache(job['cache_dir'], job['cache_size'])
+        key = main_phong.render_cache_key(render_cache.file_digest(job['mesh']), camera, lighting,
+                                          job['width'], job['height'])
+        cached = cache.get(key)
+        if cached is not None:
+            with open(job['output'], "wb") as f:
+                f.write(cached)
+            return time.perf_counter() - start
+    vertices, triangles, normals = load_mesh_cached(job['mesh'])
+    data = main_phong.framebuffer_to_ppm(main_phong.render_scene(vertices, triangles, normals, camera,
+                                                                 lighting, job['width'], job['height']))
+    with open(job['output'], "wb") as f:
+        f.write(data)
+    if cache is not None:
+        cache.put(key, data)
+    return time.perf_counter() - start
+
+###########################################
+# Fila de Jobs com Prioridade
+###########################################
+
+class RenderService:
+    """
+    Fila de jobs com prioridade despachada para um pool de processos de trabalho.
+
+    Um job só sai da fila quando há um processo livre, de modo que a ordem de
+    prioridade vale para toda a fila e não apenas para os jobs já enviados ao pool.
+    """
+    def __init__(self, workers=None, cache_dir=render_cache.DEFAULT_CACHE_DIR,
+                 cache_size=render_cache.DEFAULT_MAX_BYTES):
+        self.workers = workers or os.cpu_count() or 1
+        self.cache_dir = cache_dir
+        self.cache_size = cache_size
+        self.pool = multiprocessing.Pool(self.workers)
+        self.queue = []
+        self.jobs = {}
+        self.finished_ids = deque()
+        self.ids = itertools.count(1)
+        self.idle = self.workers
+        self.completed = 0
+        self.failed = 0
+        self.finish_times = deque()
+        self.cond = threading.Condition()
+        self.dispatcher = threading.Thread(target=self.dispatch, daemon=True)
+        self.dispatcher.start()
+
+    def submit(self, request):
+        """
+        Valida e enfileira um job. Lança ValueError se faltar um campo obrigatório
+        ou se a largura ou a altura não forem positivas.
+
+        Parâmetros:
+            request (dict): Campos 'mesh', 'camera', 'lighting', 'output' e, opcionalmente,
+                            'width', 'height' (padrão 800x600) e 'priority' (padrão 0).
+
+        Retorna:
+            int: Identificador do job.
+        """
+        for key in ('mesh', 'camera', 'lighting', 'output'):
+            if key not in request:
+                raise ValueError("Campo obrigatório ausente: %s" % key)
+        job = {'mesh': request['mesh'], 'camera': request['camera'],
+               'lighting': request['lighting'], 'output': request['output'],
+               'width': int(request.get('width', 800)), 'height': int(request.get('height', 600)),
+               'cache_dir': self.cache_dir, 'cache_size': self.cache_size}
+        if job['width'] <= 0 or job['height'] <= 0:
+            raise ValueError("Dimensões inválidas: %dx%d" % (job['width'], job['height']))
+        priority = int(request.get('priority', 0))
+        with self.cond:
+            job_id = next(self.ids)
+            self.jobs[job_id] = {'state': 'queued', 'priority': priority, 'submitted': time.time()}
+            heapq.heappush(self.queue, (priority, job_id, job))
+            self.cond.notify()
+        return job_id
+
+    def dispatch(self):
+        """
+        Envia ao pool o job de maior prioridade sempre que houver um processo livre.
+        """
+        while True:
+            with self.cond:
+                while not self.queue or self.idle == 0:
+                    self.cond.wait()
+                priority, job_id, job = heapq.heappop(self.queue)
+                self.idle -= 1
+                self.jobs[job_id]['state'] = 'running'
+            self.pool.apply_async(run_job, (job,),
+                                  callback=lambda seconds, job_id=job_id: self.finish(job_id, seconds),
+                                  error_callback=lambda error, job_id=job_id: self.finish(job_id, error=error))
+
+    def finish(self, job_id, seconds=None, error=None):
+        """
+        Registra o término de um job e libera o processo de trabalho. Descarta o estado
+        dos jobs terminados mais antigos além de FINISHED_JOBS_KEPT.
+        """
+        with self.cond:
+            status = self.jobs[job_id]
+            if error is None:
+                status['state'] = 'done'
+                status['seconds'] = seconds
+                self.completed += 1
+            else:
+                status['state'] = 'failed'
+                status['error'] = str(error)
+                self.failed += 1
+            self.finish_times.append(time.time())
+            self.finished_ids.append(job_id)
+            while len(self.finished_ids) > FINISHED_JOBS_KEPT:
+                del self.jobs[self.finished_ids.popleft()]
+            self.idle += 1
+            self.cond.notify()
+
+    def job_status(self, job_id):
+        """
+        Retorna o estado de um job, ou None se o identificador for desconhecido
+        (ou de um job terminado já descartado).
+        """
+        with self.cond:
+            status = self.jobs.get(job_id)
+            return dict(status) if status is not None else None
+
+    def status(self):
+        """
+        Retorna a profundidade da fila, os jobs em execução, os totais e a vazão recente
+        (jobs por segundo nos últimos THROUGHPUT_WINDOW segundos).
+        """
+        with self.cond:
+            now = time.time()
+            while self.finish_times and self.finish_times[0] < now - THROUGHPUT_WINDOW:
+                self.finish_times.popleft()
+            return {'workers': self.workers,
+                    'queue_depth': len(self.queue),
+                    'running': self.workers - self.idle,
+                    'completed': self.completed,
+                    'failed': self.failed,
+                    'throughput': len(self.finish_times) / THROUGHPUT_WINDOW}
+
+    def close(self):
+        """
+        Encerra o pool de processos de trabalho.
+        """
+        self.pool.terminate()
+        self.pool.join()
+
+###########################################
+# Interface HTTP
+###########################################
+
+class RenderRequestHandler(BaseHTTPRequestHandler):
+    """
+    Traduz as requisições HTTP para operações do RenderService do servidor.
+    """
+    def send_json(self, code, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        if self.path != "/jobs":
+            self.send_json(404, {'error': 'rota desconhecida'})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            job_id = self.server.service.submit(json.loads(self.rfile.read(length)))
+        except (ValueError, TypeError) as e:
+            self.send_json(400, {'error': str(e)})
+            return
+        self.send_json(202, {'id': job_id})
+
+    def do_GET(self):
+        if self.path == "/status":
+            self.send_json(200, self.server.service.status())
+            return
+        if self.path.startswith("/jobs/"):
+            try:
+                status = self.server.service.job_status(int(self.path[len("/jobs/"):]))
+            except ValueError:
+                status = None
+            if status is not None:
+                self.send_json(200, status)
+                return
+        self.send_json(404, {'error': 'rota ou job desconhecido'})
+
+def main():
+    parser = argparse.ArgumentParser(description="Serviço local de renderização Phong.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="número de processos de trabalho (padrão: número de CPUs)")
+    parser.add_argument("--cache-dir", default=render_cache.DEFAULT_CACHE_DIR,
+                        help="diretório do cache de imagens")
+    parser.add_argument("--cache-size", type=int, default=render_cache.DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help="tamanho máximo do cache, em MB")
+    parser.add_argument("--no-cache", action="store_true", help="desativa o cache de imagens")
+    args = parser.parse_args()
+
+    service = RenderService(args.workers, None if args.no_cache else args.cache_dir,
+                            args.cache_size * 1024 * 1024)
+    server = ThreadingHTTPServer((args.host, args.port), RenderRequestHandler)
+    server.service = service
+    print(f"Serviço de renderização em http://{args.host}:{args.port} "
+          f"com {service.workers} processos de trabalho.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+if __name__ == "__main__":
+    main()
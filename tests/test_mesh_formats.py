@@ -0,0 +1,27 @@
+import pytest
+
+main_phong = pytest.importorskip("main_phong")
+import mesh_formats
+
+
+def write_obj(tmp_path):
+    path = tmp_path / "malformado.obj"
+    path.write_text("v 0 0 0\nv 1 0 0\nv 0 1 0\nv 1 1 0\n"
+                    "f 1 2 3\n"       # válida
+                    "f 0 1 2\n"       # índice 0 não existe no OBJ
+                    "f 2 4 7\n"       # além do número de vértices
+                    "f -1 -2 -9\n"    # negativo além do primeiro vértice
+                    "f -1 -2 -3\n")   # válida: 4 3 2
+    return str(path)
+
+
+def test_obj_indice_zero_invalido(tmp_path):
+    mesh = mesh_formats.read_obj(write_obj(tmp_path))
+    assert mesh['faces'][3:6].tolist() == [-1, 0, 1]
+
+
+def test_load_mesh_descarta_faces_invalidas(tmp_path, capsys):
+    vertices, triangles = main_phong.load_mesh(write_obj(tmp_path))
+    assert len(vertices) == 4
+    assert triangles == [[0, 1, 2], [3, 2, 1]]
+    assert "3 face(s) com índices inválidos" in capsys.readouterr().out
@@ -0,0 +1,33 @@
+import os
+
+import pytest
+
+pytest.importorskip("OpenGL.GLUT")
+import projeto_3aVA
+
+OBJETOS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "objetos")
+
+
+def test_malha_sem_faces_validas(tmp_path):
+    """
+    Uma malha em que todas as faces têm índices inválidos carrega com BVH vazia,
+    e a seleção simplesmente não atinge nada.
+    """
+    path = tmp_path / "invalido.byu"
+    path.write_text("3 2\n0 0 0\n1 0 0\n0 1 0\n1 2 9 -1\n4 5 6 -1\n")
+    result = projeto_3aVA.load_object_file(str(path))
+    assert result['error'] is None
+    assert result['dropped'] == 2
+    obj = result['object']
+    assert len(obj['indices']) == 0
+    assert all(len(a) == 0 for a in obj['bvh'].values())
+    assert projeto_3aVA.bvh.intersect_bvh(obj, (0.2, 0.2, 5.0), (0.0, 0.0, -1.0)) is None
+
+
+def test_biblioteca_de_objetos_carrega():
+    """
+    Todos os objetos da pasta objetos/ carregam, inclusive os que só têm faces inválidas.
+    """
+    for filename in sorted(os.listdir(OBJETOS)):
+        result = projeto_3aVA.load_object_file(os.path.join(OBJETOS, filename))
+        assert result['error'] is None, filename
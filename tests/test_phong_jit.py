@@ -0,0 +1,41 @@
+import os
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("numba")
+import main_phong
+import phong_jit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def render_both(lighting, width=200, height=150):
+    vertices, triangles = main_phong.load_mesh(os.path.join(ROOT, "mesh.txt"))
+    normals = main_phong.compute_vertex_normals(vertices, triangles)
+    camera = main_phong.load_camera(os.path.join(ROOT, "camera.txt"))
+    # Câmera mais próxima, para que a malha ocupe boa parte da imagem
+    camera['C'] = [15.0, -30.0, 45.0]
+    return [main_phong.render_scene(vertices, triangles, normals, camera, lighting, width, height,
+                                    use_jit=use_jit)['pixels'] for use_jit in (False, True)]
+
+
+def test_kernel_compilado_igual_ao_python():
+    """
+    O kernel de phong_jit produz exatamente a mesma imagem que o rasterizador em Python.
+    """
+    assert phong_jit.AVAILABLE
+    python, jit = render_both(main_phong.load_lighting(os.path.join(ROOT, "lighting.txt")))
+    assert any(python)
+    assert jit == python
+
+
+def test_kernel_compilado_varias_luzes():
+    """
+    Com várias luzes (e a grade de tiles de luz), as imagens também coincidem.
+    """
+    lighting = main_phong.load_lighting(os.path.join(ROOT, "lighting.txt"))
+    lighting['lights'].append({'Il': [200.0, 40.0, 40.0], 'Pl': [40.0, -20.0, 30.0], 'radius': 60.0})
+    python, jit = render_both(lighting)
+    assert any(python)
+    assert jit == python
@@ -0,0 +1,56 @@
+import os
+import time
+
+import pytest
+
+import render_service
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def service():
+    service = render_service.RenderService(workers=1, cache_dir=None)
+    yield service
+    service.close()
+
+
+def job(tmp_path, **fields):
+    request = {'mesh': os.path.join(ROOT, "mesh.txt"), 'camera': os.path.join(ROOT, "camera.txt"),
+               'lighting': os.path.join(ROOT, "lighting.txt"), 'output': str(tmp_path / "saida.ppm"),
+               'width': 8, 'height': 6}
+    request.update(fields)
+    return request
+
+
+@pytest.mark.parametrize("width, height", [(0, 600), (800, -1), ("abc", 600)])
+def test_dimensoes_invalidas_rejeitadas(service, tmp_path, width, height):
+    with pytest.raises(ValueError):
+        service.submit(job(tmp_path, width=width, height=height))
+    assert service.status()['queue_depth'] == 0
+
+
+def test_jobs_terminados_descartados(service, tmp_path, monkeypatch):
+    monkeypatch.setattr(render_service, "FINISHED_JOBS_KEPT", 2)
+    ids = [service.submit(job(tmp_path, output=str(tmp_path / f"saida{i}.ppm"))) for i in range(4)]
+    deadline = time.time() + 60
+    while service.status()['completed'] + service.status()['failed'] < 4 and time.time() < deadline:
+        time.sleep(0.05)
+    assert service.status()['completed'] == 4
+    assert [service.job_status(job_id) is None for job_id in ids] == [True, True, False, False]
+
+
+def test_tamanho_do_cache_repassado_ao_job(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    service = render_service.RenderService(workers=1, cache_dir=cache_dir, cache_size=1)
+    try:
+        job_id = service.submit(job(tmp_path))
+        deadline = time.time() + 60
+        while service.job_status(job_id)['state'] not in ('done', 'failed') and time.time() < deadline:
+            time.sleep(0.05)
+        assert service.job_status(job_id)['state'] == 'done'
+    finally:
+        service.close()
+    # Com limite de 1 byte, a imagem gravada é descartada do cache na mesma hora
+    assert os.path.isdir(cache_dir)
+    assert not [name for name in os.listdir(cache_dir) if name.endswith(".ppm")]
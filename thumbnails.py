@@ -0,0 +1,148 @@
+"""
+Geração de miniaturas, sem janela, dos objetos (.byu, .ply, .stl, .obj) de uma pasta.
+
+Usa o mesmo pipeline de projeto_3aVA.py (câmera e iluminação de params.txt,
+carregamento sob demanda com orçamento de memória) em um contexto OpenGL fora
+da tela, criado por uma implementação de OpenGL em software: OSMesa ou Mesa via
+EGL sem superfície (llvmpipe). Não precisa de GPU nem de servidor X. Um único
+contexto é criado e reaproveitado para todo o lote; cada objeto gera uma imagem
+PPM com o mesmo nome do arquivo do objeto.
+
+Uso:
+  python thumbnails.py [--objects objetos] [--params params.txt] [--output miniaturas]
+                       [--width 320] [--height 240] [--platform osmesa|egl]
+"""
+import argparse
+import ctypes
+import os
+import sys
+import time
+
+###########################################
+# Contexto OpenGL Fora da Tela
+###########################################
+
+def create_offscreen_context(platform, width, height):
+    """
+    Cria e torna corrente um contexto OpenGL fora da tela.
+
+    Parâmetros:
+        platform (str): 'osmesa' ou 'egl'.
+        width, height (int): Dimensões da imagem.
+
+    Retorna:
+        function: Função sem argumentos que destrói o contexto.
+    """
+    if platform == "osmesa":
+        from OpenGL import arrays, osmesa
+        from OpenGL.GL import GL_UNSIGNED_BYTE
+        context = osmesa.OSMesaCreateContextExt(osmesa.OSMESA_RGBA, 24, 0, 0, None)
+        if not context:
+            raise RuntimeError("não foi possível criar o contexto OSMesa")
+        buffer = arrays.GLubyteArray.zeros((height, width, 4))
+        if not osmesa.OSMesaMakeCurrent(context, buffer, GL_UNSIGNED_BYTE, width, height):
+            raise RuntimeError("não foi possível ativar o contexto OSMesa")
+        # O buffer precisa continuar vivo enquanto o contexto existir
+        return lambda buffer=buffer: osmesa.OSMesaDestroyContext(context)
+
+    from OpenGL import EGL
+    display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+    if not EGL.eglInitialize(display, None, None):
+        raise RuntimeError("não foi possível inicializar o EGL")
+    attributes = (EGL.EGLint * 13)(EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT,
+                                   EGL.EGL_RED_SIZE, 8, EGL.EGL_GREEN_SIZE, 8, EGL.EGL_BLUE_SIZE, 8,
+                                   EGL.EGL_DEPTH_SIZE, 24,
+                                   EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT, EGL.EGL_NONE)
+    config = EGL.EGLConfig()
+    num_configs = EGL.EGLint()
+    EGL.eglChooseConfig(display, attributes, ctypes.pointer(config), 1, ctypes.pointer(num_configs))
+    if num_configs.value == 0:
+        raise RuntimeError("nenhuma configuração EGL com OpenGL e pbuffer disponível")
+    surface = EGL.eglCreatePbufferSurface(display, config,
+                                          (EGL.EGLint * 5)(EGL.EGL_WIDTH, width, EGL.EGL_HEIGHT, height,
+                                                           EGL.EGL_NONE))
+    EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+    context = EGL.eglCreateContext(display, config, EGL.EGL_NO_CONTEXT, None)
+    if not EGL.eglMakeCurrent(display, surface, surface, context):
+        raise RuntimeError("não foi possível ativar o contexto EGL")
+    return lambda: EGL.eglTerminate(display)
+
+###########################################
+# Geração das Miniaturas
+###########################################
+
+def write_ppm(filename, width, height, pixels):
+    """
+    Grava uma imagem PPM (P6) a partir dos pixels RGB lidos com glReadPixels,
+    invertendo as linhas (o OpenGL lê de baixo para cima).
+    """
+    row = 3 * width
+    with open(filename, "wb") as f:
+        f.write(b"P6\n%d %d\n255\n" % (width, height))
+        for y in range(height - 1, -1, -1):
+            f.write(pixels[y * row:(y + 1) * row])
+
+def render_thumbnails(viewer, output, width, height):
+    """
+    Renderiza cada objeto indexado em viewer.loaded_objects e grava sua miniatura
+    em 'output'.
+
+    Retorna:
+        tuple: (número de miniaturas gravadas, número de objetos que falharam)
+    """
+    from OpenGL.GL import GL_RGB, GL_UNSIGNED_BYTE, glFinish, glReadPixels
+
+    os.makedirs(output, exist_ok=True)
+    written = 0
+    failed = 0
+    for i, obj in enumerate(viewer.loaded_objects):
+        viewer.current_object_index = i
+        if not viewer.ensure_object_loaded(i, prefetch=False):
+            failed += 1
+            continue
+        viewer.draw_scene()
+        glFinish()
+        pixels = glReadPixels(0, 0, width, height, GL_RGB, GL_UNSIGNED_BYTE)
+        write_ppm(os.path.join(output, os.path.splitext(obj['name'])[0] + ".ppm"), width, height, pixels)
+        written += 1
+    return written, failed
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera miniaturas PPM dos objetos 3D sem abrir janelas.")
+    parser.add_argument("--objects", default="objetos", help="pasta com os arquivos de objetos (.byu, .ply, .stl, .obj)")
+    parser.add_argument("--params", default="params.txt", help="arquivo de câmera e iluminação")
+    parser.add_argument("--output", default="miniaturas", help="pasta de saída das imagens")
+    parser.add_argument("--width", type=int, default=320)
+    parser.add_argument("--height", type=int, default=240)
+    parser.add_argument("--platform", choices=("osmesa", "egl"), default="osmesa",
+                        help="implementação de OpenGL fora da tela (padrão: osmesa)")
+    args = parser.parse_args()
+
+    # A plataforma do PyOpenGL precisa ser escolhida antes do primeiro import de OpenGL
+    os.environ["PYOPENGL_PLATFORM"] = args.platform
+    if args.platform == "egl":
+        os.environ.setdefault("EGL_PLATFORM", "surfaceless")
+    try:
+        import projeto_3aVA as viewer
+    except (ImportError, AttributeError) as e:  # biblioteca OSMesa/EGL ausente
+        print(f"OpenGL fora da tela ('{args.platform}') indisponível: {e}")
+        return 1
+
+    destroy_context = create_offscreen_context(args.platform, args.width, args.height)
+    start = time.perf_counter()
+    try:
+        viewer.load_parameters(args.params)
+        viewer.index_objects(args.objects)
+        viewer.init()
+        viewer.reshape(args.width, args.height)
+        written, failed = render_thumbnails(viewer, args.output, args.width, args.height)
+    finally:
+        if viewer.prefetch_pool is not None:
+            viewer.prefetch_pool.shutdown(cancel_futures=True)
+        destroy_context()
+    print(f"{written} miniatura(s) gravada(s) em '{args.output}' em {time.perf_counter() - start:.2f} s; "
+          f"{failed} objeto(s) com erro.")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())